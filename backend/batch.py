@@ -0,0 +1,122 @@
+"""
+ESA Life CEO 61x21 Framework - Batch Requests
+Validation and encoding for /batch, which fans several API calls out through the proxy in one round trip
+"""
+
+import base64
+import json
+import posixpath
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+BATCH_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"}
+
+# Sub-request headers that describe the outer request or its connection, never a sub-request
+BATCH_IGNORED_HEADERS = {"content-length", "transfer-encoding", "host", "connection", "accept-encoding"}
+
+
+class BatchError(ValueError):
+    """The batch payload is malformed; reported to the client as a 400"""
+
+
+class SubRequest:
+    """One validated entry of a batch"""
+
+    __slots__ = ("id", "method", "target", "headers", "body")
+
+    def __init__(self, request_id: str, method: str, target: str, headers: Dict[str, str], body: Optional[bytes]):
+        self.id = request_id
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+
+
+def parse_batch(payload: Any, max_requests: int, path_prefixes: List[str]) -> List[SubRequest]:
+    """Validate a batch payload: {"requests": [{"id", "method", "path", "headers", "body"}, ...]}
+
+    Paths must be relative and stay under one of `path_prefixes` after normalisation,
+    so a batch can only reach the same API routes a browser could call directly.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        raise BatchError('Expected a JSON object with a "requests" list')
+    entries = payload["requests"]
+    if not entries:
+        raise BatchError("Batch is empty")
+    if len(entries) > max_requests:
+        raise BatchError(f"Batch has {len(entries)} requests; the limit is {max_requests}")
+
+    requests: List[SubRequest] = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+            raise BatchError(f"Request {index} needs a string \"path\"")
+        request_id = str(entry.get("id", index))
+        if request_id in seen:
+            raise BatchError(f"Duplicate request id {request_id!r}")
+        seen.add(request_id)
+
+        method = str(entry.get("method", "GET")).upper()
+        if method not in BATCH_METHODS:
+            raise BatchError(f"Request {request_id!r}: method {method} is not allowed")
+
+        parts = urlsplit(entry["path"])
+        path = posixpath.normpath(parts.path) if parts.path else ""
+        if parts.scheme or parts.netloc or not path.startswith(tuple(path_prefixes)):
+            raise BatchError(f"Request {request_id!r}: path must be relative and start with one of {path_prefixes}")
+        target = f"{path}?{parts.query}" if parts.query else path
+
+        headers = entry.get("headers") or {}
+        if not isinstance(headers, dict):
+            raise BatchError(f"Request {request_id!r}: headers must be an object")
+        headers = {str(k).lower(): str(v) for k, v in headers.items() if str(k).lower() not in BATCH_IGNORED_HEADERS}
+
+        body = None
+        if "body" in entry and entry["body"] is not None:
+            if method in ("GET", "HEAD"):
+                raise BatchError(f"Request {request_id!r}: {method} cannot have a body")
+            if isinstance(entry["body"], str):
+                body = entry["body"].encode()
+            else:
+                body = json.dumps(entry["body"], separators=(",", ":")).encode()
+                headers.setdefault("content-type", "application/json")
+
+        requests.append(SubRequest(request_id, method, target, headers, body))
+    return requests
+
+
+def encode_result(request_id: str, status: int, headers: Dict[str, str], body: bytes,
+                  duration_ms: float) -> Dict[str, Any]:
+    """One batch result; JSON bodies are embedded as values, text as strings, anything else as base64"""
+    result: Dict[str, Any] = {
+        "id": request_id,
+        "status": status,
+        "headers": headers,
+        "duration_ms": round(duration_ms, 2),
+    }
+    content_type = headers.get("content-type", "")
+    if not body:
+        result["body"] = None
+    elif "json" in content_type:
+        try:
+            result["body"] = json.loads(body)
+            return result
+        except ValueError:
+            pass
+    if body and "body" not in result:
+        try:
+            result["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            result["body"] = base64.b64encode(body).decode("ascii")
+            result["body_encoding"] = "base64"
+    return result
+
+
+def error_result(request_id: str, status: int, message: str, duration_ms: float) -> Dict[str, Any]:
+    return {
+        "id": request_id,
+        "status": status,
+        "headers": {"content-type": "application/json"},
+        "duration_ms": round(duration_ms, 2),
+        "body": {"error": message},
+    }
@@ -0,0 +1,161 @@
+"""
+ESA Life CEO 61x21 Framework - Proxy Response Compression
+gzip/brotli content negotiation off the event loop, with a memo of compressed variants
+
+brotli is optional (pip install brotli); without it only gzip is offered.
+"""
+
+import asyncio
+import gzip
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml", "application/manifest+json",
+    "image/svg+xml", "text/",
+)
+
+
+def negotiate(accept_encoding: Optional[str], brotli_available: bool) -> Optional[str]:
+    """Choose 'br' or 'gzip' from an Accept-Encoding header, honouring q-values; None for identity"""
+    if not accept_encoding:
+        return None
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[coding.strip().lower()] = q
+
+    candidates = (["br"] if brotli_available else []) + ["gzip"]
+    best = None
+    for coding in candidates:
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (coding, q)
+    return best[0] if best else None
+
+
+class CompressedVariant:
+    """A compressed body and the source it was made from (matched by identity, so kept alive here)"""
+
+    __slots__ = ("source", "body")
+
+    def __init__(self, source: bytes, body: bytes):
+        self.source = source
+        self.body = body
+
+    @property
+    def size(self) -> int:
+        return len(self.source) + len(self.body)
+
+
+class Compressor:
+    """Compresses response bodies in a thread pool and memoises variants of hot payloads
+
+    `memo_max_bytes` bounds the source and compressed bytes the memo holds together. Only pass a
+    `memo_key` for bodies that are reused as the same object (response cache entries, static assets).
+    """
+
+    def __init__(self, min_bytes: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 workers: int = 2, memo_max_bytes: int = 32 * 1024 * 1024):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.memo_max_bytes = memo_max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="proxy-compress")
+        self.memo: "OrderedDict[Tuple[str, str], CompressedVariant]" = OrderedDict()
+        self.memo_bytes = 0
+        # Compressions in progress, with the source bytes they were started for
+        self.pending: Dict[Tuple[str, str], Tuple[bytes, asyncio.Future]] = {}
+        self.stats_counters = {
+            "compressed": 0, "skipped": 0, "memo_hits": 0, "memo_misses": 0,
+            "bytes_in": 0, "bytes_out": 0,
+        }
+
+    def choose_encoding(self, accept_encoding: Optional[str], content_type: Optional[str], size: int) -> Optional[str]:
+        """Encoding to apply to an uncompressed body, or None when it is too small or not compressible"""
+        if size < self.min_bytes or not content_type or not content_type.lower().startswith(COMPRESSIBLE_TYPES):
+            self.stats_counters["skipped"] += 1
+            return None
+        return negotiate(accept_encoding, brotli is not None)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def compress(self, body: bytes, encoding: str, memo_key: Optional[str] = None) -> bytes:
+        """Compressed body; variants are reused while the memo still holds the same source bytes"""
+        key = (memo_key, encoding) if memo_key is not None else None
+        if key is not None:
+            variant = self.memo.get(key)
+            if variant is not None and variant.source is body:
+                self.memo.move_to_end(key)
+                self.stats_counters["memo_hits"] += 1
+                self._count(body, variant.body)
+                return variant.body
+            source, pending = self.pending.get(key, (None, None))
+            if pending is not None and source is body:
+                self.stats_counters["memo_hits"] += 1
+                compressed = await asyncio.shield(pending)
+                self._count(body, compressed)
+                return compressed
+            self.stats_counters["memo_misses"] += 1
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._compress, body, encoding)
+        if key is not None:
+            self.pending[key] = (body, future)
+        try:
+            compressed = await asyncio.shield(future)
+        finally:
+            if key is not None and self.pending.get(key, (None, None))[1] is future:
+                del self.pending[key]
+
+        if key is not None:
+            self._remember(key, CompressedVariant(body, compressed))
+        self._count(body, compressed)
+        return compressed
+
+    def _remember(self, key: Tuple[str, str], variant: CompressedVariant):
+        previous = self.memo.pop(key, None)
+        if previous is not None:
+            self.memo_bytes -= previous.size
+        if variant.size > self.memo_max_bytes:
+            return
+        self.memo[key] = variant
+        self.memo_bytes += variant.size
+        while self.memo_bytes > self.memo_max_bytes:
+            _, evicted = self.memo.popitem(last=False)
+            self.memo_bytes -= evicted.size
+
+    def _count(self, body: bytes, compressed: bytes):
+        self.stats_counters["compressed"] += 1
+        self.stats_counters["bytes_in"] += len(body)
+        self.stats_counters["bytes_out"] += len(compressed)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus the bytes-saved ratio across all compressed responses"""
+        bytes_in = self.stats_counters["bytes_in"]
+        return {
+            **self.stats_counters,
+            "bytes_saved": bytes_in - self.stats_counters["bytes_out"],
+            "saved_ratio": round(1 - self.stats_counters["bytes_out"] / bytes_in, 4) if bytes_in else 0,
+            "memo_entries": len(self.memo),
+            "memo_bytes": self.memo_bytes,
+            "brotli_available": brotli is not None,
+        }
@@ -0,0 +1,165 @@
+"""
+ESA Life CEO 61x21 Framework - Load Shedding
+Adaptive (AIMD) concurrency limiting and per-upstream circuit breaking for proxied traffic
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is the suggested wait in seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by upstream latency, with a bounded wait queue
+
+    The limit grows by one per window of fast completions and is cut multiplicatively
+    whenever latency exceeds `latency_tolerance` times the best latency seen recently,
+    or an upstream call fails. Requests beyond the limit wait in a queue of at most
+    `max_queue` entries for up to `queue_timeout` seconds before being shed.
+    """
+
+    def __init__(self, initial_limit: int = 50, min_limit: int = 5, max_limit: int = 500,
+                 latency_tolerance: float = 2.0, backoff_ratio: float = 0.9,
+                 max_queue: int = 100, queue_timeout: float = 1.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # Rolling minimum latency over a bounded sample window approximates the no-load latency
+        self.recent_latencies: Deque[float] = deque(maxlen=200)
+        self.shed = 0
+        self.last_backoff = 0.0
+
+    async def acquire(self):
+        """Take a concurrency slot, queueing briefly if the limit is reached"""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+        if len(self.waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded("concurrency limit reached", retry_after=1)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Overloaded("queued too long", retry_after=1)
+        except asyncio.CancelledError:
+            # Client went away just as a slot was handed over: give it to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self.release(None, ok=True)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        # The releasing request handed its slot over, so in_flight already counts this one
+
+    def release(self, latency_ms: Optional[float], ok: bool):
+        """Return a slot and adapt the limit to the observed latency (None when not measured)"""
+        if latency_ms is not None:
+            self._adapt(latency_ms, ok)
+        while self.waiters and self.in_flight <= int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _adapt(self, latency_ms: float, ok: bool):
+        self.recent_latencies.append(latency_ms)
+        baseline = min(self.recent_latencies)
+        now = time.monotonic()
+        if not ok or latency_ms > baseline * self.latency_tolerance + 1:
+            # At most one multiplicative decrease per baseline interval so a burst of slow replies counts once
+            if now - self.last_backoff > max(baseline / 1000, 0.05):
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self.last_backoff = now
+        elif self.in_flight >= int(self.limit) * 0.5:
+            # Additive increase only while the limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+            "min_latency_ms": round(min(self.recent_latencies), 2) if self.recent_latencies else None,
+        }
+
+
+class CircuitBreaker:
+    """Per-upstream breaker: opens after consecutive failures, probes with one request when half-open"""
+
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only a single probe is let through"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> int:
+        return max(1, int(self.open_seconds - (time.monotonic() - self.opened_at) + 0.999))
+
+    def record(self, ok: bool):
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+        if ok:
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """Forget a request whose outcome will never be known (e.g. a cancelled hedge)"""
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+ESA Life CEO 61x21 Framework - Pre-fork Supervisor
+Runs an ASGI app in N uvicorn worker processes on one port, with health checks and rolling restarts
+
+Usage:
+    python prefork.py server:app --port 8001                      # one worker per CPU
+    python prefork.py functional_agent_api:app --app-dir ../server/agents --port 8002 --workers 4
+
+Workers share one listening socket inherited from the supervisor, or with --reuse-port each
+binds its own SO_REUSEPORT socket and the kernel spreads connections between them. Every
+worker also listens on a private Unix socket in the state directory, so any one of them can
+be health-checked or scraped directly:
+
+    curl --unix-socket $STATE_DIR/w0-g1.sock http://worker/_proxy/worker
+
+Rate limits, LLM budgets and memory caps are enforced inside each process, so workers read the
+worker count from PREFORK_WORKERS (see worker_count()) and take their share of each one.
+
+SIGHUP replaces workers one at a time (new worker healthy before the old one drains), so code
+changes roll out without dropping connections. SIGTERM/SIGINT drain and stop all workers.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+WORKER_SOCKET = re.compile(r"w(\d+)-g(\d+)\.sock$")
+SAMPLE_LINE = re.compile(r"^([A-Za-z_:][A-Za-z0-9_:]*)(?:\{(.*)\})?(\s.*)$")
+
+_started_at = time.time()
+
+
+def worker_id() -> Optional[int]:
+    """Slot number of this worker process, or None when not running under the supervisor"""
+    value = os.getenv("PREFORK_WORKER_ID")
+    return int(value) if value is not None else None
+
+
+def worker_count() -> int:
+    """Number of workers the supervisor runs (1 when not supervised), for splitting per-process limits"""
+    return int(os.getenv("PREFORK_WORKERS", "1"))
+
+
+def worker_info() -> Dict[str, Any]:
+    """Identity and uptime of the current process, for per-worker health endpoints"""
+    return {
+        "status": "healthy",
+        "worker_id": worker_id(),
+        "workers": worker_count(),
+        "generation": int(os.getenv("PREFORK_WORKER_GENERATION", "0")),
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started_at, 1),
+    }
+
+
+def worker_sockets(state_dir: str) -> Dict[int, str]:
+    """Newest control socket per worker slot (an older generation may still be draining)"""
+    newest: Dict[int, Tuple[int, str]] = {}
+    for path in glob.glob(os.path.join(state_dir, "w*-g*.sock")):
+        match = WORKER_SOCKET.search(path)
+        if match:
+            slot, generation = int(match.group(1)), int(match.group(2))
+            if slot not in newest or generation > newest[slot][0]:
+                newest[slot] = (generation, path)
+    return {slot: path for slot, (_, path) in newest.items()}
+
+
+async def scrape_siblings(path: str, timeout: float = 2.0) -> List[Tuple[int, str]]:
+    """GET `path` from every other live worker over its control socket; unreachable workers are skipped"""
+    state_dir = os.getenv("PREFORK_STATE_DIR")
+    if not state_dir:
+        return []
+    own = worker_id()
+
+    async def scrape(slot: int, socket_path: str) -> Optional[Tuple[int, str]]:
+        transport = httpx.AsyncHTTPTransport(uds=socket_path)
+        try:
+            async with httpx.AsyncClient(transport=transport, timeout=timeout) as client:
+                response = await client.get(f"http://worker{path}")
+                return (slot, response.text) if response.status_code == 200 else None
+        except httpx.HTTPError:
+            return None
+
+    results = await asyncio.gather(*(
+        scrape(slot, socket_path) for slot, socket_path in worker_sockets(state_dir).items() if slot != own
+    ))
+    return [r for r in results if r is not None]
+
+
+def _with_worker_label(sample: str, slot: int) -> str:
+    match = SAMPLE_LINE.match(sample)
+    if not match:
+        return sample
+    name, labels, value = match.groups()
+    labels = f'worker="{slot}",{labels}' if labels else f'worker="{slot}"'
+    return f"{name}{{{labels}}}{value}"
+
+
+def merge_expositions(scrapes: List[Tuple[int, str]]) -> str:
+    """Combine per-worker Prometheus text into one exposition, labelling every sample with its worker
+
+    Samples are regrouped by metric family so each family stays contiguous, as the format requires.
+    """
+    families: Dict[str, List[str]] = {}
+    for slot, text in sorted(scrapes):
+        family = None
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    lines = families.setdefault(family, [])
+                    if line not in lines:
+                        lines.append(line)
+                continue
+            match = SAMPLE_LINE.match(line)
+            sample_name = match.group(1) if match else line
+            key = family if family and sample_name.startswith(family) else sample_name
+            families.setdefault(key, []).append(_with_worker_label(line, slot))
+    return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+def bind_socket(host: str, port: int, reuse_port: bool = False, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app_path: str, app_dir: str, slot: int, generation: int, workers: int, state_dir: str,
+                shared: Optional[socket.socket], host: str, port: int, uvicorn_options: Dict[str, Any]):
+    """Worker process body: serve the app on the shared (or own SO_REUSEPORT) socket plus a control socket"""
+    import uvicorn
+
+    global _started_at
+    _started_at = time.time()
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    os.environ.update(
+        PREFORK_WORKER_ID=str(slot),
+        PREFORK_WORKER_GENERATION=str(generation),
+        PREFORK_WORKERS=str(workers),
+        PREFORK_STATE_DIR=state_dir,
+    )
+    if app_dir:
+        sys.path.insert(0, app_dir)
+
+    listener = shared if shared is not None else bind_socket(host, port, reuse_port=True)
+    control_path = os.path.join(state_dir, f"w{slot}-g{generation}.sock")
+    control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    control.bind(control_path)
+    os.chmod(control_path, 0o600)
+    control.listen(128)
+    try:
+        uvicorn.Server(uvicorn.Config(app_path, **uvicorn_options)).run(sockets=[listener, control])
+    finally:
+        try:
+            os.unlink(control_path)
+        except OSError:
+            pass
+
+
+class WorkerProcess:
+    """One supervised worker and its health bookkeeping"""
+
+    __slots__ = ("slot", "generation", "process", "started_at", "health_failures", "crashes", "respawn_at",
+                 "kill_at")
+
+    def __init__(self, slot: int, generation: int, process: multiprocessing.Process):
+        self.slot = slot
+        self.generation = generation
+        self.process = process
+        self.started_at = time.monotonic()
+        self.health_failures = 0
+        self.crashes = 0
+        self.respawn_at = 0.0
+        self.kill_at = 0.0  # set once retired: SIGKILL if still draining by then
+
+    def control_path(self, state_dir: str) -> str:
+        return os.path.join(state_dir, f"w{self.slot}-g{self.generation}.sock")
+
+
+class Supervisor:
+    """Keeps `workers` processes serving `app_path`, replacing crashed, hung or outdated ones
+
+    Nothing in the supervision loop waits on a single worker: health probes run concurrently,
+    and a replaced worker drains in the background until its own deadline, so one hung worker
+    never delays reaping or restarting the others.
+    """
+
+    def __init__(self, app_path: str, host: str = "0.0.0.0", port: int = 8001, workers: Optional[int] = None,
+                 app_dir: str = "", health_path: str = "/", health_interval: float = 5.0,
+                 health_failures: int = 3, graceful_timeout: float = 30.0, reuse_port: bool = False,
+                 log_level: str = "info"):
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.app_dir = os.path.abspath(app_dir) if app_dir else ""
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.health_failures = health_failures
+        self.graceful_timeout = graceful_timeout
+        self.reuse_port = reuse_port
+        self.uvicorn_options = {
+            "log_level": log_level,
+            "timeout_graceful_shutdown": int(graceful_timeout),
+        }
+        self.context = multiprocessing.get_context("fork")
+        self.state_dir = ""
+        self.shared: Optional[socket.socket] = None
+        self.pool: Dict[int, WorkerProcess] = {}
+        self.retired: List[WorkerProcess] = []
+        self.generation = 0
+        self.restarts = 0
+        self.should_exit = False
+        self.reload_requested = False
+
+    def spawn(self, slot: int) -> WorkerProcess:
+        self.generation += 1
+        process = self.context.Process(
+            target=_run_worker,
+            args=(self.app_path, self.app_dir, slot, self.generation, self.workers, self.state_dir, self.shared,
+                  self.host, self.port, self.uvicorn_options),
+            name=f"prefork-worker-{slot}",
+        )
+        process.start()
+        return WorkerProcess(slot, self.generation, process)
+
+    async def probe(self, worker: WorkerProcess) -> bool:
+        transport = httpx.AsyncHTTPTransport(uds=worker.control_path(self.state_dir))
+        try:
+            async with httpx.AsyncClient(transport=transport, timeout=2.0) as client:
+                return (await client.get(f"http://worker{self.health_path}")).status_code < 500
+        except httpx.HTTPError:
+            return False
+
+    def probe_all(self, workers: List[WorkerProcess]) -> List[bool]:
+        """Probe `workers` concurrently, so the whole round takes at most one probe timeout"""
+        async def probes():
+            return await asyncio.gather(*(self.probe(worker) for worker in workers))
+        return asyncio.run(probes()) if workers else []
+
+    def wait_healthy(self, worker: WorkerProcess, timeout: float = 60.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.process.is_alive():
+            if self.probe_all([worker])[0]:
+                return True
+            time.sleep(0.2)
+            self.reap_retired()
+        return False
+
+    def stop_worker(self, worker: WorkerProcess):
+        """SIGTERM (uvicorn drains in-flight requests), then SIGKILL after the graceful timeout"""
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(self.graceful_timeout + 5)
+        if worker.process.is_alive():
+            print(f"⚠️ Worker {worker.slot} (pid {worker.process.pid}) did not drain in time, killing")
+            worker.process.kill()
+            worker.process.join()
+
+    def retire(self, worker: WorkerProcess):
+        """stop_worker() without waiting: SIGTERM now, SIGKILL from reap_retired() after the graceful timeout"""
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.kill_at = time.monotonic() + self.graceful_timeout + 5
+        self.retired.append(worker)
+
+    def reap_retired(self):
+        """Collect retired workers that finished draining; kill those past their deadline"""
+        now = time.monotonic()
+        for worker in list(self.retired):
+            if worker.process.is_alive():
+                if now < worker.kill_at:
+                    continue
+                print(f"⚠️ Worker {worker.slot} (pid {worker.process.pid}) did not drain in time, killing")
+                worker.process.kill()
+            worker.process.join(1)
+            if not worker.process.is_alive():
+                self.retired.remove(worker)
+
+    def rolling_restart(self):
+        print(f"🔄 Rolling restart of {len(self.pool)} workers")
+        for slot in sorted(self.pool):
+            old = self.pool[slot]
+            new = self.spawn(slot)
+            if not self.wait_healthy(new):
+                print(f"⚠️ Replacement for worker {slot} never became healthy; keeping the old workers")
+                self.retire(new)
+                return
+            self.pool[slot] = new
+            self.retire(old)
+            self.restarts += 1
+        print("✅ Rolling restart complete")
+
+    def reap(self):
+        """Respawn workers that exited, backing off when they keep crashing right after start"""
+        now = time.monotonic()
+        for slot, worker in list(self.pool.items()):
+            if worker.process.is_alive():
+                continue
+            if not worker.respawn_at:
+                quick_crash = now - worker.started_at < 10
+                worker.crashes = worker.crashes + 1 if quick_crash else 0
+                worker.respawn_at = now + (min(30.0, 0.5 * 2 ** worker.crashes) if quick_crash else 0)
+                print(f"⚠️ Worker {slot} (pid {worker.process.pid}) exited with code {worker.process.exitcode}")
+                # A killed worker cannot remove its own control socket
+                try:
+                    os.unlink(worker.control_path(self.state_dir))
+                except OSError:
+                    pass
+            if now >= worker.respawn_at:
+                replacement = self.spawn(slot)
+                replacement.crashes = worker.crashes
+                self.pool[slot] = replacement
+                self.restarts += 1
+
+    def check_health(self):
+        due = [worker for worker in self.pool.values()
+               if worker.process.is_alive() and time.monotonic() - worker.started_at >= self.health_interval]
+        for worker, healthy in zip(due, self.probe_all(due)):
+            if healthy:
+                worker.health_failures = 0
+                continue
+            worker.health_failures += 1
+            if worker.health_failures >= self.health_failures:
+                print(f"⚠️ Worker {worker.slot} failed {worker.health_failures} health checks, restarting it")
+                self.retire(worker)
+                self.pool[worker.slot] = self.spawn(worker.slot)
+                self.restarts += 1
+
+    def write_status(self):
+        status = {
+            "app": self.app_path,
+            "port": self.port,
+            "supervisor_pid": os.getpid(),
+            "restarts": self.restarts,
+            "workers": [
+                {
+                    "slot": w.slot, "generation": w.generation, "pid": w.process.pid,
+                    "alive": w.process.is_alive(), "health_failures": w.health_failures,
+                    "control_socket": w.control_path(self.state_dir),
+                }
+                for w in sorted(self.pool.values(), key=lambda w: w.slot)
+            ],
+            "draining": [{"slot": w.slot, "generation": w.generation, "pid": w.process.pid} for w in self.retired],
+        }
+        path = os.path.join(self.state_dir, "status.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _request_exit(self, signum, frame):
+        self.should_exit = True
+
+    def _request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def run(self):
+        self.state_dir = os.getenv("PREFORK_STATE_DIR") or tempfile.mkdtemp(prefix="prefork-")
+        os.makedirs(self.state_dir, exist_ok=True)
+        if not self.reuse_port:
+            self.shared = bind_socket(self.host, self.port)
+        signal.signal(signal.SIGTERM, self._request_exit)
+        signal.signal(signal.SIGINT, self._request_exit)
+        signal.signal(signal.SIGHUP, self._request_reload)
+
+        mode = "SO_REUSEPORT" if self.reuse_port else "shared socket"
+        print(f"🚀 Supervising {self.workers} workers of {self.app_path} on {self.host}:{self.port} ({mode})")
+        print(f"📡 Worker control sockets and status.json in {self.state_dir}")
+        for slot in range(self.workers):
+            self.pool[slot] = self.spawn(slot)
+
+        next_health_check = time.monotonic() + self.health_interval
+        try:
+            while not self.should_exit:
+                time.sleep(0.5)
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.rolling_restart()
+                self.reap()
+                self.reap_retired()
+                if self.health_interval > 0 and time.monotonic() >= next_health_check:
+                    self.check_health()
+                    next_health_check = time.monotonic() + self.health_interval
+                self.write_status()
+        finally:
+            print("🛑 Stopping workers")
+            workers = [*self.pool.values(), *self.retired]
+            for worker in workers:
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            for worker in workers:
+                self.stop_worker(worker)
+            if self.shared is not None:
+                self.shared.close()
+            if not os.getenv("PREFORK_STATE_DIR"):
+                shutil.rmtree(self.state_dir, ignore_errors=True)
+
+
+def serve(app_path: str, host: str, port: int, workers: Optional[int] = None, **options):
+    """Run `app_path` under the supervisor; workers defaults to the CPU count"""
+    Supervisor(app_path, host=host, port=port, workers=workers, **options).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork supervisor for the Life CEO ASGI services")
+    parser.add_argument("app", help="ASGI app as module:attribute, e.g. server:app")
+    parser.add_argument("--app-dir", default="", help="Directory to import the app module from")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--reuse-port", action="store_true", help="Give each worker its own SO_REUSEPORT socket")
+    parser.add_argument("--health-path", default="/", help="Per-worker health endpoint probed over the control socket")
+    parser.add_argument("--health-interval", type=float, default=5.0)
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.app, args.host, args.port, args.workers, app_dir=args.app_dir, reuse_port=args.reuse_port,
+          health_path=args.health_path, health_interval=args.health_interval,
+          graceful_timeout=args.graceful_timeout, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
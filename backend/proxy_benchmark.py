@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+ESA Life CEO 61x21 Framework - Proxy Benchmark
+Drives server.py against a local stub upstream and records throughput, latency and memory as JSON
+
+Usage (from backend/):
+    python proxy_benchmark.py --sizes 1024,65536 --delays 0,20 --concurrency 1,16,64 --rates 500 --duration 10
+
+    # Proxy -> upstream transports on small JSON responses (h2c needs `hypercorn` and `h2`)
+    python proxy_benchmark.py --transports tcp,uds,h2c --sizes 256 --delays 0 --concurrency 16,64 --rates ''
+
+Every scenario is also run directly against the stub, so proxy overhead is reported as the
+difference between the two. Closed-loop scenarios keep a fixed number of requests in flight;
+open-loop scenarios send at a fixed arrival rate and measure latency from the scheduled send
+time, so a stalled proxy shows up in the tail instead of silently lowering the offered load.
+With --transports, a stub and a proxy are started per upstream transport (TCP, Unix socket, h2c)
+and each proxy is compared with the stub reached directly over the same transport.
+Each request carries a unique query string so single-flight coalescing does not collapse them.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+
+from upstream_client import h2_available
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_payloads: Dict[int, bytes] = {}
+
+
+def _payload(size: int) -> bytes:
+    body = _payloads.get(size)
+    if body is None:
+        body = _payloads[size] = b'{"data":"' + b"x" * max(0, size - 12) + b'"}'
+    return body
+
+
+async def stub_app(scope, receive, send):
+    """Minimal ASGI upstream: /bench?size=<bytes>&delay_ms=<ms> returns a JSON body of that size"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    size = int(query.get("size", ["1024"])[0])
+    delay_ms = float(query.get("delay_ms", ["0"])[0])
+    if delay_ms > 0:
+        await asyncio.sleep(delay_ms / 1000)
+    body = _payload(size) if scope["path"] != "/health" else b'{"status":"healthy"}'
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app: str, port: int, env: Dict[str, str], uds: Optional[str] = None) -> subprocess.Popen:
+    bind = ["--uds", uds] if uds else ["--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, *bind, "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+def start_h2c_server(app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """uvicorn only speaks HTTP/1.1, so the h2c stub runs under hypercorn"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", app, "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+def transport_for(transport: Optional[Tuple[str, Optional[str]]], limits: httpx.Limits) -> Optional[httpx.AsyncHTTPTransport]:
+    """("uds", path) or ("h2c", None) -> matching httpx transport; None means plain HTTP/1.1 over TCP"""
+    if transport is None:
+        return None
+    kind, path = transport
+    if kind == "uds":
+        return httpx.AsyncHTTPTransport(uds=path, limits=limits)
+    return httpx.AsyncHTTPTransport(http1=False, http2=True, limits=limits)
+
+
+def wait_ready(url: str, timeout: float = 15.0, transport: Optional[Tuple[str, Optional[str]]] = None):
+    async def check() -> bool:
+        async with httpx.AsyncClient(transport=transport_for(transport, httpx.Limits()), timeout=1,
+                                     trust_env=False) as client:
+            try:
+                return (await client.get(url)).status_code < 500
+            except httpx.HTTPError:
+                return False
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if asyncio.run(check()):
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def _closed_loop(base_url: str, path: str, concurrency: int, duration: float, headers: Dict[str, str], seed: int,
+                       transport: Optional[Tuple[str, Optional[str]]] = None):
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(seed, sys.maxsize))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30, trust_env=False,
+                                 transport=transport_for(transport, limits)) as client:
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(f"{path}&n={next(counter)}", headers=headers)
+                    await response.aread()
+                    if response.status_code >= 400:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def _open_loop(base_url: str, path: str, rate: float, duration: float, headers: Dict[str, str], seed: int,
+                     transport: Optional[Tuple[str, Optional[str]]] = None):
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=1000)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30, trust_env=False,
+                                 transport=transport_for(transport, limits)) as client:
+
+        async def one(n: int, scheduled: float):
+            nonlocal errors
+            try:
+                response = await client.get(f"{path}&n={n}", headers=headers)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+                    return
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+
+        tasks = []
+        start = time.perf_counter()
+        total = int(rate * duration)
+        for n in range(total):
+            scheduled = start + n / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(seed + n, scheduled)))
+        await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+def _run_load(mode: str, base_url: str, path: str, level: float, duration: float, headers: Dict[str, str], seed: int,
+              transport: Optional[Tuple[str, Optional[str]]] = None):
+    """Entry point for a load-generator process"""
+    if mode == "closed":
+        return asyncio.run(_closed_loop(base_url, path, int(level), duration, headers, seed, transport))
+    return asyncio.run(_open_loop(base_url, path, level, duration, headers, seed, transport))
+
+
+def run_scenario(executor: ProcessPoolExecutor, workers: int, mode: str, base_url: str, path: str,
+                 level: float, duration: float, headers: Dict[str, str],
+                 transport: Optional[Tuple[str, Optional[str]]] = None) -> Dict[str, Any]:
+    """Split the load across generator processes and merge their latency samples"""
+    share = level / workers
+    started = time.perf_counter()
+    futures = [
+        executor.submit(_run_load, mode, base_url, path, max(1, share) if mode == "closed" else share,
+                        duration, headers, i * 10_000_000, transport)
+        for i in range(workers)
+    ]
+    latencies: List[float] = []
+    errors = 0
+    for future in futures:
+        worker_latencies, worker_errors = future.result()
+        latencies.extend(worker_latencies)
+        errors += worker_errors
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "p999_ms": percentile(latencies, 99.9),
+        "max_ms": round(latencies[-1], 3) if latencies else None,
+    }
+
+
+async def _hold_connections(port: int, count: int, pid: int, path: str) -> Dict[str, Any]:
+    """Open `count` keep-alive connections, make one request on each and measure the proxy's RSS growth"""
+    baseline = rss_bytes(pid)
+    connections = []
+    request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept-Encoding: identity\r\n\r\n".encode()
+    for _ in range(count):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        connections.append((reader, writer))
+    for reader, _ in connections:
+        await reader.readuntil(b"\r\n\r\n")
+    await asyncio.sleep(0.5)
+    loaded = rss_bytes(pid)
+    for _, writer in connections:
+        writer.close()
+    if baseline is None or loaded is None:
+        return {"connections": count, "rss_bytes_per_connection": None}
+    return {
+        "connections": count,
+        "rss_baseline_bytes": baseline,
+        "rss_loaded_bytes": loaded,
+        "rss_bytes_per_connection": round((loaded - baseline) / count),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_list(value: str, cast=float) -> List:
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Life CEO backend proxy against a local stub upstream")
+    parser.add_argument("--sizes", default="1024,65536", help="Response payload sizes in bytes")
+    parser.add_argument("--delays", default="0,20", help="Stub upstream latencies in ms")
+    parser.add_argument("--concurrency", default="1,16,64", help="Closed-loop concurrency levels")
+    parser.add_argument("--rates", default="500", help="Open-loop arrival rates in requests/second ('' to skip)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="Warm-up seconds before each target")
+    parser.add_argument("--load-workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help="Load generator processes")
+    parser.add_argument("--accept-encoding", default="identity", help="Accept-Encoding sent by the load generator")
+    parser.add_argument("--idle-connections", type=int, default=500, help="Connections held for the memory test")
+    parser.add_argument("--transports", default="tcp", help="Proxy -> upstream transports to compare: tcp,uds,h2c")
+    parser.add_argument("--output", default=None, help="Results file (default benchmark-results/proxy-<time>.json)")
+    args = parser.parse_args()
+
+    transports = ["tcp"] + [t for t in parse_list(args.transports, str) if t != "tcp"]
+    unknown = set(transports) - {"tcp", "uds", "h2c"}
+    if unknown:
+        parser.error(f"unknown transports: {', '.join(sorted(unknown))}")
+    if "h2c" in transports and not (h2_available() and importlib.util.find_spec("hypercorn")):
+        print("⚠️ h2c needs 'h2' and 'hypercorn' (pip install httpx[http2] hypercorn); skipping it")
+        transports.remove("h2c")
+
+    env = dict(os.environ)
+    env.pop("NODE_SERVER_URLS", None)
+    socket_dir = tempfile.mkdtemp(prefix="proxy-bench-")
+    processes: List[subprocess.Popen] = []
+    # name -> (base URL, load-generator transport); "direct-<t>"/"proxy-<t>" pairs per upstream transport
+    targets: Dict[str, Tuple[str, Optional[Tuple[str, Optional[str]]]]] = {}
+    headers = {"accept-encoding": args.accept_encoding}
+    scenarios: List[Dict[str, Any]] = []
+
+    try:
+        for transport in transports:
+            suffix = "" if transport == "tcp" else f"-{transport}"
+            stub_port, proxy_port = free_port(), free_port()
+            if transport == "uds":
+                stub_socket = os.path.join(socket_dir, "stub.sock")
+                processes.append(start_server("proxy_benchmark:stub_app", 0, env, uds=stub_socket))
+                upstream_url = f"unix:{stub_socket}"
+                targets["direct" + suffix] = ("http://localhost", ("uds", stub_socket))
+            elif transport == "h2c":
+                processes.append(start_h2c_server("proxy_benchmark:stub_app", stub_port, env))
+                upstream_url = f"h2c://127.0.0.1:{stub_port}"
+                targets["direct" + suffix] = (upstream_url.replace("h2c://", "http://"), ("h2c", None))
+            else:
+                processes.append(start_server("proxy_benchmark:stub_app", stub_port, env))
+                upstream_url = f"http://127.0.0.1:{stub_port}"
+                targets["direct" + suffix] = (upstream_url, None)
+            proxy = start_server("server:app", proxy_port, {**env, "NODE_SERVER_URL": upstream_url})
+            processes.append(proxy)
+            targets["proxy" + suffix] = (f"http://127.0.0.1:{proxy_port}", None)
+            if transport == "tcp":
+                memory_proxy = (proxy_port, proxy.pid)
+
+        for base_url, transport in targets.values():
+            wait_ready(base_url + "/health", transport=transport)
+        print(f"✅ Stub upstreams and proxies ready ({', '.join(transports)})")
+
+        levels = [("closed", c) for c in parse_list(args.concurrency, int)] + \
+                 [("open", r) for r in parse_list(args.rates)]
+        with ProcessPoolExecutor(max_workers=args.load_workers) as executor:
+            for size in parse_list(args.sizes, int):
+                for delay in parse_list(args.delays):
+                    path = f"/bench?size={size}&delay_ms={delay:g}"
+                    for mode, level in levels:
+                        scenario: Dict[str, Any] = {"mode": mode, "size": size, "delay_ms": delay,
+                                                    "concurrency" if mode == "closed" else "rate": level}
+                        for name, (base_url, transport) in targets.items():
+                            if args.warmup > 0:
+                                run_scenario(executor, args.load_workers, mode, base_url, path, level, args.warmup,
+                                             headers, transport)
+                            scenario[name] = run_scenario(executor, args.load_workers, mode, base_url, path,
+                                                          level, args.duration, headers, transport)
+                        for transport in transports:
+                            suffix = "" if transport == "tcp" else f"-{transport}"
+                            direct, proxied = scenario["direct" + suffix], scenario["proxy" + suffix]
+                            overhead = scenario["overhead_ms" + suffix] = {
+                                p: round(proxied[p] - direct[p], 3)
+                                for p in ("p50_ms", "p99_ms", "p999_ms")
+                                if proxied[p] is not None and direct[p] is not None
+                            }
+                            print(f"{mode:6} size={size:<7} delay={delay:<4g} level={level:<6g} {transport:4} "
+                                  f"proxy {proxied['rps']:>8} rps p50 {proxied['p50_ms']}ms p99 {proxied['p99_ms']}ms | "
+                                  f"direct {direct['rps']:>8} rps | overhead p50 {overhead.get('p50_ms')}ms")
+                        scenarios.append(scenario)
+
+        memory_port, memory_pid = memory_proxy
+        memory = asyncio.run(_hold_connections(memory_port, args.idle_connections, memory_pid, "/bench?size=64&n=mem"))
+        print(f"Memory per connection: {memory.get('rss_bytes_per_connection')} bytes")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "proxy_env": {k: v for k, v in os.environ.items() if k.startswith("PROXY_")},
+        "scenarios": scenarios,
+        "memory": memory,
+    }
+    output = args.output or os.path.join(BACKEND_DIR, "benchmark-results", f"proxy-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
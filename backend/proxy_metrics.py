@@ -0,0 +1,276 @@
+"""
+ESA Life CEO 61x21 Framework - Proxy Metrics
+Prometheus-style latency histograms, byte/status counters and event-loop lag for the proxy hot path
+
+Recording only touches plain ints and lists from the event loop thread, so it needs no locks.
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds (upper bounds, Prometheus `le`)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segments that identify a resource rather than a route
+_ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{12,}|[\w-]*\d[\w-]{15,})$"
+)
+
+
+# Anything else a client sends as the method is labelled "other", so it can't mint new series
+STANDARD_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "CONNECT", "TRACE"})
+
+_METRIC_NAME_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def route_template(path: str) -> str:
+    """Collapse ids in a path so metrics are labelled per route, e.g. /api/groups/42 -> /api/groups/:id"""
+    return "/".join(":id" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/")) or "/"
+
+
+def escape_label(value: str) -> str:
+    """Label value escaped for the text exposition format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _braced(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are stored per bucket and made cumulative when rendered"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    """Everything recorded for one (method, route template) pair"""
+
+    __slots__ = ("total", "upstream", "overhead", "request_bytes", "response_bytes", "status_classes")
+
+    def __init__(self):
+        self.total = Histogram()
+        self.upstream = Histogram()
+        self.overhead = Histogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_classes = [0] * 6  # index = status // 100
+
+
+class RequestTiming:
+    """Per-request scratch record; upstream time is added by the proxy while the request runs"""
+
+    __slots__ = ("upstream_seconds", "request_bytes", "response_bytes", "status", "headers_sent_at")
+
+    def __init__(self):
+        self.upstream_seconds: Optional[float] = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status = 0
+        self.headers_sent_at = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("proxy_request_timing", default=None)
+
+
+def record_upstream_latency(seconds: float):
+    """Attribute time spent waiting on an upstream (until response headers) to the current request"""
+    timing = current_request.get()
+    if timing is not None:
+        timing.upstream_seconds = (timing.upstream_seconds or 0.0) + seconds
+
+
+class ProxyMetrics:
+    """Registry of per-route metrics plus process-wide gauges
+
+    Only paths under `route_prefixes` get a series per route template; paths under
+    `grouped_prefixes` (e.g. static assets) share one series per prefix, and everything else,
+    including the arbitrary URLs of 404 probes, is labelled "other".
+    """
+
+    def __init__(self, max_routes: int = 200, route_prefixes: Iterable[str] = (),
+                 grouped_prefixes: Iterable[str] = ()):
+        self.max_routes = max_routes
+        self.route_prefixes = tuple(route_prefixes)
+        self.grouped_prefixes = tuple(grouped_prefixes)
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+        self.loop_lag_seconds = 0.0
+        self.loop_lag_max_seconds = 0.0
+        self.loop_lag = Histogram()
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def route_label(self, path: str) -> str:
+        if path == "/" or path.startswith(self.route_prefixes):
+            return route_template(path)
+        for prefix in self.grouped_prefixes:
+            if path.startswith(prefix):
+                return f"{prefix}*"
+        return "other"
+
+    def _route(self, method: str, path: str) -> RouteMetrics:
+        method = method if method in STANDARD_METHODS else "other"
+        key = (method, self.route_label(path))
+        metrics = self.routes.get(key)
+        if metrics is None:
+            # Bound label cardinality: unknown routes beyond the cap share one series
+            if len(self.routes) >= self.max_routes:
+                key = (method, "other")
+                metrics = self.routes.get(key)
+            if metrics is None:
+                metrics = self.routes[key] = RouteMetrics()
+        return metrics
+
+    def observe(self, method: str, path: str, timing: RequestTiming, started: float, finished: float):
+        metrics = self._route(method, path)
+        metrics.total.observe(finished - started)
+        if timing.upstream_seconds is not None:
+            metrics.upstream.observe(timing.upstream_seconds)
+            # Overhead is measured to the first response byte so streamed bodies don't count as proxy time
+            headers_at = timing.headers_sent_at or finished
+            metrics.overhead.observe(max(0.0, headers_at - started - timing.upstream_seconds))
+        metrics.request_bytes += timing.request_bytes
+        metrics.response_bytes += timing.response_bytes
+        metrics.status_classes[min(timing.status // 100, 5)] += 1
+
+    async def _measure_loop_lag(self, interval: float):
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.loop_lag_seconds = lag
+            self.loop_lag_max_seconds = max(self.loop_lag_max_seconds, lag)
+            self.loop_lag.observe(lag)
+
+    def start(self, interval: float = 0.5):
+        """Start sampling event-loop lag"""
+        self._lag_task = asyncio.create_task(self._measure_loop_lag(interval))
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    def render(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None,
+               counters: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """Prometheus text exposition; `gauges` adds {prefix: stats dict} snapshots of other components
+
+        `counters` holds the {prefix: totals} of those components that only ever grow (hits,
+        retries, evictions...); they are exported as proxy_<prefix>_<key>_total counters and left
+        out of the same prefix's gauges.
+        """
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: List[Tuple[str, Histogram]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{_braced(labels)} {hist.sum:.6f}")
+                lines.append(f"{name}_count{_braced(labels)} {hist.count}")
+
+        def counter(name: str, help_text: str, series: List[Tuple[str, float]], kind: str = "counter"):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                lines.append(f"{name}{_braced(labels)} {value}")
+
+        routes = sorted(self.routes.items())
+        label = lambda key: f'method="{escape_label(key[0])}",route="{escape_label(key[1])}"'  # noqa: E731
+        histogram("proxy_request_duration_seconds", "Total request latency as seen by the proxy",
+                  [(label(k), m.total) for k, m in routes])
+        histogram("proxy_upstream_duration_seconds", "Time waiting for upstream response headers",
+                  [(label(k), m.upstream) for k, m in routes if m.upstream.count])
+        histogram("proxy_overhead_duration_seconds", "Proxy time to first response byte minus upstream time",
+                  [(label(k), m.overhead) for k, m in routes if m.overhead.count])
+        counter("proxy_request_bytes_total", "Request body bytes received from clients",
+                [(label(k), m.request_bytes) for k, m in routes])
+        counter("proxy_response_bytes_total", "Response body bytes sent to clients",
+                [(label(k), m.response_bytes) for k, m in routes])
+        counter("proxy_responses_total", "Responses by status class",
+                [(f'{label(k)},status_class="{cls}xx"', n) for k, m in routes
+                 for cls, n in enumerate(m.status_classes) if n])
+        counter("proxy_requests_in_flight", "Requests currently being handled", [("", self.in_flight)], kind="gauge")
+        counter("proxy_event_loop_lag_seconds", "Most recent event-loop lag sample",
+                [("", round(self.loop_lag_seconds, 6))], kind="gauge")
+        counter("proxy_event_loop_lag_max_seconds", "Largest event-loop lag observed",
+                [("", round(self.loop_lag_max_seconds, 6))], kind="gauge")
+        histogram("proxy_event_loop_lag_distribution_seconds", "Event-loop lag samples", [("", self.loop_lag)])
+
+        counters = counters or {}
+        for prefix, totals in counters.items():
+            for key, value in totals.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = _METRIC_NAME_INVALID.sub("_", f"proxy_{prefix}_{key}_total")
+                    counter(name, f"{prefix} {key.replace('_', ' ')}", [("", value)])
+        for prefix, stats in (gauges or {}).items():
+            totals = counters.get(prefix, {})
+            for key, value in stats.items():
+                if key not in totals and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = _METRIC_NAME_INVALID.sub("_", f"proxy_{prefix}_{key}")
+                    counter(name, f"{prefix} {key.replace('_', ' ')}", [("", value)], kind="gauge")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request and counting its bytes and status"""
+
+    def __init__(self, app, metrics: ProxyMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_request.set(timing)
+        started = time.perf_counter()
+        self.metrics.in_flight += 1
+
+        async def receive_counting():
+            message = await receive()
+            if message["type"] == "http.request":
+                timing.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counting(message):
+            if message["type"] == "http.response.start":
+                timing.status = message["status"]
+                timing.headers_sent_at = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                timing.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_counting, send_counting)
+        finally:
+            self.metrics.in_flight -= 1
+            if not timing.status:
+                timing.status = 500
+            self.metrics.observe(scope["method"], scope["path"], timing, started, time.perf_counter())
+            current_request.reset(token)
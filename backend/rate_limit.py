@@ -0,0 +1,193 @@
+"""
+ESA Life CEO 61x21 Framework - Rate Limiting
+Per-client token buckets keyed by IP, user token or route, so abusive clients are turned away before Node
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional
+
+RATE_LIMIT_KEYS = ("ip", "user", "route")
+
+
+class RateLimitRule:
+    """`requests` per `seconds` (bucket size `burst`) for paths under `prefix`, counted per `key`"""
+
+    __slots__ = ("index", "prefix", "rate", "burst", "key", "limited")
+
+    def __init__(self, index: int, prefix: str, requests: float, seconds: float, key: str = "ip",
+                 burst: Optional[float] = None):
+        if key not in RATE_LIMIT_KEYS:
+            raise ValueError(f"Rate limit key must be one of {RATE_LIMIT_KEYS}, got {key!r}")
+        if requests <= 0 or seconds <= 0:
+            raise ValueError(f"Rate limit for {prefix} must allow a positive rate")
+        self.index = index
+        self.prefix = prefix
+        self.rate = requests / seconds
+        self.burst = max(1.0, burst if burst is not None else requests)
+        self.key = key
+        self.limited = 0
+
+
+def parse_rules(spec: str, workers: int = 1) -> List[RateLimitRule]:
+    """Parse "prefix:requests/seconds:key[:burst]" entries separated by commas
+
+    e.g. "/api/auth/login:10/60:ip,/api/events:20/1:user:40". Longer prefixes take precedence.
+    The limits are totals across `workers` processes, each of which enforces its share.
+    """
+    rules: List[RateLimitRule] = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) not in (3, 4) or "/" not in parts[1]:
+            raise ValueError(f"Invalid rate limit rule {entry!r}; expected prefix:requests/seconds:key[:burst]")
+        requests, seconds = parts[1].split("/", 1)
+        burst = float(parts[3]) / workers if len(parts) == 4 else None
+        rules.append(RateLimitRule(len(rules), parts[0], float(requests) / workers, float(seconds), parts[2], burst))
+    return sorted(rules, key=lambda r: len(r.prefix), reverse=True)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "full_at")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.full_at = updated
+
+
+class RateLimiter:
+    """Token buckets in `shards` LRU maps, refilled lazily on access
+
+    A bucket that has refilled completely holds no information (a new one would start full),
+    so buckets past their `full_at` time are dropped from the cold end of their shard as other
+    keys arrive; `max_keys` caps memory when millions of distinct clients show up at once, at
+    the cost of resetting the least recently seen clients. Sharding keeps each dict small, so
+    resizes and eviction never stall the event loop the way one huge map would.
+
+    Credentials are not verified here, so a "user" rule also charges the client's IP, whose
+    bucket allows `users_per_ip` times the rule: inventing a new token per request only buys
+    that much, while users sharing an address (NAT, offices) still get their own limits.
+    """
+
+    def __init__(self, rules: List[RateLimitRule], shards: int = 64, max_keys: int = 200_000,
+                 trusted_hops: int = 0, session_cookie: str = "connect.sid", users_per_ip: float = 4):
+        self.rules = rules
+        self.prefixes = tuple(rule.prefix for rule in rules)
+        shards = 1 << max(0, (shards - 1).bit_length())
+        self.mask = shards - 1
+        self.shards: List["OrderedDict[str, _Bucket]"] = [OrderedDict() for _ in range(shards)]
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self.trusted_hops = trusted_hops
+        self.session_cookie = session_cookie + "="
+        self.users_per_ip = max(1.0, users_per_ip)
+        self.stats_counters = {"allowed": 0, "limited": 0, "evicted_idle": 0, "evicted_capacity": 0}
+
+    def match(self, path: str) -> Optional[RateLimitRule]:
+        if not path.startswith(self.prefixes):
+            return None
+        for rule in self.rules:
+            if path.startswith(rule.prefix):
+                return rule
+        return None
+
+    def client_ip(self, headers: Mapping[str, str], peer: Optional[str]) -> str:
+        """Client address: the peer, or with `trusted_hops` proxies in front of us the X-Forwarded-For entry they added
+
+        X-Forwarded-For is only read when trusted_hops is set; otherwise any client could pick its own key.
+        """
+        forwarded = headers.get("x-forwarded-for") if self.trusted_hops > 0 else None
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",")]
+            return hops[-min(self.trusted_hops, len(hops))]
+        return peer or "unknown"
+
+    def client_key(self, rule: RateLimitRule, headers: Mapping[str, str], peer: Optional[str]) -> str:
+        if rule.key == "route":
+            return f"{rule.index}"
+        if rule.key == "user":
+            credential = self.credential(headers)
+            if credential:
+                # Hashed so long bearer tokens don't inflate the map (and never sit in memory verbatim)
+                return f"{rule.index}u{hashlib.blake2b(credential.encode(), digest_size=9).hexdigest()}"
+        return self.ip_key(rule, headers, peer)
+
+    def ip_key(self, rule: RateLimitRule, headers: Mapping[str, str], peer: Optional[str]) -> str:
+        return f"{rule.index}i{self.client_ip(headers, peer)}"
+
+    def credential(self, headers: Mapping[str, str]) -> Optional[str]:
+        """Bearer token or session cookie, as sent (not verified)"""
+        return headers.get("authorization") or self._session(headers.get("cookie", ""))
+
+    def _session(self, cookie: str) -> Optional[str]:
+        start = cookie.find(self.session_cookie)
+        if start < 0:
+            return None
+        start += len(self.session_cookie)
+        end = cookie.find(";", start)
+        return cookie[start:end if end >= 0 else None]
+
+    def check(self, path: str, headers: Mapping[str, str], peer: Optional[str]) -> float:
+        """Take a token for this request; 0 when allowed, otherwise seconds until one is available"""
+        rule = self.match(path)
+        if rule is None:
+            return 0.0
+        now = time.monotonic()
+        key = self.client_key(rule, headers, peer)
+        charges = [(self._bucket(key, rule.rate, rule.burst, now), rule.rate, rule.burst)]
+        if rule.key == "user" and self.credential(headers):
+            rate, burst = rule.rate * self.users_per_ip, rule.burst * self.users_per_ip
+            charges.append((self._bucket(self.ip_key(rule, headers, peer), rate, burst, now), rate, burst))
+
+        wait = max((1 - bucket.tokens) / rate for bucket, rate, _ in charges)
+        if wait <= 0:
+            for bucket, rate, burst in charges:
+                bucket.tokens -= 1
+                bucket.full_at = now + (burst - bucket.tokens) / rate
+            self.stats_counters["allowed"] += 1
+            return 0.0
+        rule.limited += 1
+        self.stats_counters["limited"] += 1
+        return wait
+
+    def _bucket(self, key: str, rate: float, burst: float, now: float) -> _Bucket:
+        """The bucket for `key`, refilled up to now"""
+        shard = self.shards[hash(key) & self.mask]
+        bucket = shard.get(key)
+        if bucket is None:
+            self._evict(shard, now)
+            bucket = shard[key] = _Bucket(burst, now)
+        else:
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+            shard.move_to_end(key)
+        return bucket
+
+    def _evict(self, shard: "OrderedDict[str, _Bucket]", now: float):
+        # Amortised O(1): at most two idle buckets per new key, plus whatever the capacity cap forces out
+        for _ in range(2):
+            if not shard:
+                return
+            key, bucket = next(iter(shard.items()))
+            if bucket.full_at > now:
+                break
+            del shard[key]
+            self.stats_counters["evicted_idle"] += 1
+        while len(shard) >= self.max_keys_per_shard:
+            shard.popitem(last=False)
+            self.stats_counters["evicted_capacity"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats_counters,
+            "keys": sum(len(shard) for shard in self.shards),
+            "max_keys": self.max_keys_per_shard * len(self.shards),
+            "rules": [
+                {"prefix": r.prefix, "rate_per_second": round(r.rate, 4), "burst": r.burst, "key": r.key,
+                 "limited": r.limited}
+                for r in self.rules
+            ],
+        }
@@ -0,0 +1,208 @@
+"""
+ESA Life CEO 61x21 Framework - Realtime Pass-through
+WebSocket proxying and unbuffered Server-Sent Events relay with per-connection metrics
+"""
+
+import asyncio
+import itertools
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect
+
+try:
+    from websockets.asyncio.client import connect as websocket_connect, unix_connect
+    from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidStatus
+except ImportError:
+    websocket_connect = None
+
+# Handshake headers owned by each WebSocket hop; everything else is forwarded to the upstream
+WEBSOCKET_HANDSHAKE_HEADERS = {
+    "host", "connection", "upgrade", "sec-websocket-key", "sec-websocket-version",
+    "sec-websocket-extensions", "sec-websocket-protocol", "sec-websocket-accept",
+}
+
+
+class ConnectionStats:
+    """Traffic counters for one WebSocket or SSE connection"""
+
+    __slots__ = ("id", "kind", "path", "upstream", "opened_at", "last_activity",
+                 "messages_in", "messages_out", "bytes_in", "bytes_out")
+
+    def __init__(self, connection_id: int, kind: str, path: str, upstream: str):
+        self.id = connection_id
+        self.kind = kind
+        self.path = path
+        self.upstream = upstream
+        self.opened_at = time.monotonic()
+        self.last_activity = self.opened_at
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def client_to_upstream(self, size: int):
+        self.messages_in += 1
+        self.bytes_in += size
+        self.last_activity = time.monotonic()
+
+    def upstream_to_client(self, size: int, messages: int = 1):
+        self.messages_out += messages
+        self.bytes_out += size
+        self.last_activity = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "path": self.path,
+            "upstream": self.upstream,
+            "age_seconds": round(now - self.opened_at, 1),
+            "idle_seconds": round(now - self.last_activity, 1),
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+class RealtimeMetrics:
+    """Active connections plus totals folded in from closed ones"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.active: Dict[int, ConnectionStats] = {}
+        self.totals = {
+            "websocket_opened": 0, "websocket_rejected": 0, "sse_opened": 0, "idle_closed": 0,
+            "messages_in": 0, "messages_out": 0, "bytes_in": 0, "bytes_out": 0,
+        }
+
+    def open(self, kind: str, path: str, upstream: str) -> ConnectionStats:
+        stats = ConnectionStats(next(self._ids), kind, path, upstream)
+        self.active[stats.id] = stats
+        self.totals[f"{kind}_opened"] += 1
+        return stats
+
+    def close(self, stats: ConnectionStats):
+        if self.active.pop(stats.id, None) is not None:
+            self.totals["messages_in"] += stats.messages_in
+            self.totals["messages_out"] += stats.messages_out
+            self.totals["bytes_in"] += stats.bytes_in
+            self.totals["bytes_out"] += stats.bytes_out
+
+    def stats(self, include_connections: bool = False) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            **self.totals,
+            "websocket_active": sum(1 for c in self.active.values() if c.kind == "websocket"),
+            "sse_active": sum(1 for c in self.active.values() if c.kind == "sse"),
+        }
+        if include_connections:
+            summary["connections"] = [c.snapshot() for c in self.active.values()]
+        return summary
+
+
+async def relay_sse(body: AsyncIterator[bytes], metrics: RealtimeMetrics, path: str, upstream: str) -> AsyncIterator[bytes]:
+    """Pass an event stream through chunk by chunk, counting events and bytes for the connection"""
+    stats = metrics.open("sse", path, upstream)
+    try:
+        async for chunk in body:
+            # One chunk may carry several events; count event terminators rather than chunks
+            stats.upstream_to_client(len(chunk), messages=chunk.count(b"\n\n"))
+            yield chunk
+    finally:
+        metrics.close(stats)
+        await body.aclose()
+
+
+async def proxy_websocket(websocket: WebSocket, upstream_url: str, metrics: RealtimeMetrics,
+                          idle_timeout: float, max_message_bytes: int, max_queue: int,
+                          unix_socket: Optional[str] = None):
+    """Bridge a client WebSocket to the upstream until either side closes or the connection idles out
+
+    Backpressure: each pump awaits the send on the other side before reading again, and the
+    upstream client buffers at most `max_queue` incoming messages.
+    """
+    if websocket_connect is None:
+        print("⚠️ WebSocket proxying needs the 'websockets' package (pip install websockets)")
+        await websocket.close(code=1011)
+        return
+
+    headers = [(k, v) for k, v in websocket.headers.items() if k not in WEBSOCKET_HANDSHAKE_HEADERS]
+    subprotocols: List[str] = [
+        p.strip() for p in websocket.headers.get("sec-websocket-protocol", "").split(",") if p.strip()
+    ]
+
+    try:
+        connect = websocket_connect if unix_socket is None else partial(unix_connect, unix_socket)
+        upstream = await connect(
+            upstream_url,
+            additional_headers=headers,
+            subprotocols=subprotocols or None,
+            compression=None,
+            max_size=max_message_bytes,
+            max_queue=max_queue,
+            open_timeout=10,
+        )
+    except (OSError, InvalidHandshake, asyncio.TimeoutError) as e:
+        metrics.totals["websocket_rejected"] += 1
+        print(f"⚠️ WebSocket upstream connection failed for {upstream_url}: {e}")
+        status = e.response.status_code if isinstance(e, InvalidStatus) else 502
+        await websocket.close(code=1011 if status >= 500 else 1008)
+        return
+
+    stats = metrics.open("websocket", websocket.url.path, upstream_url)
+    await websocket.accept(subprotocol=upstream.subprotocol)
+
+    async def client_to_upstream():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                await upstream.close(code=message.get("code", 1000))
+                return
+            data = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+            if data is None:
+                continue
+            stats.client_to_upstream(len(data))
+            await upstream.send(data)
+
+    async def upstream_to_client():
+        try:
+            async for data in upstream:
+                stats.upstream_to_client(len(data))
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
+        except ConnectionClosed:
+            pass
+        code = upstream.close_code or 1000
+        await websocket.close(code=code if code != 1005 else 1000)
+
+    async def idle_watchdog():
+        while True:
+            remaining = idle_timeout - (time.monotonic() - stats.last_activity)
+            if remaining <= 0:
+                metrics.totals["idle_closed"] += 1
+                await upstream.close(code=1001, reason="idle timeout")
+                await websocket.close(code=1001)
+                return
+            await asyncio.sleep(remaining)
+
+    pumps = [asyncio.create_task(client_to_upstream()), asyncio.create_task(upstream_to_client())]
+    if idle_timeout > 0:
+        pumps.append(asyncio.create_task(idle_watchdog()))
+    try:
+        await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pumps:
+            task.cancel()
+        for task in pumps:
+            try:
+                await task
+            except (asyncio.CancelledError, ConnectionClosed, WebSocketDisconnect, RuntimeError):
+                pass
+        await upstream.close()
+        metrics.close(stats)
@@ -0,0 +1,190 @@
+"""
+ESA Life CEO 61x21 Framework - Proxy Response Cache
+In-process LRU cache for idempotent GET responses, following Cache-Control, ETag and Vary
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: argument}"""
+    directives: Dict[str, Optional[str]] = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _seconds(directives: Dict[str, Optional[str]], name: str) -> Optional[int]:
+    try:
+        return max(0, int(directives[name])) if directives.get(name) is not None else None
+    except ValueError:
+        return None
+
+
+def header_value(headers: RawHeaders, name: bytes) -> Optional[str]:
+    """First value of a header in a raw header list"""
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CachedResponse:
+    """A stored upstream response with its freshness information"""
+
+    __slots__ = ("status_code", "headers", "body", "etag", "stored_at", "max_age", "stale_while_revalidate", "size")
+
+    def __init__(self, status_code: int, headers: RawHeaders, body: bytes, max_age: int, stale_while_revalidate: int):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = header_value(headers, b"etag")
+        self.stored_at = time.monotonic()
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers)
+
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.stored_at < self.max_age
+
+    def can_serve_stale(self) -> bool:
+        return time.monotonic() - self.stored_at < self.max_age + self.stale_while_revalidate
+
+    def merge_headers(self, headers: RawHeaders):
+        """Adopt the headers of a 304 Not Modified, which replace the stored ones of the same name"""
+        updated = {k for k, _ in headers if k != b"content-length"}
+        self.headers = [(k, v) for k, v in self.headers if k not in updated] + [(k, v) for k, v in headers if k in updated]
+        self.etag = header_value(self.headers, b"etag")
+
+
+class ResponseCache:
+    """Byte-budgeted LRU cache for GET responses under a set of path prefixes"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int, path_prefixes: List[str], default_ttl: int = 0):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.path_prefixes = tuple(path_prefixes)
+        self.default_ttl = default_ttl
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # Vary header names per URL, learned from the most recent stored response (bounded LRU)
+        self.vary: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self.max_vary_urls = 10000
+        self.current_bytes = 0
+        self.stats_counters = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "revalidations": 0,
+            "not_modified": 0, "stores": 0, "evictions": 0, "uncacheable": 0,
+        }
+
+    def is_cacheable_request(self, method: str, path: str, headers: Dict[str, str]) -> bool:
+        """Whether a client request may be answered from (or stored into) the cache"""
+        if method != "GET" or not path.startswith(self.path_prefixes):
+            return False
+        return "no-store" not in parse_cache_control(headers.get("cache-control"))
+
+    def _key(self, url: str, headers: Dict[str, str], vary: Tuple[str, ...]) -> str:
+        return url + "".join(f"\n{name}:{headers.get(name, '')}" for name in vary)
+
+    def lookup(self, url: str, headers: Dict[str, str]) -> Tuple[str, Optional[CachedResponse]]:
+        """Find the stored variant for a request; returns (key, entry or None)"""
+        key = self._key(url, headers, self.vary.get(url, ()))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return key, entry
+
+    def freshness(self, response_headers: RawHeaders, request_headers: Dict[str, str]) -> Optional[Tuple[int, int]]:
+        """(max_age, stale_while_revalidate) for a storable response, or None if it must not be stored"""
+        directives = parse_cache_control(header_value(response_headers, b"cache-control"))
+        if "no-store" in directives or "private" in directives:
+            return None
+        if header_value(response_headers, b"set-cookie") is not None:
+            return None
+        if header_value(response_headers, b"vary") == "*":
+            return None
+        # Shared-cache rule: authenticated responses need explicit permission to be stored
+        if "authorization" in request_headers and not ({"public", "s-maxage", "must-revalidate"} & directives.keys()):
+            return None
+
+        max_age = _seconds(directives, "s-maxage")
+        if max_age is None:
+            max_age = _seconds(directives, "max-age")
+        if "no-cache" in directives:
+            max_age = 0
+        elif max_age is None:
+            max_age = self.default_ttl
+        swr = _seconds(directives, "stale-while-revalidate") or 0
+
+        # Nothing to gain from an entry that is never fresh and cannot be revalidated
+        if max_age == 0 and swr == 0 and header_value(response_headers, b"etag") is None:
+            return None
+        return max_age, swr
+
+    def store(self, url: str, request_headers: Dict[str, str], status_code: int,
+              response_headers: RawHeaders, body: bytes) -> bool:
+        """Store a 200 response if its headers allow it; returns True when stored"""
+        freshness = self.freshness(response_headers, request_headers) if status_code == 200 else None
+        if freshness is None or len(body) > self.max_entry_bytes:
+            self.stats_counters["uncacheable"] += 1
+            return False
+
+        vary_header = header_value(response_headers, b"vary") or ""
+        vary = {name.strip().lower() for name in vary_header.split(",") if name.strip()}
+        if header_value(response_headers, b"content-encoding") is not None:
+            vary.add("accept-encoding")
+        self.vary[url] = tuple(sorted(vary))
+        self.vary.move_to_end(url)
+        while len(self.vary) > self.max_vary_urls:
+            self.vary.popitem(last=False)
+
+        key = self._key(url, request_headers, self.vary[url])
+        existing = self.entries.get(key)
+        if existing is not None and existing.body is body:
+            # Coalesced requests share one body; the leader already stored it
+            return True
+        self.remove(key)
+        entry = CachedResponse(status_code, response_headers, body, *freshness)
+        self.entries[key] = entry
+        self.current_bytes += entry.size
+        self.stats_counters["stores"] += 1
+        self._evict()
+        return True
+
+    def revalidated(self, entry: CachedResponse, response_headers: RawHeaders, request_headers: Dict[str, str]):
+        """Refresh an entry after the upstream answered 304 Not Modified"""
+        self.stats_counters["not_modified"] += 1
+        entry.merge_headers(response_headers)
+        entry.max_age, entry.stale_while_revalidate = self.freshness(entry.headers, request_headers) or (0, 0)
+        entry.stored_at = time.monotonic()
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.current_bytes -= entry.size
+            self.stats_counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters plus current occupancy"""
+        lookups = self.stats_counters["hits"] + self.stats_counters["stale_hits"] + self.stats_counters["misses"]
+        return {
+            **self.stats_counters,
+            "hit_ratio": round((self.stats_counters["hits"] + self.stats_counters["stale_hits"]) / lookups, 4) if lookups else 0,
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,82 @@
+"""
+ESA Life CEO 61x21 Framework - Retry Budget and Hedging Delay
+Bounds how much extra upstream traffic retries and hedged requests may add, and when to hedge
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class RetryBudget:
+    """Token bucket shared by every retry and hedge
+
+    Each original request deposits `ratio` tokens and a trickle of `min_per_second` keeps
+    low-traffic periods retryable; each retry or hedge spends one token. When upstreams fail
+    wholesale the bucket drains, so extra attempts stay near `ratio` of normal traffic instead
+    of multiplying the load on an already struggling pool.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 5.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated = time.monotonic()
+        self.stats_counters = {"requests": 0, "spent": 0, "denied": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def deposit(self):
+        """Account for one original request"""
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+        self.stats_counters["requests"] += 1
+
+    def try_spend(self) -> bool:
+        """Take a token for a retry or hedge; False when the budget is exhausted"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.stats_counters["spent"] += 1
+            return True
+        self.stats_counters["denied"] += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {**self.stats_counters, "tokens": round(self.tokens, 2), "ratio": self.ratio}
+
+
+class LatencyTracker:
+    """Percentile of recent upstream latencies, recomputed every `recompute_every` samples"""
+
+    def __init__(self, percentile: float = 95.0, window: int = 1000, min_samples: int = 20,
+                 recompute_every: int = 50):
+        self.percentile = percentile
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.recompute_every = recompute_every
+        self._since_recompute = 0
+        self._value: Optional[float] = None
+
+    def observe(self, latency_ms: float):
+        self.samples.append(latency_ms)
+        self._since_recompute += 1
+        if self._value is None or self._since_recompute >= self.recompute_every:
+            self._recompute()
+
+    def _recompute(self):
+        self._since_recompute = 0
+        if len(self.samples) < self.min_samples:
+            self._value = None
+            return
+        ordered = sorted(self.samples)
+        self._value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def value(self) -> Optional[float]:
+        """Current percentile in ms, or None until enough samples have been seen"""
+        return self._value
@@ -4,53 +4,947 @@ ESA Life CEO 61x21 Framework - Backend Proxy
 This Python FastAPI server acts as a proxy to the Node.js application
 """
 
-from fastapi import FastAPI, Request
-from fastapi.responses import Response
+import asyncio
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Collection, Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 import uvicorn
 import os
 
-app = FastAPI(title="Life CEO Backend Proxy")
+import prefork
+from batch import BATCH_IGNORED_HEADERS, BatchError, SubRequest, encode_result, error_result, parse_batch
+from compression import Compressor
+from load_shedding import AdaptiveLimiter, CircuitBreaker, Overloaded
+from proxy_metrics import MetricsMiddleware, ProxyMetrics, RequestTiming, current_request, record_upstream_latency
+from rate_limit import RateLimiter, parse_rules
+from realtime import RealtimeMetrics, proxy_websocket, relay_sse
+from retries import LatencyTracker, RetryBudget
+from response_cache import CachedResponse, RawHeaders, ResponseCache, header_value, parse_cache_control
+from single_flight import FOLLOWER, LEADER, SharedResponse, SingleFlight
+from static_assets import StaticAsset, StaticIndex
+from upstream_client import build_upstream_client, pool_stats, uds_path
+from upstream_pool import Upstream, UpstreamPool
+
+NODE_SERVER_URL = os.getenv("NODE_SERVER_URL", "http://localhost:5000")
+
+# Several Node.js workers can be listed, comma-separated; defaults to NODE_SERVER_URL alone.
+# Each may be http://host:port, h2c://host:port or unix:/path/to/node.sock (see upstream_client.py)
+NODE_SERVER_URLS = [u.strip() for u in os.getenv("NODE_SERVER_URLS", NODE_SERVER_URL).split(",") if u.strip()]
+
+upstream_pool = UpstreamPool(
+    NODE_SERVER_URLS,
+    strategy=os.getenv("PROXY_LB_STRATEGY", "p2c"),
+    health_path=os.getenv("PROXY_HEALTH_PATH", "/health"),
+    health_interval=float(os.getenv("PROXY_HEALTH_INTERVAL", "5")),
+    unhealthy_threshold=int(os.getenv("PROXY_UNHEALTHY_THRESHOLD", "3")),
+    healthy_threshold=int(os.getenv("PROXY_HEALTHY_THRESHOLD", "2")),
+    slow_start=float(os.getenv("PROXY_SLOW_START", "30")),
+)
+
+# Adaptive concurrency limit and per-upstream circuit breakers
+PROXY_ADAPTIVE_LIMIT = os.getenv("PROXY_ADAPTIVE_LIMIT", "true").lower() in ("1", "true", "yes")
+
+concurrency_limiter = AdaptiveLimiter(
+    initial_limit=int(os.getenv("PROXY_LIMIT_INITIAL", "50")),
+    min_limit=int(os.getenv("PROXY_LIMIT_MIN", "5")),
+    max_limit=int(os.getenv("PROXY_LIMIT_MAX", "500")),
+    latency_tolerance=float(os.getenv("PROXY_LIMIT_LATENCY_TOLERANCE", "2.0")),
+    max_queue=int(os.getenv("PROXY_QUEUE_MAX", "100")),
+    queue_timeout=float(os.getenv("PROXY_QUEUE_TIMEOUT", "1.0")),
+) if PROXY_ADAPTIVE_LIMIT else None
+
+# Statuses that mean the upstream itself is failing (an application 500 does not trip the breaker)
+UPSTREAM_FAILURE_STATUSES = {502, 503, 504}
+
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    upstream.url: CircuitBreaker(
+        failure_threshold=int(os.getenv("PROXY_BREAKER_FAILURES", "5")),
+        open_seconds=float(os.getenv("PROXY_BREAKER_OPEN_SECONDS", "10")),
+    )
+    for upstream in upstream_pool.upstreams
+}
+
+# Rate limits and memory budgets below are for the whole proxy; under the supervisor each worker takes its share
+PROXY_WORKER_COUNT = prefork.worker_count()
+
+# Per-client token-bucket rate limits: "prefix:requests/seconds:ip|user|route[:burst]", comma-separated
+PROXY_RATE_LIMIT_ENABLED = os.getenv("PROXY_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+PROXY_RATE_LIMITS = os.getenv("PROXY_RATE_LIMITS", "/api/auth/login:10/60:ip,/api/events:20/1:user:40")
+
+rate_limiter = RateLimiter(
+    parse_rules(PROXY_RATE_LIMITS, PROXY_WORKER_COUNT),
+    shards=int(os.getenv("PROXY_RATE_LIMIT_SHARDS", "64")),
+    max_keys=int(os.getenv("PROXY_RATE_LIMIT_MAX_KEYS", "200000")),
+    # Proxies in front of this one that append X-Forwarded-For (e.g. 1 behind the platform ingress);
+    # 0 keys on the peer address, since without a trusted proxy the header is client-controlled
+    trusted_hops=int(os.getenv("PROXY_TRUSTED_HOPS", "0")),
+    session_cookie=os.getenv("PROXY_RATE_LIMIT_SESSION_COOKIE", "connect.sid"),
+    # Credentials aren't verified here, so per-user limits also cap each IP at this many users' worth
+    users_per_ip=float(os.getenv("PROXY_RATE_LIMIT_USERS_PER_IP", "4")),
+) if PROXY_RATE_LIMIT_ENABLED and PROXY_RATE_LIMITS.strip() else None
+
+# Hedging and connect-error retries for GET/HEAD, sharing one retry budget
+PROXY_HEDGING = os.getenv("PROXY_HEDGING", "false").lower() in ("1", "true", "yes")
+PROXY_HEDGE_MIN_DELAY_MS = float(os.getenv("PROXY_HEDGE_MIN_DELAY_MS", "10"))
+PROXY_HEDGE_MAX_DELAY_MS = float(os.getenv("PROXY_HEDGE_MAX_DELAY_MS", "2000"))
+PROXY_RETRY_ATTEMPTS = int(os.getenv("PROXY_RETRY_ATTEMPTS", "2"))
+RETRYABLE_METHODS = ("GET", "HEAD")
+
+retry_budget = RetryBudget(
+    ratio=float(os.getenv("PROXY_RETRY_BUDGET_RATIO", "0.1")),
+    min_per_second=float(os.getenv("PROXY_RETRY_BUDGET_MIN_PER_SECOND", "5")),
+)
+hedge_latency = LatencyTracker(percentile=float(os.getenv("PROXY_HEDGE_PERCENTILE", "95")))
+retry_counters = {"retries": 0, "hedges": 0, "hedge_wins": 0}
+
+# Pipe request/response bodies instead of buffering them (set to false to buffer)
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Connection-scoped headers that must not be forwarded by a proxy (RFC 9110 section 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade",
+}
+
+# Headers uvicorn always adds itself; relaying the upstream copies would duplicate them
+SERVER_MANAGED_HEADERS = {"date", "server"}
+
+# Response cache for idempotent GETs on hot list endpoints
+PROXY_CACHE_ENABLED = os.getenv("PROXY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PROXY_CACHE_MAX_BYTES = int(os.getenv("PROXY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROXY_CACHE_MAX_ENTRY_BYTES = int(os.getenv("PROXY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+PROXY_CACHE_PATHS = os.getenv("PROXY_CACHE_PATHS", "/api/groups,/api/events,/api/memories").split(",")
+PROXY_CACHE_DEFAULT_TTL = int(os.getenv("PROXY_CACHE_DEFAULT_TTL", "0"))
+
+response_cache = ResponseCache(
+    max_bytes=PROXY_CACHE_MAX_BYTES,
+    max_entry_bytes=PROXY_CACHE_MAX_ENTRY_BYTES,
+    path_prefixes=[p.strip() for p in PROXY_CACHE_PATHS if p.strip()],
+    default_ttl=PROXY_CACHE_DEFAULT_TTL,
+) if PROXY_CACHE_ENABLED else None
+
+# Single-flight coalescing of identical concurrent GETs
+PROXY_COALESCE_ENABLED = os.getenv("PROXY_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+PROXY_COALESCE_KEY_HEADERS = os.getenv(
+    "PROXY_COALESCE_KEY_HEADERS", "authorization,cookie,accept,accept-encoding,accept-language"
+).split(",")
+PROXY_COALESCE_MAX_BODY_BYTES = int(os.getenv("PROXY_COALESCE_MAX_BODY_BYTES", str(256 * 1024)))
+PROXY_COALESCE_MAX_WAITERS = int(os.getenv("PROXY_COALESCE_MAX_WAITERS", "1000"))
+
+single_flight = SingleFlight(
+    key_headers=[h.strip() for h in PROXY_COALESCE_KEY_HEADERS if h.strip()],
+    max_body_bytes=PROXY_COALESCE_MAX_BODY_BYTES,
+    max_waiters=PROXY_COALESCE_MAX_WAITERS,
+) if PROXY_COALESCE_ENABLED else None
+
+# gzip/brotli compression of buffered responses, run in a thread pool
+PROXY_COMPRESSION_ENABLED = os.getenv("PROXY_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+compressor = Compressor(
+    min_bytes=int(os.getenv("PROXY_COMPRESSION_MIN_BYTES", "1024")),
+    gzip_level=int(os.getenv("PROXY_COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("PROXY_COMPRESSION_BROTLI_QUALITY", "5")),
+    workers=int(os.getenv("PROXY_COMPRESSION_WORKERS", "2")),
+    memo_max_bytes=int(os.getenv("PROXY_COMPRESSION_MEMO_BYTES", str(32 * 1024 * 1024))) // PROXY_WORKER_COUNT,
+) if PROXY_COMPRESSION_ENABLED else None
+
+# WebSocket and Server-Sent Events pass-through; long-poll paths (socket.io fallback) get the same treatment
+PROXY_REALTIME_PATHS = [p.strip() for p in os.getenv("PROXY_REALTIME_PATHS", "/socket.io/").split(",") if p.strip()]
+PROXY_SSE_IDLE_TIMEOUT = float(os.getenv("PROXY_SSE_IDLE_TIMEOUT", "300"))
+PROXY_WS_IDLE_TIMEOUT = float(os.getenv("PROXY_WS_IDLE_TIMEOUT", "300"))
+PROXY_WS_MAX_MESSAGE_BYTES = int(os.getenv("PROXY_WS_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+PROXY_WS_MAX_QUEUE = int(os.getenv("PROXY_WS_MAX_QUEUE", "16"))
+realtime_metrics = RealtimeMetrics()
+
+# Built client assets served straight from disk (Vite output in client/dist, then public/)
+PROXY_STATIC_ENABLED = os.getenv("PROXY_STATIC_ENABLED", "true").lower() in ("1", "true", "yes")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROXY_STATIC_ROOTS = os.getenv("PROXY_STATIC_ROOTS", "client/dist,public").split(",")
+PROXY_STATIC_PREFIXES = os.getenv("PROXY_STATIC_PREFIXES", "/assets/,/images/,/icons/,/fonts/").split(",")
+
+static_index = StaticIndex(
+    roots=[os.path.join(PROJECT_ROOT, r.strip()) for r in PROXY_STATIC_ROOTS if r.strip()],
+    prefixes=[p.strip() for p in PROXY_STATIC_PREFIXES if p.strip()],
+    inline_max_bytes=int(os.getenv("PROXY_STATIC_INLINE_MAX_BYTES", str(64 * 1024))),
+    memory_max_bytes=int(os.getenv("PROXY_STATIC_MEMORY_MAX_BYTES", str(32 * 1024 * 1024))) // PROXY_WORKER_COUNT,
+    # Seconds between cheap change checks; the roots are only walked again when something changed
+    refresh_interval=float(os.getenv("PROXY_STATIC_REFRESH_INTERVAL", "2")),
+) if PROXY_STATIC_ENABLED else None
+
+# /batch: several API calls in one round trip, fanned out concurrently through the proxy pipeline
+PROXY_BATCH_MAX_REQUESTS = int(os.getenv("PROXY_BATCH_MAX_REQUESTS", "20"))
+PROXY_BATCH_CONCURRENCY = int(os.getenv("PROXY_BATCH_CONCURRENCY", "6"))
+PROXY_BATCH_MAX_BODY_BYTES = int(os.getenv("PROXY_BATCH_MAX_BODY_BYTES", str(1024 * 1024)))
+PROXY_BATCH_PATHS = [p.strip() for p in os.getenv("PROXY_BATCH_PATHS", "/api/").split(",") if p.strip()]
+
+# Prometheus-style metrics for the hot path. Only paths under the route prefixes get a series per
+# route; static and realtime paths get one per prefix, and anything else (404 probes included) is "other"
+PROXY_METRICS_ENABLED = os.getenv("PROXY_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+PROXY_METRICS_ROUTE_PREFIXES = [p.strip() for p in os.getenv("PROXY_METRICS_ROUTE_PREFIXES",
+                                                             "/api/,/_proxy/,/batch,/metrics").split(",") if p.strip()]
+proxy_metrics = ProxyMetrics(
+    max_routes=int(os.getenv("PROXY_METRICS_MAX_ROUTES", "200")),
+    route_prefixes=PROXY_METRICS_ROUTE_PREFIXES,
+    grouped_prefixes=[p.strip() for p in PROXY_STATIC_PREFIXES if p.strip()] + PROXY_REALTIME_PATHS,
+) if PROXY_METRICS_ENABLED else None
+
+# Keys with a background stale-while-revalidate refresh in flight, and the tasks doing it
+revalidating: Set[str] = set()
+background_tasks: Set[asyncio.Task] = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared upstream client and health probes on startup; close them on shutdown"""
+    app.state.upstream = build_upstream_client(NODE_SERVER_URLS)
+    upstream_pool.start(app.state.upstream)
+    if proxy_metrics is not None:
+        proxy_metrics.start()
+    if static_index is not None:
+        await static_index.start()
+    try:
+        yield
+    finally:
+        if static_index is not None:
+            await static_index.stop()
+        if proxy_metrics is not None:
+            await proxy_metrics.stop()
+        if compressor is not None:
+            compressor.shutdown()
+        await upstream_pool.stop()
+        await app.state.upstream.aclose()
+
+
+app = FastAPI(title="Life CEO Backend Proxy", lifespan=lifespan)
+if proxy_metrics is not None:
+    app.add_middleware(MetricsMiddleware, metrics=proxy_metrics)
+
+
+@app.get("/metrics")
+async def prometheus_metrics(scope: str = "all"):
+    """Prometheus text exposition of proxy latency, traffic and component gauges
+
+    Under the pre-fork supervisor the scrape covers every worker, labelled by worker;
+    ?scope=worker returns only the worker that answered.
+    """
+    if proxy_metrics is None:
+        return PlainTextResponse("# proxy metrics disabled (PROXY_METRICS_ENABLED=false)\n", status_code=404)
+    gauges = {
+        "pool": pool_stats(app.state.upstream),
+        "upstreams": upstream_pool.stats(),
+    }
+    # Running totals, exported as counters rather than gauges
+    counters = {}
+    if response_cache is not None:
+        gauges["cache"] = response_cache.stats()
+        counters["cache"] = response_cache.stats_counters
+    if single_flight is not None:
+        gauges["coalescing"] = single_flight.stats()
+        counters["coalescing"] = single_flight.stats_counters
+    if concurrency_limiter is not None:
+        gauges["limiter"] = concurrency_limiter.stats()
+        counters["limiter"] = {"shed": concurrency_limiter.shed}
+    if compressor is not None:
+        gauges["compression"] = compressor.stats()
+        counters["compression"] = compressor.stats_counters
+    if static_index is not None:
+        gauges["static"] = static_index.stats()
+        counters["static"] = {**static_index.stats_counters, "scans": static_index.scans}
+    if rate_limiter is not None:
+        gauges["rate_limit"] = rate_limiter.stats()
+        counters["rate_limit"] = rate_limiter.stats_counters
+    gauges["retries"] = {**retry_counters, **retry_budget.stats()}
+    counters["retries"] = {**retry_counters, **retry_budget.stats_counters}
+    text = proxy_metrics.render(gauges, counters)
+    if scope == "all" and prefork.worker_id() is not None:
+        siblings = await prefork.scrape_siblings("/metrics?scope=worker")
+        text = prefork.merge_expositions([(prefork.worker_id(), text), *siblings])
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/_proxy/worker")
+async def worker_health():
+    """Health of the worker process that answered (probed per worker by the pre-fork supervisor)"""
+    return prefork.worker_info()
+
+
+@app.get("/_proxy/pool")
+async def upstream_pool_metrics():
+    """Connection pool metrics for the shared upstream client"""
+    return {"node_server": NODE_SERVER_URL, "pool": pool_stats(app.state.upstream)}
+
+@app.get("/_proxy/upstreams")
+async def upstream_health_metrics():
+    """Health, load, latency and error statistics per Node.js upstream"""
+    return upstream_pool.stats()
+
+@app.get("/_proxy/load")
+async def load_shedding_metrics():
+    """Adaptive concurrency limit and circuit breaker states"""
+    return {
+        "limiter": concurrency_limiter.stats() if concurrency_limiter else None,
+        "circuit_breakers": {url: breaker.stats() for url, breaker in circuit_breakers.items()},
+    }
+
+@app.get("/_proxy/ratelimit")
+async def rate_limit_metrics():
+    """Rate limit rules, tracked client keys and how many requests each rule turned away"""
+    return {"enabled": rate_limiter is not None, "rate_limit": rate_limiter.stats() if rate_limiter else None}
+
+@app.get("/_proxy/retries")
+async def retry_metrics():
+    """Connect-error retries, hedged requests and the shared retry budget"""
+    return {
+        "hedging": PROXY_HEDGING,
+        "hedge_delay_ms": hedge_delay_ms(),
+        **retry_counters,
+        "budget": retry_budget.stats(),
+    }
+
+@app.get("/_proxy/coalescing")
+async def coalescing_metrics():
+    """Single-flight counters, including upstream calls saved"""
+    return {"enabled": single_flight is not None, "coalescing": single_flight.stats() if single_flight else None}
+
+@app.get("/_proxy/compression")
+async def compression_metrics():
+    """Compression counters and the bytes-saved ratio"""
+    return {"enabled": compressor is not None, "compression": compressor.stats() if compressor else None}
+
+@app.get("/_proxy/realtime")
+async def realtime_metrics_endpoint(connections: bool = False):
+    """Open WebSocket/SSE connections and their traffic; ?connections=true lists each one"""
+    return realtime_metrics.stats(include_connections=connections)
+
+@app.get("/_proxy/static")
+async def static_asset_metrics():
+    """Static asset index size and fast-path counters"""
+    return {"enabled": static_index is not None, "static": static_index.stats() if static_index else None}
+
+@app.get("/_proxy/cache")
+async def response_cache_metrics():
+    """Hit, miss and eviction counters for the response cache"""
+    return {"enabled": response_cache is not None, "cache": response_cache.stats() if response_cache else None}
+
+def rate_limited(path: str, headers: Dict[str, str], peer: Optional[str]) -> Optional[int]:
+    """Seconds the client should wait (for Retry-After) when this request is over its rate limit, else None"""
+    if rate_limiter is None:
+        return None
+    wait = rate_limiter.check(path, headers, peer)
+    return max(1, math.ceil(wait)) if wait > 0 else None
+
+def upstream_target(path: str, query: str) -> str:
+    """Path and query of a proxied request, independent of which upstream serves it"""
+    return f"/{path}?{query}" if query else f"/{path}"
+
+def select_upstream(exclude: Collection[Upstream] = ()) -> Upstream:
+    """Pool-selected upstream whose circuit breaker admits a request; sheds load when every breaker is open"""
+    tried: List[Upstream] = list(exclude)
+    while True:
+        upstream = upstream_pool.select(exclude=tried)
+        if upstream is None:
+            retry_after = min((circuit_breakers[u.url].retry_after() for u in tried if u not in exclude), default=1)
+            raise Overloaded("all upstream circuits open", retry_after=retry_after)
+        if circuit_breakers[upstream.url].allow():
+            return upstream
+        tried.append(upstream)
+
+async def send_upstream(client: httpx.AsyncClient, method: str, target: str, headers: Dict[str, str],
+                        content=None, realtime: bool = False, exclude: Collection[Upstream] = (),
+                        attempted: Optional[List[Upstream]] = None) -> httpx.Response:
+    """Send to a pool-selected upstream and return once headers arrive; the caller reads and closes the body
+
+    Realtime requests (event streams, long polls) skip the adaptive limiter, whose latency signal they
+    would distort, and wait up to the SSE idle timeout between reads instead of the normal read timeout.
+    The chosen upstream is appended to `attempted` so retries and hedges can avoid it.
+    """
+    limiter = concurrency_limiter if not realtime else None
+    if limiter is not None:
+        await limiter.acquire()
+    latency_ms = None
+    ok = False
+    try:
+        upstream = select_upstream(exclude)
+        if attempted is not None:
+            attempted.append(upstream)
+        upstream.outstanding += 1
+        started = time.perf_counter()
+        cancelled = False
+        try:
+            timeout = client.timeout
+            if realtime:
+                timeout = httpx.Timeout(connect=timeout.connect, read=PROXY_SSE_IDLE_TIMEOUT,
+                                        write=timeout.write, pool=timeout.pool)
+            if upstream.host_header:
+                headers = {**headers, "host": upstream.host_header}
+            request = client.build_request(method, upstream.base_url + target, content=content, headers=headers,
+                                           timeout=timeout)
+            response = await client.send(request, stream=True)
+            ok = response.status_code not in UPSTREAM_FAILURE_STATUSES
+            return response
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            upstream.outstanding -= 1
+            if cancelled:
+                # A hedge that lost, or a client that left: no verdict on the upstream
+                circuit_breakers[upstream.url].abandon()
+            else:
+                latency_ms = (time.perf_counter() - started) * 1000
+                record_upstream_latency(latency_ms / 1000)
+                upstream_pool.record(upstream, latency_ms, ok=ok)
+                circuit_breakers[upstream.url].record(ok)
+                if ok and method in RETRYABLE_METHODS and not realtime:
+                    hedge_latency.observe(latency_ms)
+    finally:
+        if limiter is not None:
+            limiter.release(latency_ms, ok)
+
+def hedge_delay_ms() -> Optional[float]:
+    """How long to wait before hedging: the recent upstream latency percentile, clamped; None disables"""
+    if not PROXY_HEDGING or len(upstream_pool.upstreams) < 2:
+        return None
+    percentile = hedge_latency.value()
+    if percentile is None:
+        return None
+    return min(PROXY_HEDGE_MAX_DELAY_MS, max(PROXY_HEDGE_MIN_DELAY_MS, percentile))
+
+def avoid(attempted: List[Upstream]) -> Collection[Upstream]:
+    """Upstreams to skip for another attempt; none when every upstream has already been tried"""
+    return attempted if any(u not in attempted for u in upstream_pool.upstreams) else ()
+
+async def timed_separately(attempt: Awaitable[httpx.Response]) -> Tuple[httpx.Response, Optional[float]]:
+    """Run one of several concurrent attempts with its own RequestTiming; (response, upstream seconds)
+
+    Runs as its own task, so setting the context variable here leaves the request's timing alone.
+    """
+    timing = RequestTiming()
+    current_request.set(timing)
+    return await attempt, timing.upstream_seconds
+
+def adopt(attempt: Tuple[httpx.Response, Optional[float]]) -> httpx.Response:
+    """The response of the attempt that was used, charging its upstream time to the request"""
+    response, upstream_seconds = attempt
+    if upstream_seconds is not None:
+        record_upstream_latency(upstream_seconds)
+    return response
 
-NODE_SERVER_URL = "http://localhost:5000"
+def close_unused(task: asyncio.Task, winner: Optional[asyncio.Task]):
+    """Done-callback releasing the connection of an attempt whose response was not used"""
+    if task is winner or task.cancelled() or task.exception() is not None:
+        return
+    closing = asyncio.ensure_future(task.result()[0].aclose())
+    background_tasks.add(closing)
+    closing.add_done_callback(background_tasks.discard)
 
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+async def send_hedged(client: httpx.AsyncClient, method: str, target: str, headers: Dict[str, str],
+                      attempted: List[Upstream]) -> httpx.Response:
+    """send_upstream, plus a second attempt on another upstream if the first is slower than the hedge delay
+
+    Only the attempt whose response is used counts towards the request's upstream time.
+    """
+    delay = hedge_delay_ms()
+    if delay is None:
+        return await send_upstream(client, method, target, headers, exclude=avoid(attempted), attempted=attempted)
+    primary = asyncio.create_task(timed_separately(
+        send_upstream(client, method, target, headers, exclude=avoid(attempted), attempted=attempted)
+    ))
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay / 1000)
+    except asyncio.CancelledError:
+        primary.cancel()
+        primary.add_done_callback(lambda t: close_unused(t, None))
+        raise
+    if done or not avoid(attempted) or not retry_budget.try_spend():
+        return adopt(await primary)
+
+    retry_counters["hedges"] += 1
+    hedge = asyncio.create_task(timed_separately(
+        send_upstream(client, method, target, headers, exclude=attempted, attempted=attempted)
+    ))
+    attempts = {primary, hedge}
+    winner: Optional[asyncio.Task] = None
+    try:
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+            if winner is not None:
+                if winner is hedge:
+                    retry_counters["hedge_wins"] += 1
+                return adopt(winner.result())
+        # Both attempts failed: report the original one's error
+        return adopt(primary.result())
+    finally:
+        for task in attempts:
+            if task is not winner:
+                task.cancel()
+                task.add_done_callback(lambda t: close_unused(t, winner))
+
+async def send_with_retries(client: httpx.AsyncClient, method: str, target: str,
+                            headers: Dict[str, str]) -> httpx.Response:
+    """Bodyless GET/HEAD upstream call, retried on connect errors and optionally hedged
+
+    Every retry and hedge spends a token from the shared retry budget, so extra attempts stay a
+    bounded fraction of traffic even when the whole pool is failing.
+    """
+    retry_budget.deposit()
+    attempted: List[Upstream] = []
+    attempt = 1
+    while True:
+        try:
+            return await send_hedged(client, method, target, headers, attempted)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if attempt >= PROXY_RETRY_ATTEMPTS or not retry_budget.try_spend():
+                raise
+            attempt += 1
+            retry_counters["retries"] += 1
+
+def is_realtime_request(path: str, headers: Dict[str, str]) -> bool:
+    """Event-stream subscriptions and long-poll transports, which must never be cached or coalesced"""
+    return "text/event-stream" in headers.get("accept", "") or path.startswith(tuple(PROXY_REALTIME_PATHS))
+
+def forward_headers(request: Request) -> Dict[str, str]:
+    """Client headers to send upstream (host and hop-by-hop headers removed)"""
+    headers = {k: v for k, v in request.headers.items() if k not in HOP_BY_HOP_HEADERS and k != "host"}
+    # Bodies are relayed undecoded, so never let httpx advertise encodings the client did not ask for
+    headers.setdefault("accept-encoding", "identity")
+    return headers
+
+def relay_headers(upstream: httpx.Response) -> List[Tuple[bytes, bytes]]:
+    """Upstream headers to return to the client, keeping repeated headers such as Set-Cookie"""
+    return [
+        (k.lower(), v) for k, v in upstream.headers.raw
+        if k.lower().decode("latin-1") not in HOP_BY_HOP_HEADERS | SERVER_MANAGED_HEADERS
+    ]
+
+async def relay_body(upstream: httpx.Response) -> AsyncIterator[bytes]:
+    """Yield upstream bytes as received, undecoded, so encodings and ranges pass through"""
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    finally:
+        await upstream.aclose()
+
+async def read_body(upstream: httpx.Response, limit: int) -> Tuple[Optional[bytes], Optional[AsyncIterator[bytes]]]:
+    """Buffer up to `limit` raw bytes; larger bodies come back as a stream that replays what was read"""
+    declared = upstream.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        return None, relay_body(upstream)
+
+    chunks: List[bytes] = []
+    size = 0
+    stream = relay_body(upstream)
+    async for chunk in stream:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return None, replay_body(chunks, stream)
+    return b"".join(chunks), None
+
+async def replay_body(prefix: List[bytes], rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield already-buffered chunks followed by the rest of the upstream body"""
+    try:
+        for chunk in prefix:
+            yield chunk
+        async for chunk in rest:
+            yield chunk
+    finally:
+        await rest.aclose()
+
+def buffered_response(status_code: int, headers: RawHeaders, body: bytes) -> Response:
+    """Response for a fully buffered body, with a Content-Length that matches it"""
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers = [(k, v) for k, v in headers if k != b"content-length"]
+    if status_code not in (204, 304):
+        response.raw_headers.append((b"content-length", str(len(body)).encode()))
+    return response
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak If-None-Match comparison (RFC 9110 section 13.1.2), so compressed W/ variants still match"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == bare for tag in if_none_match.split(","))
+
+def vary_on_accept_encoding(headers: RawHeaders) -> RawHeaders:
+    """Headers with Accept-Encoding added to Vary, since the proxy picks the encoding per client"""
+    vary = header_value(headers, b"vary")
+    if vary and "accept-encoding" in vary.lower():
+        return headers
+    merged = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    return [(k, v) for k, v in headers if k != b"vary"] + [(b"vary", merged.encode("latin-1"))]
+
+async def deliver(status_code: int, headers: RawHeaders, body: bytes, accept_encoding: Optional[str],
+                  memo_key: Optional[str]) -> Response:
+    """Buffered response, compressed for the client when the payload and its headers allow it"""
+    if compressor is None or status_code != 200:
+        return buffered_response(status_code, headers, body)
+    if header_value(headers, b"content-encoding") or header_value(headers, b"content-range"):
+        return buffered_response(status_code, headers, body)
+    if "no-transform" in parse_cache_control(header_value(headers, b"cache-control")):
+        return buffered_response(status_code, headers, body)
+    encoding = compressor.choose_encoding(accept_encoding, header_value(headers, b"content-type"), len(body))
+    if encoding is None:
+        return buffered_response(status_code, vary_on_accept_encoding(headers), body)
+
+    compressed = await compressor.compress(body, encoding, memo_key)
+    adjusted = [(k, v) for k, v in vary_on_accept_encoding(headers) if k != b"etag"]
+    adjusted.append((b"content-encoding", encoding.encode()))
+    etag = header_value(headers, b"etag")
+    if etag:
+        # A different representation of the same resource: weak validator only
+        adjusted.append((b"etag", (etag if etag.startswith("W/") else f"W/{etag}").encode("latin-1")))
+    return buffered_response(status_code, adjusted, compressed)
+
+async def cached_response(entry: CachedResponse, cache_status: str, request_headers: Dict[str, str],
+                          accept_encoding: Optional[str], key: str) -> Response:
+    """Serve a stored entry, answering the client's own If-None-Match with 304"""
+    extra = [(b"age", str(entry.age()).encode()), (b"x-cache", cache_status.encode())]
+    if etag_matches(request_headers.get("if-none-match"), entry.etag):
+        headers = [(k, v) for k, v in entry.headers if k in (b"etag", b"cache-control", b"vary")]
+        return buffered_response(304, headers + extra, b"")
+    return await deliver(entry.status_code, entry.headers + extra, entry.body, accept_encoding, key)
+
+async def fetch_buffered(client: httpx.AsyncClient, method: str, target: str, headers: Dict[str, str],
+                         limit: int) -> Union[SharedResponse, StreamingResponse]:
+    """Upstream call buffered up to `limit` bytes; larger bodies are streamed to the caller instead"""
+    if method in RETRYABLE_METHODS:
+        upstream = await send_with_retries(client, method, target, headers)
+    else:
+        upstream = await send_upstream(client, method, target, headers)
+    response_headers = relay_headers(upstream)
+    body, remaining = await read_body(upstream, limit)
+    if body is None:
+        response = StreamingResponse(remaining, status_code=upstream.status_code)
+        response.raw_headers = response_headers
+        return response
+    return SharedResponse(upstream.status_code, response_headers, body)
+
+async def fetch_coalesced(client: httpx.AsyncClient, method: str, target: str, headers: Dict[str, str],
+                          limit: int) -> Union[SharedResponse, StreamingResponse]:
+    """fetch_buffered, sharing one upstream call between identical concurrent requests"""
+    if single_flight is None:
+        return await fetch_buffered(client, method, target, headers, limit)
+
+    key = single_flight.key(method, target, headers)
+    role, flight = single_flight.acquire(key)
+    if role == FOLLOWER:
+        shared = await asyncio.shield(flight.future)
+        if shared is not None:
+            return shared
+        # The leader failed or its body was too large to share
+        single_flight.stats_counters["fallbacks"] += 1
+    if role != LEADER:
+        return await fetch_buffered(client, method, target, headers, limit)
+
+    shared = None
+    try:
+        result = await fetch_buffered(client, method, target, headers, limit)
+        if isinstance(result, SharedResponse) and len(result.body) <= single_flight.max_body_bytes:
+            shared = result
+        return result
+    finally:
+        single_flight.release(key, flight, shared)
+
+async def fetch_into_cache(client: httpx.AsyncClient, target: str, headers: Dict[str, str],
+                           entry: Optional[CachedResponse], accept_encoding: Optional[str], key: str) -> Response:
+    """GET from upstream (conditionally when an ETag is stored) and store the result"""
+    upstream_headers = dict(headers)
+    if entry is not None and entry.etag:
+        upstream_headers["if-none-match"] = entry.etag
+        response_cache.stats_counters["revalidations"] += 1
+
+    result = await fetch_coalesced(client, "GET", target, upstream_headers, response_cache.max_entry_bytes)
+    if isinstance(result, StreamingResponse):
+        return result
+    if result.status_code == 304 and entry is not None:
+        response_cache.revalidated(entry, result.headers, headers)
+        return await cached_response(entry, "REVALIDATED", headers, accept_encoding, key)
+
+    response_cache.store(target, headers, result.status_code, result.headers, result.body)
+    return await deliver(result.status_code, result.headers + [(b"x-cache", b"MISS")], result.body, accept_encoding, key)
+
+async def revalidate_in_background(client: httpx.AsyncClient, target: str, headers: Dict[str, str],
+                                   key: str, entry: CachedResponse):
+    """stale-while-revalidate refresh; the client has already been served the stale entry"""
+    try:
+        response = await fetch_into_cache(client, target, headers, entry, None, key)
+        if isinstance(response, StreamingResponse):
+            await response.body_iterator.aclose()
+    except Exception as e:
+        print(f"⚠️ Background revalidation failed for {target}: {e}")
+    finally:
+        revalidating.discard(key)
+
+async def proxy_cached(client: httpx.AsyncClient, target: str, headers: Dict[str, str],
+                       accept_encoding: Optional[str]) -> Response:
+    """Answer a cacheable GET from the response cache, going upstream only when needed"""
+    key, entry = response_cache.lookup(target, headers)
+    client_no_cache = "no-cache" in parse_cache_control(headers.get("cache-control"))
+
+    if entry is not None and not client_no_cache:
+        if entry.is_fresh():
+            response_cache.stats_counters["hits"] += 1
+            return await cached_response(entry, "HIT", headers, accept_encoding, key)
+        if entry.can_serve_stale():
+            response_cache.stats_counters["stale_hits"] += 1
+            if key not in revalidating:
+                revalidating.add(key)
+                task = asyncio.create_task(revalidate_in_background(client, target, headers, key, entry))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
+            return await cached_response(entry, "STALE", headers, accept_encoding, key)
+
+    response_cache.stats_counters["misses"] += 1
+    return await fetch_into_cache(client, target, headers, entry, accept_encoding, key)
+
+def batch_headers(headers: RawHeaders) -> Dict[str, str]:
+    """Response headers reported for a batch item; cookies cannot be multiplexed and are dropped"""
+    return {
+        k.decode("latin-1"): v.decode("latin-1") for k, v in headers
+        if k not in (b"set-cookie", b"content-length", b"content-encoding")
+    }
+
+async def run_sub_request(client: httpx.AsyncClient, sub: SubRequest, base_headers: Dict[str, str],
+                          peer: Optional[str]) -> Dict[str, Any]:
+    """One batch item through the same rate limit, cache, coalescing and load-shedding path as a direct request"""
+    started = time.perf_counter()
+    headers = {**base_headers, **sub.headers, "accept-encoding": "identity"}
+    retry_after = rate_limited(sub.target.split("?", 1)[0], headers, peer)
+    if retry_after is not None:
+        result = error_result(sub.id, 429, "Rate limit exceeded", (time.perf_counter() - started) * 1000)
+        result["headers"]["retry-after"] = str(retry_after)
+        return result
+    too_large = f"Response exceeds the batch limit of {PROXY_BATCH_MAX_BODY_BYTES} bytes"
+    try:
+        if sub.body is None and response_cache is not None and \
+                response_cache.is_cacheable_request(sub.method, sub.target.split("?", 1)[0], headers):
+            response = await proxy_cached(client, sub.target, headers, None)
+            if isinstance(response, StreamingResponse):
+                await response.body_iterator.aclose()
+                return error_result(sub.id, 502, too_large, (time.perf_counter() - started) * 1000)
+            status_code, response_headers, body = response.status_code, response.raw_headers, response.body
+        elif sub.body is None and sub.method in RETRYABLE_METHODS:
+            result = await fetch_coalesced(client, sub.method, sub.target, headers, PROXY_BATCH_MAX_BODY_BYTES)
+            if isinstance(result, StreamingResponse):
+                await result.body_iterator.aclose()
+                return error_result(sub.id, 502, too_large, (time.perf_counter() - started) * 1000)
+            status_code, response_headers, body = result.status_code, result.headers, result.body
+        else:
+            upstream = await send_upstream(client, sub.method, sub.target, headers, content=sub.body)
+            response_headers = relay_headers(upstream)
+            body, remaining = await read_body(upstream, PROXY_BATCH_MAX_BODY_BYTES)
+            if body is None:
+                await remaining.aclose()
+                return error_result(sub.id, 502, too_large, (time.perf_counter() - started) * 1000)
+            status_code = upstream.status_code
+    except Overloaded as e:
+        return error_result(sub.id, 503, f"Backend proxy overloaded: {e.reason}", (time.perf_counter() - started) * 1000)
+    except httpx.TimeoutException as e:
+        return error_result(sub.id, 504, f"Backend proxy timeout: {str(e)}", (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return error_result(sub.id, 502, f"Backend proxy error: {str(e)}", (time.perf_counter() - started) * 1000)
+    return encode_result(sub.id, status_code, batch_headers(response_headers), body, (time.perf_counter() - started) * 1000)
+
+@app.post("/batch")
+async def batch_requests(request: Request, stream: bool = False):
+    """Run several API requests concurrently and return all results in one response
+
+    Sub-requests inherit the caller's cookies and authorization. With ?stream=true (or
+    Accept: application/x-ndjson) each result is written as an NDJSON line as soon as it
+    completes; otherwise results come back together, in request order.
+    """
+    try:
+        subs = parse_batch(await request.json(), PROXY_BATCH_MAX_REQUESTS, PROXY_BATCH_PATHS)
+    except (BatchError, ValueError) as e:
+        return JSONResponse({"error": f"Invalid batch: {str(e)}"}, status_code=400)
+
+    client: httpx.AsyncClient = request.app.state.upstream
+    base_headers = {
+        k: v for k, v in forward_headers(request).items() if k not in BATCH_IGNORED_HEADERS and k != "content-type"
+    }
+    semaphore = asyncio.Semaphore(PROXY_BATCH_CONCURRENCY)
+    peer = request.client.host if request.client else None
+
+    async def run(sub: SubRequest) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_sub_request(client, sub, base_headers, peer)
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        async def results_as_completed() -> AsyncIterator[bytes]:
+            tasks = [asyncio.create_task(run(sub)) for sub in subs]
+            try:
+                for completed in asyncio.as_completed(tasks):
+                    yield (json.dumps(await completed) + "\n").encode()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(results_as_completed(), media_type="application/x-ndjson")
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run(sub) for sub in subs))
+    return JSONResponse({"responses": results, "duration_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+async def serve_static(request: Request, path: str, asset: StaticAsset) -> Optional[Response]:
+    """Answer from the static index: 304 on a validator match, memory for small files, sendfile otherwise"""
+    headers: RawHeaders = [
+        (b"content-type", asset.content_type.encode()),
+        (b"etag", asset.etag.encode()),
+        (b"last-modified", asset.last_modified.encode()),
+        (b"cache-control", asset.cache_control.encode()),
+    ]
+    static_index.stats_counters["hits"] += 1
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, asset.etag) or (
+        if_none_match is None and request.headers.get("if-modified-since") == asset.last_modified
+    ):
+        static_index.stats_counters["not_modified"] += 1
+        return buffered_response(304, [h for h in headers if h[0] != b"content-type"], b"")
+
+    if asset.body is not None and "range" not in request.headers:
+        static_index.stats_counters["from_memory"] += 1
+        return await deliver(200, headers, asset.body, request.headers.get("accept-encoding"), f"static:{path}")
+
+    try:
+        # Stat now so a file removed by a rebuild falls through to Node instead of failing mid-response
+        stat = os.stat(asset.path)
+    except FileNotFoundError:
+        static_index.forget(path)
+        return None
+    static_index.stats_counters["from_disk"] += 1
+    # Starlette hands the file to the server via http.response.pathsend (zero-copy) where supported
+    return FileResponse(
+        asset.path,
+        stat_result=stat,
+        media_type=asset.content_type,
+        headers={"etag": asset.etag, "cache-control": asset.cache_control},
+    )
+
+@app.api_route("/{path:path}", methods=["GET", "HEAD", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_all(request: Request, path: str):
     """Proxy all requests to the Node.js server"""
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            # Forward the request to Node.js server
-            url = f"{NODE_SERVER_URL}/{path}"
-            
-            # Get query parameters
-            query_params = str(request.url.query)
-            if query_params:
-                url += f"?{query_params}"
-            
-            # Get request body if any
-            body = await request.body()
-            
-            # Forward headers (exclude host to avoid conflicts)
-            headers = dict(request.headers)
-            headers.pop('host', None)
-            
-            response = await client.request(
-                method=request.method,
-                url=url,
-                content=body,
-                headers=headers,
-                timeout=30.0
-            )
-            
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers)
+
+    retry_after = rate_limited(f"/{path}", request.headers, request.client.host if request.client else None)
+    if retry_after is not None:
+        return JSONResponse(
+            {"error": "Rate limit exceeded", "retry_after": retry_after},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    if static_index is not None and request.method in ("GET", "HEAD"):
+        asset = static_index.lookup(f"/{path}")
+        if asset is not None:
+            response = await serve_static(request, f"/{path}", asset)
+            if response is not None:
+                return response
+
+    client: httpx.AsyncClient = request.app.state.upstream
+    try:
+        # Forward the request to Node.js server
+        target = upstream_target(path, request.url.query)
+        headers = forward_headers(request)
+        accept_encoding = request.headers.get("accept-encoding")
+        # Buffered paths fetch identity bodies and compress per client, so variants don't split the cache
+        buffered_headers = {**headers, "accept-encoding": "identity"} if compressor is not None else headers
+
+        realtime = is_realtime_request(f"/{path}", headers)
+
+        if not realtime and response_cache is not None and response_cache.is_cacheable_request(request.method, f"/{path}", headers):
+            return await proxy_cached(client, target, buffered_headers, accept_encoding)
+
+        # Stream the request body only when the client actually sent one
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+
+        if not has_body and not realtime and single_flight is not None and single_flight.is_eligible(request.method, headers):
+            result = await fetch_coalesced(client, request.method, target, buffered_headers, single_flight.max_body_bytes)
+            if isinstance(result, StreamingResponse):
+                return result
+            # Not memoised: an uncached body is a new object every time, so its variant would never be reused
+            return await deliver(result.status_code, result.headers, result.body, accept_encoding, None)
+        if not has_body:
+            content = None
+        elif PROXY_STREAMING:
+            content = request.stream()
+        else:
+            content = await request.body()
+
+        # Timeouts come from the client's per-phase configuration
+        if content is None and not realtime and request.method in RETRYABLE_METHODS:
+            upstream = await send_with_retries(client, request.method, target, headers)
+        else:
+            upstream = await send_upstream(client, request.method, target, headers, content=content, realtime=realtime)
+
+        if upstream.headers.get("content-type", "").startswith("text/event-stream"):
+            # Events are relayed as they arrive, whatever PROXY_STREAMING says; ask any proxy in front not to buffer
+            response = StreamingResponse(
+                relay_sse(relay_body(upstream), realtime_metrics, f"/{path}", str(upstream.url.join("/"))),
+                status_code=upstream.status_code,
+                background=BackgroundTask(upstream.aclose)
             )
-            
-        except Exception as e:
-            return {"error": f"Backend proxy error: {str(e)}", "node_server": NODE_SERVER_URL}
+            response.raw_headers = relay_headers(upstream) + [(b"x-accel-buffering", b"no")]
+            return response
+
+        if not PROXY_STREAMING:
+            body = b"".join([chunk async for chunk in relay_body(upstream)])
+            return buffered_response(upstream.status_code, relay_headers(upstream), body)
+
+        response = StreamingResponse(
+            relay_body(upstream),
+            status_code=upstream.status_code,
+            background=BackgroundTask(upstream.aclose)
+        )
+        response.raw_headers = relay_headers(upstream)
+        return response
+
+    except Overloaded as e:
+        return JSONResponse(
+            {"error": f"Backend proxy overloaded: {e.reason}", "node_server": NODE_SERVER_URL},
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except httpx.PoolTimeout as e:
+        return JSONResponse(
+            {"error": f"Backend proxy connection pool exhausted: {str(e)}", "node_server": NODE_SERVER_URL},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+    except httpx.TimeoutException as e:
+        return JSONResponse({"error": f"Backend proxy timeout: {str(e)}", "node_server": NODE_SERVER_URL}, status_code=504)
+    except Exception as e:
+        return JSONResponse({"error": f"Backend proxy error: {str(e)}", "node_server": NODE_SERVER_URL}, status_code=502)
+
+@app.websocket("/{path:path}")
+async def proxy_websocket_route(websocket: WebSocket, path: str):
+    """Bridge WebSocket connections (socket.io, live updates) to a pool-selected Node.js upstream"""
+    upstream = upstream_pool.select()
+    if upstream is None:
+        # Like proxy_all's 503: accept only to tell the client to come back later (1013 Try Again Later)
+        realtime_metrics.totals["websocket_rejected"] += 1
+        await websocket.accept()
+        await websocket.close(code=1013, reason="No upstream available")
+        return
+    query = websocket.url.query
+    socket_path = uds_path(upstream.url)
+    base = "ws://localhost" if socket_path else "ws" + upstream.base_url[len("http"):]
+    await proxy_websocket(
+        websocket, base + upstream_target(path, query), realtime_metrics,
+        unix_socket=socket_path,
+        idle_timeout=PROXY_WS_IDLE_TIMEOUT,
+        max_message_bytes=PROXY_WS_MAX_MESSAGE_BYTES,
+        max_queue=PROXY_WS_MAX_QUEUE,
+    )
 
 @app.get("/")
 async def health_check():
@@ -58,4 +952,16 @@ async def health_check():
     return {"status": "Life CEO Backend Proxy Running", "framework": "ESA 61x21"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # PROXY_WORKERS=N runs N supervised worker processes on the port (default "auto": one per CPU),
+    # splitting the rate limits and memory budgets between them; PROXY_WORKERS=1 runs a single unsupervised process
+    workers = os.getenv("PROXY_WORKERS", "auto")
+    if workers == "1":
+        uvicorn.run(app, host="0.0.0.0", port=8001)
+    else:
+        prefork.serve(
+            "server:app", host="0.0.0.0", port=8001,
+            workers=None if workers == "auto" else int(workers),
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            health_path="/_proxy/worker",
+            reuse_port=os.getenv("PROXY_REUSE_PORT", "false").lower() in ("1", "true", "yes"),
+        )
@@ -0,0 +1,88 @@
+"""
+ESA Life CEO 61x21 Framework - Request Coalescing
+Single-flight layer: identical concurrent upstream GETs share one in-flight call
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+LEADER = "leader"
+FOLLOWER = "follower"
+OVERFLOW = "overflow"
+
+
+class SharedResponse:
+    """A fully buffered upstream response that can be handed to several clients"""
+
+    __slots__ = ("status_code", "headers", "body")
+
+    def __init__(self, status_code: int, headers: RawHeaders, body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class Flight:
+    """One in-flight upstream call and the number of requests waiting on it"""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self):
+        self.future: "asyncio.Future[Optional[SharedResponse]]" = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent identical GETs keyed on method, URL and request headers that shape the response"""
+
+    def __init__(self, key_headers: List[str], max_body_bytes: int, max_waiters: int):
+        # If-None-Match and Range always change the upstream answer, so they are always part of the key
+        self.key_headers = tuple(sorted({h.lower() for h in key_headers} | {"if-none-match", "range"}))
+        self.max_body_bytes = max_body_bytes
+        self.max_waiters = max_waiters
+        self.in_flight: Dict[str, Flight] = {}
+        self.stats_counters = {"leaders": 0, "coalesced": 0, "overflows": 0, "fallbacks": 0, "unshareable": 0}
+
+    def is_eligible(self, method: str, headers: Dict[str, str]) -> bool:
+        """Only bodiless GETs with a bounded response can be shared; streams and ranges go direct"""
+        if method != "GET" or "range" in headers:
+            return False
+        return "text/event-stream" not in headers.get("accept", "")
+
+    def key(self, method: str, url: str, headers: Dict[str, str]) -> str:
+        return f"{method} {url}" + "".join(f"\n{name}:{headers.get(name, '')}" for name in self.key_headers)
+
+    def acquire(self, key: str) -> Tuple[str, Optional[Flight]]:
+        """Join the in-flight call for `key`, or start one; OVERFLOW when too many are already waiting"""
+        flight = self.in_flight.get(key)
+        if flight is None:
+            flight = self.in_flight[key] = Flight()
+            self.stats_counters["leaders"] += 1
+            return LEADER, flight
+        if flight.waiters >= self.max_waiters:
+            self.stats_counters["overflows"] += 1
+            return OVERFLOW, None
+        flight.waiters += 1
+        self.stats_counters["coalesced"] += 1
+        return FOLLOWER, flight
+
+    def release(self, key: str, flight: Flight, shared: Optional[SharedResponse]):
+        """Finish a flight; followers get `shared`, or None to make their own upstream call"""
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]
+        if shared is None and flight.waiters:
+            self.stats_counters["unshareable"] += 1
+        if not flight.future.done():
+            flight.future.set_result(shared)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters; `upstream_calls_saved` is the number of followers served from a shared response"""
+        return {
+            **self.stats_counters,
+            "upstream_calls_saved": self.stats_counters["coalesced"] - self.stats_counters["fallbacks"],
+            "in_flight": len(self.in_flight),
+            "max_body_bytes": self.max_body_bytes,
+            "max_waiters": self.max_waiters,
+        }
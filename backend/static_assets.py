@@ -0,0 +1,185 @@
+"""
+ESA Life CEO 61x21 Framework - Static Asset Index
+In-memory stat/ETag index of built client assets so the proxy can serve them without a Node round trip
+"""
+
+import asyncio
+import mimetypes
+import os
+import re
+import time
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Vite emits `[name]-[hash].[ext]`; other bundlers use `[name].[hash].[ext]`
+FINGERPRINTED = re.compile(r"[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# Build manifests (Vite's, the PWA's) rewritten by every build, relative to an asset root
+BUILD_MANIFESTS = (".vite/manifest.json", "manifest.json")
+
+
+class StaticAsset:
+    """One file on disk with the validators and headers precomputed at scan time"""
+
+    __slots__ = ("path", "stat", "etag", "last_modified", "content_type", "cache_control", "body")
+
+    def __init__(self, path: str, stat: os.stat_result, fingerprinted: bool, body: Optional[bytes]):
+        self.path = path
+        self.stat = stat
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+        # Small files are kept in memory; larger ones are sent from disk
+        self.body = body
+
+    def same_file(self, stat: os.stat_result) -> bool:
+        return stat.st_mtime_ns == self.stat.st_mtime_ns and stat.st_size == self.stat.st_size
+
+
+class StaticIndex:
+    """URL path -> StaticAsset for files under `prefixes` in the asset roots, rescanned when they change
+
+    Roots are searched in order, so a file in an earlier root shadows the same path in a later one.
+    Walking the roots is the expensive part, so every `refresh_interval` seconds only the roots,
+    their prefix directories and the build manifests are stat'ed; a full rescan runs when one of
+    those changed (a rebuild), or after a lookup under the prefixes missed (a file added deeper down).
+    A path still missing after that rescan doesn't trigger another one until the roots change.
+    """
+
+    def __init__(self, roots: List[str], prefixes: List[str], inline_max_bytes: int = 64 * 1024,
+                 memory_max_bytes: int = 32 * 1024 * 1024, refresh_interval: float = 2.0):
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.prefixes = tuple(prefixes)
+        self.inline_max_bytes = inline_max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.refresh_interval = refresh_interval
+        self.assets: Dict[str, StaticAsset] = {}
+        self.memory_bytes = 0
+        self.scans = 0
+        self.last_scan_ms = 0.0
+        self.watched = [os.path.join(root, relative) for root in self.roots
+                        for relative in ("", *(p.strip("/") for p in self.prefixes), *BUILD_MANIFESTS)]
+        self.scanned_signature: Optional[Tuple[Optional[int], ...]] = None
+        self.missed: Set[str] = set()
+        self.absent: Set[str] = set()
+        self.stats_counters = {"hits": 0, "misses": 0, "not_modified": 0, "from_memory": 0, "from_disk": 0,
+                               "vanished": 0}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def signature(self) -> Tuple[Optional[int], ...]:
+        """mtimes of the watched roots, directories and manifests (None for missing ones)"""
+        mtimes = []
+        for path in self.watched:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def scan(self):
+        """Rebuild the index from disk, reusing entries (and their in-memory bodies) for unchanged files"""
+        started = time.perf_counter()
+        # Taken first, so changes made while walking trigger another scan
+        signature = self.signature()
+        previous = self.assets
+        assets: Dict[str, StaticAsset] = {}
+        memory_bytes = 0
+        for root in self.roots:
+            for directory, subdirs, files in os.walk(root):
+                subdirs[:] = [d for d in subdirs if not d.startswith(".")]
+                for name in files:
+                    if name.startswith("."):
+                        continue
+                    path = os.path.join(directory, name)
+                    url = "/" + os.path.relpath(path, root).replace(os.sep, "/")
+                    if url in assets or not url.startswith(self.prefixes):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    asset = previous.get(url)
+                    if asset is None or asset.path != path or not asset.same_file(stat):
+                        body = None
+                        if stat.st_size <= self.inline_max_bytes and memory_bytes + stat.st_size <= self.memory_max_bytes:
+                            try:
+                                with open(path, "rb") as f:
+                                    body = f.read()
+                            except OSError:
+                                continue
+                        asset = StaticAsset(path, stat, bool(FINGERPRINTED.search(name)), body)
+                    if asset.body is not None:
+                        memory_bytes += len(asset.body)
+                    assets[url] = asset
+        self.assets = assets
+        self.memory_bytes = memory_bytes
+        self.scanned_signature = signature
+        self.scans += 1
+        self.last_scan_ms = (time.perf_counter() - started) * 1000
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        asset = self.assets.get(path)
+        if asset is None and path.startswith(self.prefixes) and path not in self.absent:
+            # Possibly a file added below a watched directory; the next refresh tick rescans
+            self.stats_counters["misses"] += 1
+            if len(self.missed) < 1024:
+                self.missed.add(path)
+        return asset
+
+    def forget(self, path: str):
+        """Drop an entry whose file disappeared before the next scan noticed"""
+        self.assets.pop(path, None)
+        self.stats_counters["vanished"] += 1
+        self.missed.add(path)
+
+    def refresh(self) -> bool:
+        """Rescan if a lookup missed or a watched path changed since the last scan; whether it did"""
+        changed = self.signature() != self.scanned_signature
+        if not changed and not self.missed:
+            return False
+        missed, self.missed = self.missed, set()
+        self.scan()
+        if changed or len(self.absent) > 10_000:
+            self.absent = set()
+        self.absent.update(path for path in missed if path not in self.assets)
+        return True
+
+    async def _refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                print(f"⚠️ Static asset rescan failed: {e}")
+
+    async def start(self):
+        """Build the index off the event loop, then keep it in sync with the asset roots"""
+        await asyncio.get_running_loop().run_in_executor(None, self.scan)
+        print(f"✅ Static asset index: {len(self.assets)} files from {', '.join(self.roots)}")
+        if self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats_counters,
+            "files": len(self.assets),
+            "in_memory": sum(1 for a in self.assets.values() if a.body is not None),
+            "memory_bytes": self.memory_bytes,
+            "scans": self.scans,
+            "last_scan_ms": round(self.last_scan_ms, 2),
+            "roots": self.roots,
+        }
@@ -0,0 +1,9 @@
+"""
+ESA Life CEO 61x21 Framework - Proxy Test Fixtures
+Proxy modules are imported flat from backend/, as server.py does
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import prefork
+from prefork import Supervisor, WorkerProcess
+
+
+class HungProcess:
+    """Stands in for a worker process that ignores SIGTERM"""
+
+    pid = 4242
+    exitcode = None
+
+    def __init__(self):
+        self.signals = []
+
+    def is_alive(self) -> bool:
+        return "kill" not in self.signals
+
+    def terminate(self):
+        self.signals.append("term")
+
+    def kill(self):
+        self.signals.append("kill")
+
+    def join(self, timeout=None):
+        pass
+
+
+def make_supervisor(monkeypatch, workers: int = 3) -> Supervisor:
+    supervisor = Supervisor("server:app", workers=workers, health_interval=0, health_failures=1, graceful_timeout=0)
+    monkeypatch.setattr(supervisor, "spawn", lambda slot: WorkerProcess(slot, 0, HungProcess()))
+    for slot in range(workers):
+        supervisor.pool[slot] = supervisor.spawn(slot)
+    return supervisor
+
+
+def test_health_checks_probe_workers_concurrently_and_never_wait_for_a_drain(monkeypatch):
+    supervisor = make_supervisor(monkeypatch)
+    hung = list(supervisor.pool.values())
+
+    async def slow_failed_probe(worker):
+        await asyncio.sleep(0.2)
+        return False
+
+    monkeypatch.setattr(supervisor, "probe", slow_failed_probe)
+    started = time.monotonic()
+    supervisor.check_health()
+
+    assert time.monotonic() - started < 0.5
+    assert all(worker.process.signals == ["term"] for worker in hung)
+    assert supervisor.retired == hung
+    assert all(supervisor.pool[worker.slot] is not worker for worker in hung)
+
+
+def test_retired_workers_are_killed_at_their_own_deadline(monkeypatch):
+    supervisor = make_supervisor(monkeypatch, workers=1)
+    worker = supervisor.pool[0]
+    supervisor.retire(worker)
+    supervisor.reap_retired()
+
+    assert worker.process.signals == ["term"]
+
+    worker.kill_at = time.monotonic() - 1
+    supervisor.reap_retired()
+
+    assert worker.process.signals == ["term", "kill"]
+    assert supervisor.retired == []
+
+
+def test_worker_count_defaults_to_one_outside_the_supervisor(monkeypatch):
+    monkeypatch.delenv("PREFORK_WORKERS", raising=False)
+    assert prefork.worker_count() == 1
+    monkeypatch.setenv("PREFORK_WORKERS", "4")
+    assert prefork.worker_count() == 4
@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+
+import server
+from proxy_metrics import ProxyMetrics, RequestTiming, current_request, record_upstream_latency
+
+
+def test_running_totals_are_counters_with_a_total_suffix():
+    text = ProxyMetrics().render({"retries": {"hedges": 3, "tokens": 7.5}}, {"retries": {"hedges": 3}})
+
+    assert "# TYPE proxy_retries_hedges_total counter\nproxy_retries_hedges_total 3" in text
+    assert "# TYPE proxy_retries_tokens gauge\nproxy_retries_tokens 7.5" in text
+    assert "proxy_retries_hedges " not in text
+
+
+def test_hedged_request_is_charged_only_the_winning_attempt(monkeypatch):
+    async def fake_send_upstream(client, method, target, headers, exclude=(), attempted=None):
+        first = not attempted
+        attempted.append(object())
+        await asyncio.sleep(0.02)
+        # The primary fails after the hedge has gone out; the hedge answers later
+        record_upstream_latency(1.0 if first else 0.25)
+        if first:
+            raise httpx.ReadError("upstream reset")
+        return object()
+
+    monkeypatch.setattr(server, "send_upstream", fake_send_upstream)
+    monkeypatch.setattr(server, "hedge_delay_ms", lambda: 5.0)
+
+    async def request() -> RequestTiming:
+        timing = RequestTiming()
+        current_request.set(timing)
+        await server.send_hedged(None, "GET", "/api/posts", {}, [])
+        return timing
+
+    assert asyncio.run(request()).upstream_seconds == 0.25
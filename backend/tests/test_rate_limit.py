@@ -0,0 +1,74 @@
+from rate_limit import RateLimiter, parse_rules
+
+LOGIN = "/api/auth/login"
+
+
+def limiter(spec: str = f"{LOGIN}:2/60:ip", **options) -> RateLimiter:
+    return RateLimiter(parse_rules(spec), **options)
+
+
+def test_ip_key_ignores_forwarded_for_by_default():
+    rate_limiter = limiter()
+
+    for spoofed in ("10.0.0.1", "10.0.0.2"):
+        assert rate_limiter.check(LOGIN, {"x-forwarded-for": spoofed}, "203.0.113.7") == 0
+    assert rate_limiter.check(LOGIN, {"x-forwarded-for": "10.0.0.3"}, "203.0.113.7") > 0
+
+
+def test_trusted_hops_take_the_entry_added_by_our_proxy():
+    rate_limiter = limiter(trusted_hops=1)
+    rule = rate_limiter.match(LOGIN)
+
+    key = rate_limiter.client_key(rule, {"x-forwarded-for": "10.9.9.9, 198.51.100.4"}, "10.0.0.1")
+
+    assert key.endswith("198.51.100.4")
+    assert rate_limiter.client_key(rule, {}, "10.0.0.1").endswith("10.0.0.1")
+
+
+def test_route_rules_share_one_bucket_across_clients():
+    rate_limiter = limiter("/api/search:1/60:route")
+
+    assert rate_limiter.check("/api/search", {}, "198.51.100.1") == 0
+    assert rate_limiter.check("/api/search", {}, "198.51.100.2") > 0
+
+
+def test_unmatched_paths_are_not_limited():
+    rate_limiter = limiter()
+
+    assert all(rate_limiter.check("/api/posts", {}, "198.51.100.1") == 0 for _ in range(10))
+    assert rate_limiter.stats()["keys"] == 0
+
+
+def test_user_rules_key_on_the_credential():
+    rate_limiter = limiter("/api/events:1/60:user")
+
+    assert rate_limiter.check("/api/events", {"authorization": "Bearer alice"}, "198.51.100.1") == 0
+    assert rate_limiter.check("/api/events", {"cookie": "theme=dark; connect.sid=bob"}, "198.51.100.1") == 0
+    assert rate_limiter.check("/api/events", {"authorization": "Bearer alice"}, "198.51.100.1") > 0
+
+
+def test_invented_credentials_still_spend_the_ip_bucket():
+    rate_limiter = limiter("/api/events:1/60:user", users_per_ip=3)
+
+    allowed = [rate_limiter.check("/api/events", {"authorization": f"Bearer random-{n}"}, "198.51.100.1") == 0
+               for n in range(10)]
+
+    assert allowed == [True] * 3 + [False] * 7
+    assert rate_limiter.check("/api/events", {"authorization": "Bearer other"}, "198.51.100.2") == 0
+
+
+def test_a_limited_request_spends_no_tokens():
+    rate_limiter = limiter("/api/events:1/60:user", users_per_ip=1)
+    alice = {"authorization": "Bearer alice"}
+
+    assert rate_limiter.check("/api/events", alice, "198.51.100.1") == 0
+    assert rate_limiter.check("/api/events", {"authorization": "Bearer bob"}, "198.51.100.1") > 0
+    # bob's refused request left his own bucket full
+    assert rate_limiter.check("/api/events", {"authorization": "Bearer bob"}, "198.51.100.2") == 0
+
+
+def test_limits_are_split_between_workers():
+    whole, = parse_rules("/api/events:20/1:user:40")
+    share, = parse_rules("/api/events:20/1:user:40", workers=4)
+
+    assert (share.rate, share.burst) == (whole.rate / 4, whole.burst / 4)
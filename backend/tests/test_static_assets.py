@@ -0,0 +1,49 @@
+import os
+
+from static_assets import StaticIndex
+
+
+def build(root, *files):
+    for name in files:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(name)
+
+
+def test_unchanged_roots_are_not_walked_again(tmp_path):
+    build(tmp_path, "assets/app-1a2b3c4d.js")
+    index = StaticIndex([str(tmp_path)], ["/assets/"])
+    index.scan()
+
+    assert not index.refresh()
+    assert index.scans == 1
+
+
+def test_rebuild_is_picked_up_from_the_directory_mtime(tmp_path):
+    build(tmp_path, "assets/app-1a2b3c4d.js")
+    index = StaticIndex([str(tmp_path)], ["/assets/"])
+    index.scan()
+    build(tmp_path, "assets/app-5e6f7a8b.js")
+    os.utime(tmp_path / "assets", ns=(1, 1))
+
+    assert index.refresh()
+    assert index.lookup("/assets/app-5e6f7a8b.js") is not None
+
+
+def test_a_miss_triggers_one_rescan_per_missing_path(tmp_path):
+    build(tmp_path, "assets/app-1a2b3c4d.js")
+    index = StaticIndex([str(tmp_path)], ["/assets/"])
+    index.scan()
+    mtimes = index.signature()
+    build(tmp_path, "assets/icons/new.svg")
+    os.utime(tmp_path / "assets", ns=(mtimes[1], mtimes[1]))
+
+    assert index.lookup("/assets/icons/new.svg") is None
+    assert index.lookup("/assets/missing.js") is None
+    assert index.refresh()
+    assert index.lookup("/assets/icons/new.svg") is not None
+    # Still missing after a fresh scan: not worth walking the roots for again
+    assert index.lookup("/assets/missing.js") is None
+    assert not index.refresh()
+    assert index.scans == 2
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from load_shedding import Overloaded
+from upstream_pool import UpstreamPool
+
+
+def test_pool_select_is_none_once_every_upstream_is_excluded():
+    pool = server.upstream_pool
+
+    assert pool.select(exclude=pool.upstreams) is None
+
+
+def test_select_upstream_sheds_load_when_no_upstream_is_left():
+    with pytest.raises(Overloaded):
+        server.select_upstream(exclude=server.upstream_pool.upstreams)
+
+
+def test_http_proxy_answers_503_without_an_upstream(monkeypatch):
+    monkeypatch.setattr(UpstreamPool, "select", lambda self, exclude=(): None)
+
+    with TestClient(server.app) as client:
+        response = client.get("/api/posts")
+
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+
+def test_websocket_is_closed_with_try_again_later_without_an_upstream(monkeypatch):
+    monkeypatch.setattr(UpstreamPool, "select", lambda self, exclude=(): None)
+    rejected = server.realtime_metrics.totals["websocket_rejected"]
+
+    with TestClient(server.app).websocket_connect("/socket.io/?transport=websocket") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+
+    assert closed.value.code == 1013
+    assert server.realtime_metrics.totals["websocket_rejected"] == rejected + 1
@@ -0,0 +1,130 @@
+"""
+ESA Life CEO 61x21 Framework - Upstream Client
+Application-scoped, pooled httpx client used by the backend proxy to talk to Node.js
+
+Upstream URLs select the transport:
+    http://host:port     HTTP/1.1 over TCP (default)
+    h2c://host:port      HTTP/2 over cleartext TCP with prior knowledge (needs `h2` and an h2c-capable server)
+    unix:/path/to.sock   HTTP/1.1 over a Unix domain socket
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import httpx
+
+UDS_PREFIX = "unix:"
+H2C_PREFIX = "h2c://"
+
+# Pool sizing and keep-alive
+PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", "100"))
+PROXY_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROXY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+PROXY_KEEPALIVE_EXPIRY = float(os.getenv("PROXY_KEEPALIVE_EXPIRY", "30"))
+PROXY_HTTP2 = os.getenv("PROXY_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Per-phase timeouts (seconds)
+PROXY_CONNECT_TIMEOUT = float(os.getenv("PROXY_CONNECT_TIMEOUT", "5"))
+PROXY_READ_TIMEOUT = float(os.getenv("PROXY_READ_TIMEOUT", "30"))
+PROXY_WRITE_TIMEOUT = float(os.getenv("PROXY_WRITE_TIMEOUT", "30"))
+PROXY_POOL_TIMEOUT = float(os.getenv("PROXY_POOL_TIMEOUT", "5"))
+
+
+def uds_path(url: str) -> Optional[str]:
+    """Socket path of a unix: upstream URL (unix:/path or unix:///path), None for TCP upstreams"""
+    if not url.startswith(UDS_PREFIX):
+        return None
+    path = url[len(UDS_PREFIX):]
+    return "/" + path.lstrip("/")
+
+
+def request_base(url: str) -> str:
+    """http:// base that requests to `url` are built on; the client mounts the matching transport for it"""
+    url = url.rstrip("/")
+    path = uds_path(url)
+    if path is not None:
+        # Stable per-socket pseudo host, so each socket gets its own mount and connection pool
+        return f"http://uds-{hashlib.sha1(path.encode()).hexdigest()[:8]}.upstream"
+    if url.startswith(H2C_PREFIX):
+        return "http://" + url[len(H2C_PREFIX):]
+    return url
+
+
+def h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_upstream_client(upstream_urls: Sequence[str] = ()) -> httpx.AsyncClient:
+    """Create the shared upstream client; call once per application lifespan
+
+    unix: and h2c:// upstreams in `upstream_urls` get their own mounted transport (and pool);
+    plain http:// upstreams share the default one.
+    """
+    limits = httpx.Limits(
+        max_connections=PROXY_MAX_CONNECTIONS,
+        max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=PROXY_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=PROXY_CONNECT_TIMEOUT,
+        read=PROXY_READ_TIMEOUT,
+        write=PROXY_WRITE_TIMEOUT,
+        pool=PROXY_POOL_TIMEOUT,
+    )
+
+    http2 = PROXY_HTTP2
+    if http2 and not h2_available():
+        print("⚠️ PROXY_HTTP2 requested but 'h2' is not installed (pip install httpx[http2]); using HTTP/1.1")
+        http2 = False
+
+    mounts: Dict[str, httpx.AsyncBaseTransport] = {}
+    for url in upstream_urls:
+        path = uds_path(url)
+        if path is not None:
+            mounts[request_base(url)] = httpx.AsyncHTTPTransport(uds=path, limits=limits)
+        elif url.startswith(H2C_PREFIX):
+            if h2_available():
+                mounts[request_base(url)] = httpx.AsyncHTTPTransport(http1=False, http2=True, limits=limits)
+            else:
+                print(f"⚠️ {url} needs 'h2' (pip install httpx[http2]); using HTTP/1.1 for it")
+
+    # trust_env=False: upstream traffic is local and must never go through HTTP(S)_PROXY
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, trust_env=False, mounts=mounts or None)
+
+
+def _transport_stats(transport: Optional[httpx.AsyncBaseTransport]) -> Dict[str, Any]:
+    # httpx does not expose pool state publicly; read it from the underlying httpcore pool
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    pending = list(getattr(pool, "_requests", []) or [])
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {
+        "connections": len(connections),
+        "in_use": len(connections) - idle,
+        "idle": idle,
+        "waiters": sum(1 for req in pending if req.is_queued()),
+        "http1": bool(getattr(pool, "_http1", True)),
+        "http2": bool(getattr(pool, "_http2", False)),
+        "uds": getattr(pool, "_uds", None),
+    }
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Snapshot connection pool usage (in-use, idle, waiters) for the shared client, totalled across transports"""
+    transports = {"default": _transport_stats(getattr(client, "_transport", None))}
+    for pattern, transport in (getattr(client, "_mounts", None) or {}).items():
+        transports[pattern.pattern] = _transport_stats(transport)
+
+    totals = {key: sum(t[key] for t in transports.values()) for key in ("connections", "in_use", "idle", "waiters")}
+    return {
+        **totals,
+        "max_connections": PROXY_MAX_CONNECTIONS,
+        "max_keepalive_connections": PROXY_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": PROXY_KEEPALIVE_EXPIRY,
+        "http2": transports["default"]["http2"],
+        "transports": transports if len(transports) > 1 else None,
+    }
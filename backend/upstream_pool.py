@@ -0,0 +1,166 @@
+"""
+ESA Life CEO 61x21 Framework - Upstream Pool
+Load balancing across Node.js workers with active health checks and slow re-admission
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Collection, Dict, List, Optional
+
+import httpx
+
+from upstream_client import request_base, uds_path
+
+LEAST_OUTSTANDING = "least_outstanding"
+POWER_OF_TWO = "p2c"
+
+
+class Upstream:
+    """One Node.js worker and its live load, health and latency statistics"""
+
+    __slots__ = (
+        "url", "base_url", "host_header", "outstanding", "requests", "errors", "latency_ewma_ms", "latency_max_ms",
+        "healthy", "consecutive_failures", "consecutive_successes", "ejections", "admitted_at",
+    )
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        # http:// base for requests; differs from `url` for unix: and h2c:// upstreams
+        self.base_url = request_base(self.url)
+        # Unix socket upstreams would otherwise see the pseudo host of base_url
+        self.host_header = "localhost" if uds_path(self.url) else None
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency_ewma_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.ejections = 0
+        self.admitted_at = 0.0
+
+    def weight(self, slow_start: float) -> float:
+        """Share of normal traffic: ramps linearly from 10% to 100% after re-admission"""
+        if slow_start <= 0 or not self.admitted_at:
+            return 1.0
+        return min(1.0, max(0.1, (time.monotonic() - self.admitted_at) / slow_start))
+
+    def stats(self, slow_start: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "weight": round(self.weight(slow_start), 3),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0,
+            "latency_ewma_ms": round(self.latency_ewma_ms, 2),
+            "latency_max_ms": round(self.latency_max_ms, 2),
+            "ejections": self.ejections,
+        }
+
+
+class UpstreamPool:
+    """Selects an upstream per request and keeps the set of healthy upstreams up to date"""
+
+    def __init__(self, urls: List[str], strategy: str = POWER_OF_TWO, health_path: str = "/health",
+                 health_interval: float = 5.0, health_timeout: float = 2.0, unhealthy_threshold: int = 3,
+                 healthy_threshold: int = 2, slow_start: float = 30.0):
+        if not urls:
+            raise ValueError("UpstreamPool needs at least one upstream URL")
+        self.upstreams = [Upstream(url) for url in urls]
+        self.strategy = strategy
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_threshold = unhealthy_threshold
+        self.healthy_threshold = healthy_threshold
+        self.slow_start = slow_start
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _load(self, upstream: Upstream) -> float:
+        return (upstream.outstanding + 1) / upstream.weight(self.slow_start)
+
+    def select(self, exclude: Collection[Upstream] = ()) -> Optional[Upstream]:
+        """Pick the least loaded healthy upstream; fails open to unhealthy ones, None if all are excluded"""
+        candidates = [u for u in self.upstreams if u.healthy and u not in exclude]
+        if not candidates:
+            candidates = [u for u in self.upstreams if u not in exclude]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.strategy == POWER_OF_TWO:
+            first, second = random.sample(candidates, 2)
+            return first if self._load(first) <= self._load(second) else second
+        return min(candidates, key=self._load)
+
+    def record(self, upstream: Upstream, latency_ms: float, ok: bool):
+        """Record the outcome of a proxied request; repeated failures eject the upstream"""
+        upstream.requests += 1
+        upstream.latency_ewma_ms = latency_ms if upstream.requests == 1 else 0.8 * upstream.latency_ewma_ms + 0.2 * latency_ms
+        upstream.latency_max_ms = max(upstream.latency_max_ms, latency_ms)
+        if ok:
+            upstream.consecutive_failures = 0
+            return
+        upstream.errors += 1
+        self._failure(upstream)
+
+    def _failure(self, upstream: Upstream):
+        upstream.consecutive_successes = 0
+        upstream.consecutive_failures += 1
+        if upstream.healthy and upstream.consecutive_failures >= self.unhealthy_threshold:
+            upstream.healthy = False
+            upstream.ejections += 1
+            print(f"⚠️ Upstream {upstream.url} ejected after {upstream.consecutive_failures} failures")
+
+    def _success(self, upstream: Upstream):
+        upstream.consecutive_failures = 0
+        upstream.consecutive_successes += 1
+        if not upstream.healthy and upstream.consecutive_successes >= self.healthy_threshold:
+            upstream.healthy = True
+            upstream.admitted_at = time.monotonic()
+            print(f"✅ Upstream {upstream.url} re-admitted (slow start {self.slow_start:.0f}s)")
+
+    async def probe(self, client: httpx.AsyncClient, upstream: Upstream):
+        """Active health check against the upstream's health endpoint"""
+        try:
+            response = await client.get(upstream.base_url + self.health_path, timeout=self.health_timeout,
+                                        headers={"host": upstream.host_header} if upstream.host_header else None)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            self._success(upstream)
+        else:
+            self._failure(upstream)
+
+    async def _health_loop(self, client: httpx.AsyncClient):
+        while True:
+            await asyncio.gather(*(self.probe(client, u) for u in self.upstreams))
+            await asyncio.sleep(self.health_interval)
+
+    def start(self, client: httpx.AsyncClient):
+        """Start background health probes"""
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(client))
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-upstream health, load, latency and error statistics"""
+        return {
+            "strategy": self.strategy,
+            "healthy": sum(1 for u in self.upstreams if u.healthy),
+            "total": len(self.upstreams),
+            "upstreams": [u.stats(self.slow_start) for u in self.upstreams],
+        }
@@ -0,0 +1,222 @@
+"""
+ESA LIFE CEO 61×21 Framework - Agent Activity History
+Fixed-capacity ring buffers of compact records with bodies spilled to disk and O(1) running aggregates
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+AGENT_HISTORY_CAPACITY = int(os.getenv("AGENT_HISTORY_CAPACITY", "500"))
+AGENT_HISTORY_SEGMENT_BYTES = int(os.getenv("AGENT_HISTORY_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+AGENT_HISTORY_SPILL = os.getenv("AGENT_HISTORY_SPILL", "true").lower() in ("1", "true", "yes")
+
+# (segment, offset, length) of a spilled body
+BodyRef = Tuple[int, int, int]
+
+_spill_dir: Optional[str] = None
+
+
+def spill_directory() -> str:
+    """Per-process directory for spilled bodies, removed when the process exits"""
+    global _spill_dir
+    if _spill_dir is None:
+        _spill_dir = tempfile.mkdtemp(prefix=f"esa-agent-history-{os.getpid()}-",
+                                      dir=os.getenv("AGENT_HISTORY_SPILL_DIR") or None)
+        atexit.register(shutil.rmtree, _spill_dir, True)
+    return _spill_dir
+
+
+class BodySpill:
+    """Append-only segment files holding record bodies (LLM responses, contexts) outside the heap"""
+
+    def __init__(self, name: str, segment_bytes: int = AGENT_HISTORY_SEGMENT_BYTES):
+        self.name = name
+        self.segment_bytes = segment_bytes
+        self.segment = 0
+        self.oldest_segment = 0
+        self._file = None
+        self.failed = False
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(spill_directory(), f"{self.name}.{segment}.jsonl")
+
+    def write(self, body: Dict[str, Any]) -> Optional[BodyRef]:
+        if self.failed:
+            return None
+        data = (json.dumps(body, default=str) + "\n").encode()
+        try:
+            if self._file is None:
+                self._file = open(self._path(self.segment), "ab")
+            elif self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self.segment += 1
+                self._file = open(self._path(self.segment), "ab")
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            # History keeps working without bodies rather than failing agent work
+            print(f"⚠️ Agent history spill for {self.name} disabled: {e}")
+            self.failed = True
+            return None
+        return self.segment, offset, len(data)
+
+    def read(self, ref: BodyRef) -> Optional[Dict[str, Any]]:
+        segment, offset, length = ref
+        try:
+            with open(self._path(segment), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+    def release_before(self, segment: int):
+        """Delete segments no live record points into any more"""
+        while self.oldest_segment < min(segment, self.segment):
+            try:
+                os.remove(self._path(self.oldest_segment))
+            except OSError:
+                pass
+            self.oldest_segment += 1
+
+
+class ActivityRecord:
+    """One unit of agent activity; bulky fields live in the spilled body"""
+
+    __slots__ = ("task_id", "task_type", "success", "confidence", "duration_ms", "queue_ms", "ttft_ms", "cached",
+                 "timestamp", "body_ref")
+
+    def __init__(self, task_id: Optional[str], task_type: str, success: bool, confidence: Optional[float],
+                 duration_ms: int, queue_ms: int, ttft_ms: Optional[int], cached: bool, timestamp: float,
+                 body_ref: Any):
+        self.task_id = task_id
+        self.task_type = task_type
+        self.success = success
+        self.confidence = confidence
+        self.duration_ms = duration_ms
+        self.queue_ms = queue_ms
+        self.ttft_ms = ttft_ms  # time to first streamed token; None when the reply wasn't streamed
+        self.cached = cached
+        self.timestamp = timestamp
+        self.body_ref = body_ref  # BodyRef into the spill, or what the log's sink returned
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.task_id,
+            "task_type": self.task_type,
+            "success": self.success,
+            "confidence": self.confidence,
+            "duration_ms": self.duration_ms,
+            "queue_ms": self.queue_ms,
+            "ttft_ms": self.ttft_ms,
+            "cached": self.cached,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+        }
+
+
+class ActivityLog:
+    """Ring buffer of the last `capacity` records plus lifetime aggregates updated on append
+
+    `sink`, if given, receives every record with its body (e.g. to persist it durably). When the
+    sink keeps the bodies, pass spill=False and a `body_source` that reads them back from there;
+    the sink's return value is kept as the record's body_ref for it.
+    """
+
+    def __init__(self, name: str, capacity: int = AGENT_HISTORY_CAPACITY, spill: bool = AGENT_HISTORY_SPILL,
+                 sink: Optional[Callable[[ActivityRecord, Dict[str, Any]], Any]] = None,
+                 body_source: Optional[Callable[[List[ActivityRecord]], Awaitable[List[Optional[Dict[str, Any]]]]]] = None):
+        self.records: Deque[ActivityRecord] = deque(maxlen=capacity)
+        self.spill = BodySpill(name) if spill else None
+        self.sink = sink
+        self.body_source = body_source
+        self.total = 0
+        self.successful = 0
+        self.cached = 0
+        self.duration_ms_total = 0
+        self.duration_ms_max = 0
+        self.queue_ms_total = 0
+        self.streamed = 0
+        self.ttft_ms_total = 0
+        self.last_timestamp: Optional[float] = None
+
+    def append(self, task_type: str, success: bool, body: Dict[str, Any], task_id: Optional[str] = None,
+               confidence: Optional[float] = None, duration_ms: int = 0, cached: bool = False,
+               queue_ms: int = 0, ttft_ms: Optional[int] = None) -> ActivityRecord:
+        now = time.time()
+        body_ref = self.spill.write(body) if self.spill is not None else None
+        record = ActivityRecord(task_id, task_type, success, confidence, duration_ms, queue_ms, ttft_ms, cached, now,
+                                body_ref)
+        self.records.append(record)
+        if self.spill is not None and len(self.records) == self.records.maxlen and self.records[0].body_ref:
+            self.spill.release_before(self.records[0].body_ref[0])
+
+        self.total += 1
+        self.successful += success
+        self.cached += cached
+        self.duration_ms_total += duration_ms
+        self.duration_ms_max = max(self.duration_ms_max, duration_ms)
+        self.queue_ms_total += queue_ms
+        if ttft_ms is not None:
+            self.streamed += 1
+            self.ttft_ms_total += ttft_ms
+        self.last_timestamp = now
+        if self.sink is not None:
+            ref = self.sink(record, body)
+            if self.spill is None:
+                record.body_ref = ref
+        return record
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[ActivityRecord]:
+        return iter(self.records)
+
+    def body(self, record: ActivityRecord) -> Optional[Dict[str, Any]]:
+        if record.body_ref is None or self.spill is None:
+            return None
+        return self.spill.read(record.body_ref)
+
+    async def bodies(self, records: List[ActivityRecord]) -> List[Optional[Dict[str, Any]]]:
+        """Bodies of `records`, from the body source or the spill files (read off the event loop)"""
+        if self.body_source is not None:
+            return await self.body_source(records)
+        if self.spill is None:
+            return [None] * len(records)
+        return await asyncio.to_thread(lambda: [self.body(record) for record in records])
+
+    async def recent(self, limit: int = 20, include_bodies: bool = False) -> List[Dict[str, Any]]:
+        """Newest records first, optionally with their bodies read back"""
+        records = list(reversed(list(self.records)[-limit:])) if limit > 0 else []
+        bodies = await self.bodies(records) if include_bodies else [None] * len(records)
+        entries = []
+        for record, body in zip(records, bodies):
+            entry = record.to_dict()
+            entry.update(body or {})
+            entries.append(entry)
+        return entries
+
+    def last_activity(self) -> Optional[str]:
+        return datetime.fromtimestamp(self.last_timestamp).isoformat() if self.last_timestamp else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "failed": self.total - self.successful,
+            "cached": self.cached,
+            "avg_duration_ms": round(self.duration_ms_total / self.total, 1) if self.total else 0,
+            "max_duration_ms": self.duration_ms_max,
+            "avg_queue_ms": round(self.queue_ms_total / self.total, 1) if self.total else 0,
+            "streamed": self.streamed,
+            "avg_ttft_ms": round(self.ttft_ms_total / self.streamed, 1) if self.streamed else None,
+            "retained": len(self.records),
+        }
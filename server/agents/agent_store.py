@@ -0,0 +1,370 @@
+"""
+ESA LIFE CEO 61×21 Framework - Durable Agent Store
+Append-only SQLite (WAL) log of agent activity and results, written in batches and queried by index
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from llm_cache import AGENT_DATA_DIR
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS records ("
+    "id INTEGER PRIMARY KEY, agent INTEGER NOT NULL, stream TEXT NOT NULL, task_type TEXT, "
+    "ts REAL NOT NULL, success INTEGER, body TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS records_agent_stream_ts ON records (agent, stream, ts)",
+    "CREATE INDEX IF NOT EXISTS records_stream_type_ts ON records (stream, task_type, ts)",
+    "CREATE INDEX IF NOT EXISTS records_ts ON records (ts)",
+)
+
+
+class RecordRef:
+    """Returned by append(); `id` is the record's row id once it has been written"""
+
+    __slots__ = ("id",)
+
+    def __init__(self):
+        self.id: Optional[int] = None
+
+
+# (agent, stream, task_type, ts, success, body json, ref)
+PendingRow = Tuple[int, str, Optional[str], float, Optional[int], str, RecordRef]
+
+TimeBound = Union[None, float, str]
+
+
+def to_timestamp(value: TimeBound) -> Optional[float]:
+    """Epoch seconds from a number or an ISO-8601 string"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+
+class AgentStore:
+    """Durable, append-only record log shared by every agent (and pre-fork worker) on the host
+
+    append() only queues a row; a background task writes queued rows in one transaction every
+    `flush_interval` seconds, or sooner once `batch_size` rows are waiting. Compaction removes
+    rows older than `retention_days` in small batches and truncates the WAL, so months of
+    history stay on disk, not in RAM, and the file does not grow without bound.
+
+    At most `max_pending` rows wait in memory (e.g. while the disk is failing); past that the
+    oldest are dropped and counted in stats()["dropped"].
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 0.5,
+                 max_pending: int = 50_000, retention_days: float = 180, compact_interval: float = 3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self.pending: Deque[PendingRow] = deque(maxlen=max_pending)
+        self.stats_counters = {"appended": 0, "written": 0, "flushes": 0, "dropped": 0, "compacted": 0,
+                               "write_errors": 0}
+        self.last_flush_ms = 0.0
+        self.last_compaction: Optional[float] = None
+        self._db: Optional[sqlite3.Connection] = None
+        # One thread owns the connection; reads and writes are serialised through it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-store")
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5)
+            # auto_vacuum only takes effect on a new database; lets compaction return pages to the OS
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.commit()
+            self._db = db
+        return self._db
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Writes
+
+    def append(self, agent: int, stream: str, body: Dict[str, Any], task_type: Optional[str] = None,
+               success: Optional[bool] = None, timestamp: Optional[float] = None) -> RecordRef:
+        """Queue one record; O(1) and never blocks on disk"""
+        if len(self.pending) == self.pending.maxlen:
+            self.stats_counters["dropped"] += 1
+        ref = RecordRef()
+        row = (agent, stream, task_type, timestamp or time.time(),
+               None if success is None else int(success),
+               json.dumps(body, separators=(",", ":"), default=str), ref)
+        self.pending.append(row)
+        self.stats_counters["appended"] += 1
+        if self._task is None:
+            self._start_flusher()
+        elif len(self.pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return ref
+
+    def _write(self, rows: List[PendingRow]):
+        db = self._connect()
+        with db:
+            ids = [db.execute("INSERT INTO records (agent, stream, task_type, ts, success, body) VALUES (?, ?, ?, ?, ?, ?)",
+                              row[:-1]).lastrowid
+                   for row in rows]
+        # Only once committed: a rolled-back batch is retried and gets new ids
+        for row, row_id in zip(rows, ids):
+            row[-1].id = row_id
+
+    async def flush(self):
+        """Write everything queued so far in one transaction"""
+        if not self.pending:
+            return
+        rows = list(self.pending)
+        self.pending.clear()
+        started = time.perf_counter()
+        try:
+            await self._run(self._write, rows)
+        except sqlite3.Error as e:
+            self.stats_counters["write_errors"] += 1
+            # Requeue ahead of the rows appended meanwhile; past max_pending the oldest go, as in append()
+            requeued = len(rows) + len(self.pending)
+            self.pending = deque([*rows, *self.pending], maxlen=self.pending.maxlen)
+            dropped = requeued - len(self.pending)
+            self.stats_counters["dropped"] += dropped
+            print(f"⚠️ Agent store write of {len(rows)} records failed, will retry"
+                  f"{f' ({dropped} oldest dropped, queue full)' if dropped else ''}: {e}")
+            return
+        self.stats_counters["written"] += len(rows)
+        self.stats_counters["flushes"] += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _start_flusher(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet: rows wait in the queue until start() or the next append under a loop
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        next_compaction = time.monotonic() + self.compact_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self.compact_interval > 0 and time.monotonic() >= next_compaction:
+                next_compaction = time.monotonic() + self.compact_interval
+                try:
+                    await self.compact()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Agent store compaction failed: {e}")
+
+    # Compaction
+
+    def _compact(self, cutoff: float, batch: int = 5000) -> int:
+        db = self._connect()
+        removed = 0
+        while True:
+            with db:
+                cursor = db.execute(
+                    "DELETE FROM records WHERE id IN (SELECT id FROM records WHERE ts < ? LIMIT ?)", (cutoff, batch)
+                )
+            removed += cursor.rowcount
+            if cursor.rowcount < batch:
+                break
+        db.execute("PRAGMA incremental_vacuum")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.execute("PRAGMA optimize")
+        return removed
+
+    async def compact(self) -> Dict[str, Any]:
+        """Drop records past the retention window and give the space back"""
+        cutoff = time.time() - self.retention_days * 86400
+        removed = await self._run(self._compact, cutoff)
+        self.stats_counters["compacted"] += removed
+        self.last_compaction = time.time()
+        return {"removed": removed, "cutoff": datetime.fromtimestamp(cutoff).isoformat()}
+
+    # Reads
+
+    def _query(self, agent: Optional[int], stream: Optional[str], task_type: Optional[str],
+               since: Optional[float], until: Optional[float], limit: int, before_id: Optional[int]) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        for column, value in (("agent", agent), ("stream", stream), ("task_type", task_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT id, agent, stream, task_type, ts, success, body FROM records {where} ORDER BY ts DESC, id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [
+            {
+                "id": row_id, "agent": agent_id, "stream": row_stream, "task_type": row_type,
+                "timestamp": datetime.fromtimestamp(ts).isoformat(),
+                "success": None if success is None else bool(success),
+                **json.loads(body),
+            }
+            for row_id, agent_id, row_stream, row_type, ts, success, body in rows
+        ]
+
+    async def query(self, agent: Optional[int] = None, stream: Optional[str] = None, task_type: Optional[str] = None,
+                    since: TimeBound = None, until: TimeBound = None, limit: int = 100,
+                    before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest-first records matching the filters; pass the last id back as `before_id` to page"""
+        await self.flush()
+        return await self._run(self._query, agent, stream, task_type, to_timestamp(since), to_timestamp(until),
+                               limit, before_id)
+
+    def _bodies(self, ids: List[int], chunk: int = 500) -> Dict[int, Dict[str, Any]]:
+        found: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), chunk):
+            batch = ids[start:start + chunk]
+            rows = self._connect().execute(
+                f"SELECT id, body FROM records WHERE id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            found.update((row_id, json.loads(body)) for row_id, body in rows)
+        return found
+
+    async def bodies(self, refs: List[Optional[RecordRef]]) -> List[Optional[Dict[str, Any]]]:
+        """Bodies of the records append() returned these refs for; None where dropped or compacted away"""
+        if not refs:
+            return []
+        await self.flush()
+        ids = [ref.id for ref in refs if ref is not None and ref.id is not None]
+        found = await self._run(self._bodies, ids) if ids else {}
+        return [found.get(ref.id) if ref is not None else None for ref in refs]
+
+    def _count(self, agent: Optional[int], stream: Optional[str]) -> int:
+        if agent is None:
+            return self._connect().execute("SELECT count(*) FROM records").fetchone()[0]
+        return self._connect().execute(
+            "SELECT count(*) FROM records WHERE agent = ? AND stream = ?", (agent, stream)
+        ).fetchone()[0]
+
+    async def count(self, agent: Optional[int] = None, stream: Optional[str] = None) -> int:
+        await self.flush()
+        return await self._run(self._count, agent, stream)
+
+    # Lifecycle
+
+    async def start(self):
+        await self._run(self._connect)
+        if self._task is None:
+            self._start_flusher()
+        print(f"✅ Agent store ready at {self.path}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return {
+            **self.stats_counters,
+            "pending": len(self.pending),
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "last_compaction": datetime.fromtimestamp(self.last_compaction).isoformat() if self.last_compaction else None,
+            "retention_days": self.retention_days,
+            "file_bytes": size,
+            "path": self.path,
+        }
+
+
+AGENT_STORE_ENABLED = os.getenv("AGENT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+agent_store = AgentStore(
+    path=os.getenv("AGENT_STORE_PATH", os.path.join(AGENT_DATA_DIR, "agent_store.sqlite3")),
+    batch_size=int(os.getenv("AGENT_STORE_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("AGENT_STORE_FLUSH_INTERVAL", "0.5")),
+    retention_days=float(os.getenv("AGENT_STORE_RETENTION_DAYS", "180")),
+    compact_interval=float(os.getenv("AGENT_STORE_COMPACT_INTERVAL", "3600")),
+) if AGENT_STORE_ENABLED else None
+
+
+class AgentCollection:
+    """Per-agent result log (knowledge base, solutions, incidents) kept in the durable store
+
+    Only a count and the last few records stay in memory; older ones are read back with query().
+    The count starts from the records already in the store (those of earlier runs and of other
+    workers), loaded in the background once an event loop is running. Without a store the
+    collection is just those recent records.
+    """
+
+    def __init__(self, agent: int, stream: str, recent: int = 20):
+        self.agent = agent
+        self.stream = stream
+        self.total = 0
+        self.recent_records: Deque[Dict[str, Any]] = deque(maxlen=recent)
+        self.loaded = agent_store is None
+        self._load_task: Optional[asyncio.Task] = None
+        self._start_load()
+
+    def _start_load(self):
+        if self.loaded or self._load_task is not None:
+            return
+        try:
+            self._load_task = asyncio.get_running_loop().create_task(self.load())
+        except RuntimeError:
+            pass  # no loop yet: loaded on the next append under one
+
+    async def load(self):
+        """Seed the count from the store"""
+        appended = self.total
+        try:
+            # count() flushes first, so it includes the records appended before this call
+            stored = await agent_store.count(self.agent, self.stream)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not count stored {self.stream} records of agent {self.agent}: {e}")
+            return
+        finally:
+            self._load_task = None
+        self.total = stored + self.total - appended
+        self.loaded = True
+
+    def append(self, record: Dict[str, Any], task_type: Optional[str] = None,
+               success: Optional[bool] = None) -> Optional[RecordRef]:
+        self.total += 1
+        self.recent_records.append(record)
+        if agent_store is None:
+            return None
+        self._start_load()
+        return agent_store.append(self.agent, self.stream, record, task_type=task_type, success=success)
+
+    def __len__(self) -> int:
+        return self.total
+
+    async def query(self, **filters) -> List[Dict[str, Any]]:
+        if agent_store is None:
+            return list(reversed(self.recent_records))[:filters.get("limit", 100)]
+        return await agent_store.query(agent=self.agent, stream=self.stream, **filters)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+ESA LIFE CEO 61×21 Framework - Agent API Startup Budget
+Fails when importing the functional agent API gets slower than the budget or starts building agents eagerly
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so nothing is already imported
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import functional_agent_api as api
+imported = time.perf_counter()
+api.register_priority_agents()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - started) * 1000,
+    "catalogued": sorted(api.agent_registry.descriptors),
+    "built": sorted(api.agent_registry.agents),
+    "agent_modules": sorted(m for m in sys.modules if m.startswith("real_layer")),
+    "llm_sdk_loaded": "emergentintegrations.llm.chat" in sys.modules,
+}))
+"""
+
+# Builds every catalogued agent and checks its descriptor still matches the class
+CATALOG_PROBE = """
+import json
+from functional_agent_base import agent_registry
+mismatches = []
+for layer_id, descriptor in agent_registry.descriptors.items():
+    agent = agent_registry.get_agent(layer_id)
+    for field in ("layer_id", "layer_name", "specialization"):
+        if getattr(agent, field) != getattr(descriptor, field):
+            mismatches.append(f"Layer {layer_id} {field}: catalog {getattr(descriptor, field)!r} != agent {getattr(agent, field)!r}")
+print(json.dumps(mismatches))
+"""
+
+
+def run_probe(code: str, env: dict) -> str:
+    result = subprocess.run([sys.executable, "-c", code], cwd=AGENTS_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"probe exited with {result.returncode}:\n{result.stdout}{result.stderr}")
+    # Agent modules print progress; the probe's JSON is the last line
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check functional agent API startup time stays within budget")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("AGENT_STARTUP_BUDGET_MS", "1500")),
+                        help="maximum import + startup time (default 1500, or AGENT_STARTUP_BUDGET_MS)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time; the fastest counts")
+    parser.add_argument("--check-catalog", action="store_true",
+                        help="also build every agent and verify the catalog matches the agent classes")
+    args = parser.parse_args()
+
+    # Measure the lazy path, whatever the deployment preloads
+    env = {**os.environ, "AGENT_API_PRELOAD": "", "AGENT_STORE_ENABLED": "false"}
+    samples = [json.loads(run_probe(PROBE, env)) for _ in range(max(1, args.runs))]
+    best = min(samples, key=lambda s: s["startup_ms"])
+
+    failures = []
+    if best["startup_ms"] > args.budget_ms:
+        failures.append(f"startup took {best['startup_ms']:.0f}ms, budget is {args.budget_ms:.0f}ms")
+    if best["built"] or best["agent_modules"]:
+        failures.append(f"agents built at import: layers {best['built']}, modules {best['agent_modules']}")
+    if best["llm_sdk_loaded"]:
+        failures.append("the LLM SDK was imported at startup")
+    if args.check_catalog:
+        failures.extend(json.loads(run_probe(CATALOG_PROBE, env)))
+
+    print(f"⏱️ Agent API import {best['import_ms']:.0f}ms, startup {best['startup_ms']:.0f}ms "
+          f"(budget {args.budget_ms:.0f}ms, best of {len(samples)}), {len(best['catalogued'])} agents catalogued")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Agent API startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
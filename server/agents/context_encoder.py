@@ -0,0 +1,158 @@
+"""
+ESA LIFE CEO 61×21 Framework - Context Encoder
+Compact, token-budgeted serialisation of the context, options and workflows inlined into agent prompts
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+# Tokenizer family of the agents' model (gpt-4o-mini)
+TOKEN_ENCODING = os.getenv("AGENT_TOKEN_ENCODING", "o200k_base")
+
+_tokenizer = None
+
+
+def tokenizer():
+    """tiktoken encoding if tiktoken is installed (imported on first use), otherwise False"""
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            import tiktoken
+            _tokenizer = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception:  # not installed, or the encoding can't be loaded offline
+            _tokenizer = False
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Local token count: exact with tiktoken, else ~4 characters per token"""
+    if not text:
+        return 0
+    encoding = tokenizer()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    encoding = tokenizer()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:tokens])
+    return text[:tokens * 4]
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def parse_budgets(spec: str) -> Dict[int, int]:
+    """"layer:tokens" pairs, comma-separated"""
+    budgets: Dict[int, int] = {}
+    for entry in spec.split(","):
+        if ":" in entry:
+            layer, tokens = entry.split(":", 1)
+            budgets[int(layer)] = int(tokens)
+    return budgets
+
+
+class EncodedContext:
+    """Serialised context, plus what it would have cost as the pretty-printed JSON prompts used to inline
+
+    `original_tokens` is only measured when savings stats are on (it means tokenizing the value twice);
+    otherwise it and `tokens_saved` are None.
+    """
+
+    __slots__ = ("text", "tokens", "original_tokens", "truncated")
+
+    def __init__(self, text: str, tokens: int, original_tokens: Optional[int], truncated: bool):
+        self.text = text
+        self.tokens = tokens
+        self.original_tokens = original_tokens
+        self.truncated = truncated
+
+    @property
+    def tokens_saved(self) -> Optional[int]:
+        return None if self.original_tokens is None else max(0, self.original_tokens - self.tokens)
+
+    def __add__(self, other: "EncodedContext") -> "EncodedContext":
+        original = (None if self.original_tokens is None or other.original_tokens is None
+                    else self.original_tokens + other.original_tokens)
+        return EncodedContext(self.text + other.text, self.tokens + other.tokens, original,
+                              self.truncated or other.truncated)
+
+
+class ContextEncoder:
+    """Serialises prompt context compactly, shrinking it until it fits `budget` tokens
+
+    Compact JSON alone usually suffices. Over budget, long lists become {"count", "sample"}
+    (plus min/max/mean for numeric lists), long strings are cut, and wide objects keep their
+    first keys; each pass halves those limits. Past the minimums the halving continues until
+    only the shape is left (key and item counts, no values), so the result is always valid
+    JSON. A budget of 0 only compacts.
+    """
+
+    def __init__(self, budget: int, max_items: int = 20, max_string: int = 1000, min_items: int = 2,
+                 min_string: int = 60, measure_savings: bool = False):
+        self.budget = budget
+        self.max_items = max_items
+        self.max_string = max_string
+        self.min_items = min_items
+        self.min_string = min_string
+        self.measure_savings = measure_savings
+
+    def encode(self, value: Any) -> EncodedContext:
+        original_tokens = count_tokens(json.dumps(value, indent=2, default=str)) if self.measure_savings else None
+        text = compact_json(value)
+        tokens = count_tokens(text)
+        if not self.budget or tokens <= self.budget:
+            return EncodedContext(text, tokens, original_tokens, False)
+
+        items, chars = self.max_items, self.max_string
+        while True:
+            text = compact_json(self.shrink(value, items, chars))
+            tokens = count_tokens(text)
+            if tokens <= self.budget or (items, chars) == (0, 0):
+                return EncodedContext(text, tokens, original_tokens, True)
+            if items <= self.min_items and chars <= self.min_string:
+                items, chars = items // 2, chars // 2  # past the minimums: drop towards shape only
+            else:
+                items, chars = max(self.min_items, items // 2), max(self.min_string, chars // 2)
+
+    def shrink(self, value: Any, items: int, chars: int) -> Any:
+        if isinstance(value, str):
+            return value if len(value) <= chars else f"{value[:chars]}…[+{len(value) - chars} chars]"
+        if isinstance(value, dict):
+            keys = list(value)
+            width = items * 4
+            shrunk = {key: self.shrink(value[key], items, chars) for key in keys[:width]}
+            if len(keys) > width:
+                shrunk["…"] = f"+{len(keys) - width} more keys"
+            return shrunk
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            if len(values) <= items:
+                return [self.shrink(v, items, chars) for v in values]
+            summary: Dict[str, Any] = {"count": len(values),
+                                       "sample": [self.shrink(v, items, chars) for v in values[:items]]}
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                summary.update(min=min(values), max=max(values), mean=round(sum(values) / len(values), 4))
+            return summary
+        return value
+
+
+AGENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "2000"))
+# Per-layer overrides, "layer:tokens" pairs, e.g. "35:4000" for the orchestrator's workflows
+AGENT_CONTEXT_BUDGETS = parse_budgets(os.getenv("AGENT_CONTEXT_BUDGETS", "35:4000"))
+AGENT_CONTEXT_MAX_ITEMS = int(os.getenv("AGENT_CONTEXT_MAX_ITEMS", "20"))
+AGENT_CONTEXT_MAX_STRING = int(os.getenv("AGENT_CONTEXT_MAX_STRING", "1000"))
+# Measure tokens saved against pretty-printed JSON (costs a second tokenization per context)
+AGENT_CONTEXT_STATS = os.getenv("AGENT_CONTEXT_STATS", "false").lower() in ("1", "true", "yes")
+
+
+def context_encoder_for(layer_id: int, budget: Optional[int] = None) -> ContextEncoder:
+    """Encoder with the layer's budget: explicit, then AGENT_CONTEXT_BUDGETS, then the default"""
+    if budget is None:
+        budget = AGENT_CONTEXT_BUDGETS.get(layer_id, AGENT_CONTEXT_TOKEN_BUDGET)
+    return ContextEncoder(budget, AGENT_CONTEXT_MAX_ITEMS, AGENT_CONTEXT_MAX_STRING,
+                          measure_savings=AGENT_CONTEXT_STATS)
@@ -5,25 +5,34 @@ FastAPI server providing REST endpoints for all 61 functional agents
 """
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
+from datetime import datetime
 import asyncio
+import json
 import sys
 import os
+import time
+from contextlib import aclosing
 
 # Add the server directory to Python path
 sys.path.append('/app/server')
 sys.path.append('/app/server/agents')
+# The pre-fork supervisor lives with the backend proxy
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+try:
+    import prefork
+except ImportError:
+    prefork = None
 
 try:
     from functional_agent_base import FunctionalAgent, AgentTask, agent_registry
-    from real_layer35_ai_agent_management import master_orchestrator
-    from real_layer01_database_architecture import database_agent
-    from real_layer49_security_hardening import security_agent
-    from real_layer50_devops_automation import devops_agent
-    from real_layer44_knowledge_graph import knowledge_agent
-    from real_layer45_reasoning_engine import reasoning_agent
-    print("✅ All functional agents imported successfully")
+    from llm_cache import llm_cache
+    from llm_governor import llm_governor
+    from agent_store import agent_store
+    print(f"✅ Functional agent catalog loaded ({len(agent_registry.descriptors)} agents, built on first use)")
 except ImportError as e:
     print(f"❌ Failed to import agents: {e}")
     exit(1)
@@ -41,10 +50,23 @@ class AgentTaskRequest(BaseModel):
     description: str
     context: Dict[str, Any]
     expected_output: Optional[str] = ""
+    use_cache: bool = True
+
+class BatchTaskItem(BaseModel):
+    task_type: str
+    description: str
+    context: Dict[str, Any]
+    expected_output: Optional[str] = ""
+
+class BatchTaskRequest(BaseModel):
+    tasks: List[BatchTaskItem]
+    concurrency: Optional[int] = None
+    use_cache: bool = True
 
 class DecisionRequest(BaseModel):
     context: Dict[str, Any]
     options: Optional[List[Any]] = None
+    use_cache: bool = True
 
 class WorkflowRequest(BaseModel):
     goal: str
@@ -55,16 +77,21 @@ class WorkflowRequest(BaseModel):
 
 class LearningRequest(BaseModel):
     experience: Dict[str, Any]
+    use_cache: bool = True
+
+AGENT_BATCH_MAX_TASKS = int(os.getenv("AGENT_BATCH_MAX_TASKS", "100"))
+
+# Agents are built on first request; AGENT_API_PRELOAD="35,1" (or "all") builds those at startup instead
+AGENT_API_PRELOAD = os.getenv("AGENT_API_PRELOAD", "")
 
-# Register all priority agents
 def register_priority_agents():
-    """Register all functional agents in the system"""
-    agent_registry.register_agent(master_orchestrator)  # Layer 35
-    agent_registry.register_agent(database_agent)       # Layer 1
-    agent_registry.register_agent(security_agent)       # Layer 49
-    agent_registry.register_agent(devops_agent)         # Layer 50
-    agent_registry.register_agent(knowledge_agent)      # Layer 44
-    agent_registry.register_agent(reasoning_agent)      # Layer 45
+    """Build the agents listed in AGENT_API_PRELOAD ahead of their first request"""
+    if AGENT_API_PRELOAD.strip().lower() == "all":
+        layer_ids = list(agent_registry.descriptors)
+    else:
+        layer_ids = [int(layer_id) for layer_id in AGENT_API_PRELOAD.split(",") if layer_id.strip()]
+    for layer_id in layer_ids:
+        agent_registry.get_agent(layer_id)
 
 # API Routes
 @app.get("/")
@@ -74,11 +101,15 @@ async def root():
         "framework": "ESA LIFE CEO 61×21 Functional Agents",
         "version": "1.0.0", 
         "status": "operational",
-        "registered_agents": len(agent_registry.agents),
+        "registered_agents": len(agent_registry.descriptors),
+        "active_agents": len(agent_registry.agents),
         "available_endpoints": [
             "/agents/framework-status",
             "/agents/{layer_id}/execute-work",
+            "/agents/{layer_id}/execute-batch",
+            "/agents/{layer_id}/execute-work/stream",
             "/agents/{layer_id}/make-decision", 
+            "/agents/{layer_id}/make-decision/stream",
             "/agents/{layer_id}/learn",
             "/agents/orchestrate-workflow",
             "/docs"
@@ -88,7 +119,7 @@ async def root():
 @app.get("/agents/framework-status")
 async def get_framework_status():
     """Get overall framework status and agent registry"""
-    agents = agent_registry.get_all_agents()
+    agents = agent_registry.list_layers()
     
     return {
         "framework": {
@@ -106,7 +137,7 @@ async def get_framework_status():
             }
             for agent in agents
         ],
-        "orchestrator_available": agent_registry.orchestrator is not None,
+        "orchestrator_available": agent_registry.is_available(35),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -124,16 +155,116 @@ async def execute_agent_work(layer_id: int, request: AgentTaskRequest):
         expected_output=request.expected_output
     )
     
-    result = await agent.execute_work(task)
+    result = await agent.execute_work(task, use_cache=request.use_cache)
     
-    return {
+    return work_result_response(layer_id, result)
+
+def work_result_response(layer_id: int, result) -> Dict[str, Any]:
+    response = {
         "success": result.success,
         "result": result.result,
         "confidence": result.confidence,
         "agent": f"Layer {layer_id}",
         "duration_ms": result.duration_ms,
+        "queue_ms": result.queue_ms,
+        "cached": result.cached,
+        "context_tokens": result.context_tokens,
+        "context_tokens_saved": result.context_tokens_saved,
         "timestamp": result.completed_at.isoformat()
     }
+    if result.ttft_ms is not None:
+        response["ttft_ms"] = result.ttft_ms
+    return response
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# No-cache, and no buffering by nginx-style proxies in front of us, so tokens reach the browser as they arrive
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/agents/{layer_id}/execute-work/stream")
+async def stream_agent_work(layer_id: int, request: AgentTaskRequest):
+    """Execute work task as Server-Sent Events: "token" events as the reply is generated, then one "result"
+    
+    The result event carries the same fields as /execute-work plus ttft_ms, the time to the first token.
+    """
+    agent = agent_registry.get_agent(layer_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
+    
+    task = AgentTask(
+        task_type=request.task_type,
+        description=request.description,
+        context=request.context,
+        expected_output=request.expected_output
+    )
+    
+    async def events():
+        # Closed explicitly so a client that disconnects frees the LLM slot straight away
+        async with aclosing(agent.stream_work(task, use_cache=request.use_cache)) as stream:
+            async for item in stream:
+                if isinstance(item, str):
+                    yield sse_event("token", {"text": item})
+                else:
+                    yield sse_event("result", work_result_response(layer_id, item))
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/agents/{layer_id}/execute-batch")
+async def execute_agent_batch(layer_id: int, request: BatchTaskRequest):
+    """Execute many work tasks concurrently, streaming results as NDJSON in completion order
+
+    Each line is one task's result with its "index" in the request; the last line is {"summary": ...}
+    with the batch wall time next to the summed task time.
+    """
+    agent = agent_registry.get_agent(layer_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
+    if not request.tasks:
+        raise HTTPException(status_code=400, detail="Batch has no tasks")
+    if len(request.tasks) > AGENT_BATCH_MAX_TASKS:
+        raise HTTPException(status_code=400,
+                            detail=f"Batch has {len(request.tasks)} tasks; the limit is {AGENT_BATCH_MAX_TASKS}")
+    
+    tasks = [
+        AgentTask(task_type=item.task_type, description=item.description, context=item.context,
+                  expected_output=item.expected_output)
+        for item in request.tasks
+    ]
+    
+    async def results():
+        started = time.perf_counter()
+        durations, succeeded, cached = [], 0, 0
+        async for index, result in agent.execute_many(tasks, request.concurrency, request.use_cache):
+            durations.append(result.duration_ms)
+            succeeded += result.success
+            cached += result.cached
+            yield json.dumps({
+                "index": index,
+                "task_id": tasks[index].id,
+                "success": result.success,
+                "result": result.result,
+                "confidence": result.confidence,
+                "duration_ms": result.duration_ms,
+                "queue_ms": result.queue_ms,
+                "cached": result.cached,
+                "context_tokens_saved": result.context_tokens_saved,
+                "completed_after_ms": round((time.perf_counter() - started) * 1000)
+            }) + "\n"
+        wall_ms = (time.perf_counter() - started) * 1000
+        yield json.dumps({"summary": {
+            "agent": f"Layer {layer_id}",
+            "tasks": len(tasks),
+            "succeeded": succeeded,
+            "failed": len(tasks) - succeeded,
+            "cached": cached,
+            "wall_ms": round(wall_ms),
+            "total_task_ms": sum(durations),
+            "max_task_ms": max(durations),
+            "speedup": round(sum(durations) / wall_ms, 2) if wall_ms else None
+        }}) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 @app.post("/agents/{layer_id}/make-decision")
 async def make_agent_decision(layer_id: int, request: DecisionRequest):
@@ -142,8 +273,11 @@ async def make_agent_decision(layer_id: int, request: DecisionRequest):
     if not agent:
         raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
     
-    decision = await agent.make_decision(request.context, request.options)
+    decision = await agent.make_decision(request.context, request.options, use_cache=request.use_cache)
     
+    return decision_response(layer_id, decision)
+
+def decision_response(layer_id: int, decision) -> Dict[str, Any]:
     return {
         "decision": decision.decision,
         "reasoning": decision.reasoning,
@@ -153,6 +287,24 @@ async def make_agent_decision(layer_id: int, request: DecisionRequest):
         "timestamp": decision.made_at.isoformat()
     }
 
+@app.post("/agents/{layer_id}/make-decision/stream")
+async def stream_agent_decision(layer_id: int, request: DecisionRequest):
+    """Get decision as Server-Sent Events: "token" events as the reply is generated, then one "result" event"""
+    agent = agent_registry.get_agent(layer_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
+    
+    async def events():
+        async with aclosing(agent.stream_decision(request.context, request.options,
+                                                  use_cache=request.use_cache)) as stream:
+            async for item in stream:
+                if isinstance(item, str):
+                    yield sse_event("token", {"text": item})
+                else:
+                    yield sse_event("result", decision_response(layer_id, item))
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @app.post("/agents/{layer_id}/learn")
 async def agent_learning(layer_id: int, request: LearningRequest):
     """Help agent learn from experience"""
@@ -160,23 +312,70 @@ async def agent_learning(layer_id: int, request: LearningRequest):
     if not agent:
         raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
     
-    learning_result = await agent.learn_from_experience(request.experience)
+    learning_result = await agent.learn_from_experience(request.experience, use_cache=request.use_cache)
     
     return learning_result
 
 @app.get("/agents/{layer_id}/status")
 async def get_agent_status(layer_id: int):
     """Get status and performance metrics for specified agent"""
+    if not agent_registry.is_available(layer_id):
+        raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
+    
+    # An agent that hasn't been used yet reports idle rather than being built just to say so
+    agent = agent_registry.agents.get(layer_id) or agent_registry.descriptors[layer_id]
+    return agent.get_status()
+
+@app.get("/agents/{layer_id}/history")
+async def get_agent_history(layer_id: int, limit: int = 20, bodies: bool = False):
+    """Most recent work sessions (newest first); ?bodies=true reads back the stored responses"""
     agent = agent_registry.get_agent(layer_id)
     if not agent:
         raise HTTPException(status_code=404, detail=f"Agent Layer {layer_id} not found or not implemented")
     
-    return agent.get_status()
+    return {
+        "agent": f"Layer {layer_id}",
+        "summary": agent.work_history.summary(),
+        "work": await agent.work_history.recent(limit, include_bodies=bodies)
+    }
+
+@app.get("/agents/{layer_id}/records")
+async def get_agent_records(layer_id: int, stream: str = "work", task_type: Optional[str] = None,
+                            since: Optional[str] = None, until: Optional[str] = None,
+                            limit: int = 100, before_id: Optional[int] = None):
+    """Durable records for an agent, newest first, filtered by task type and ISO time range
+
+    Streams: work, learnings, collaborations, plus per-agent logs such as knowledge_base or threat_database.
+    Page with ?before_id=<last id>.
+    """
+    if agent_store is None:
+        raise HTTPException(status_code=404, detail="Agent store is disabled")
+    try:
+        records = await agent_store.query(agent=layer_id, stream=stream, task_type=task_type,
+                                          since=since, until=until, limit=min(limit, 1000), before_id=before_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+    
+    return {"agent": f"Layer {layer_id}", "stream": stream, "count": len(records), "records": records}
+
+@app.get("/agents/store")
+async def get_agent_store_stats():
+    """Durable agent store write, flush and compaction counters"""
+    if agent_store is None:
+        return {"enabled": False}
+    return {"enabled": True, "records": await agent_store.count(), **agent_store.stats()}
+
+@app.post("/agents/store/compact")
+async def compact_agent_store():
+    """Drop records past the retention window now instead of waiting for the periodic compaction"""
+    if agent_store is None:
+        raise HTTPException(status_code=404, detail="Agent store is disabled")
+    return await agent_store.compact()
 
 @app.post("/agents/orchestrate-workflow")
 async def orchestrate_multi_agent_workflow(request: WorkflowRequest):
     """Orchestrate complex workflow using multiple agents"""
-    if not agent_registry.orchestrator:
+    if not agent_registry.is_available(35):
         raise HTTPException(status_code=503, detail="Master Orchestrator (Layer 35) not available")
     
     workflow = {
@@ -193,7 +392,7 @@ async def orchestrate_multi_agent_workflow(request: WorkflowRequest):
 @app.get("/agents/available")
 async def get_available_agents():
     """Get list of all available agents with their capabilities"""
-    agents = agent_registry.get_all_agents()
+    agents = agent_registry.list_layers()
     
     return {
         "total_agents": len(agents),
@@ -208,16 +407,45 @@ async def get_available_agents():
                     "learn_from_experience",
                     "collaborate_with_others"
                 ],
-                "status": "active"
+                "status": "active" if agent.layer_id in agent_registry.agents else "idle"
             }
             for agent in agents
         ]
     }
 
+@app.get("/agents/llm-cache")
+async def get_llm_cache_stats():
+    """Hit/miss counters and LLM latency saved by the shared response cache"""
+    return {"enabled": llm_cache is not None, "cache": llm_cache.stats() if llm_cache else None}
+
+@app.delete("/agents/llm-cache")
+async def clear_llm_cache():
+    """Drop every cached LLM response (memory and disk)"""
+    if llm_cache is None:
+        raise HTTPException(status_code=404, detail="LLM response cache is disabled")
+    await llm_cache.clear()
+    return {"success": True}
+
+@app.get("/agents/llm-governor")
+async def get_llm_governor_stats():
+    """LLM calls running and queued, queue wait per priority, and remaining RPM/TPM budget"""
+    return {"enabled": llm_governor is not None, "governor": llm_governor.stats() if llm_governor else None}
+
+@app.get("/agents/worker-health")
+async def get_worker_health():
+    """Health of the worker process that answered (probed per worker by the pre-fork supervisor)"""
+    if prefork is None:
+        return {"status": "healthy", "worker_id": None, "pid": os.getpid()}
+    return {**prefork.worker_info(), "registered_agents": len(agent_registry.descriptors),
+            "active_agents": len(agent_registry.agents)}
+
 @app.get("/agents/performance-report")
-async def get_agent_performance_report():
-    """Get comprehensive performance report for all agents"""
-    agents = agent_registry.get_all_agents()
+async def get_agent_performance_report(scope: str = "all"):
+    """Get comprehensive performance report for all agents
+
+    With several workers the overall metrics cover all of them; ?scope=worker reports only this worker.
+    """
+    agents = agent_registry.list_layers()
     
     performance_data = []
     for agent in agents:
@@ -229,7 +457,7 @@ async def get_agent_performance_report():
             "last_activity": status.get("last_activity")
         })
     
-    return {
+    report = {
         "report_generated": datetime.now().isoformat(),
         "total_agents": len(agents),
         "performance_data": performance_data,
@@ -237,23 +465,57 @@ async def get_agent_performance_report():
             "avg_success_rate": sum(p["performance"].get("success_rate", 0) for p in performance_data) / len(performance_data) if performance_data else 0,
             "total_tasks_completed": sum(p["performance"].get("successful_tasks", 0) for p in performance_data),
             "total_learnings": sum(p["performance"].get("total_learnings", 0) for p in performance_data)
-        }
+        },
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "llm_governor": llm_governor.stats() if llm_governor else None
     }
 
+    if scope == "all" and prefork is not None and prefork.worker_id() is not None:
+        siblings = await prefork.scrape_siblings("/agents/performance-report?scope=worker")
+        per_worker = {prefork.worker_id(): report["overall_metrics"]}
+        per_worker.update({slot: json.loads(text)["overall_metrics"] for slot, text in siblings})
+        report["workers"] = per_worker
+        report["overall_metrics"] = {
+            "avg_success_rate": sum(m["avg_success_rate"] for m in per_worker.values()) / len(per_worker),
+            "total_tasks_completed": sum(m["total_tasks_completed"] for m in per_worker.values()),
+            "total_learnings": sum(m["total_learnings"] for m in per_worker.values())
+        }
+
+    return report
+
 # Register agents on startup
 @app.on_event("startup")
 async def startup_event():
     """Register all agents when API starts"""
     print("🚀 Starting ESA LIFE CEO 61×21 Functional Agent API")
     register_priority_agents()
-    print(f"✅ API ready with {len(agent_registry.agents)} functional agents")
+    if agent_store is not None:
+        await agent_store.start()
+    print(f"✅ API ready with {len(agent_registry.descriptors)} functional agents ({len(agent_registry.agents)} preloaded)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out queued agent records before the process exits"""
+    if agent_store is not None:
+        await agent_store.stop()
 
 if __name__ == "__main__":
     import uvicorn
     print("🚀 ESA LIFE CEO 61×21 Functional Agent API Server")
     print("📡 Starting API server for cross-project agent usage...")
     
-    # Register agents
-    register_priority_agents()
-    
-    uvicorn.run(app, host="0.0.0.0", port=8002, log_level="info")
\ No newline at end of file
+    # AGENT_API_WORKERS=N runs N supervised worker processes (default "auto": one per CPU, 1 for a single process);
+    # each worker builds its preloaded agents in the startup event and takes its share of the LLM limits and cache
+    workers = os.getenv("AGENT_API_WORKERS", "auto")
+    if workers != "1" and prefork is not None:
+        prefork.serve(
+            "functional_agent_api:app", host="0.0.0.0", port=8002,
+            workers=None if workers == "auto" else int(workers),
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            health_path="/agents/worker-health",
+        )
+    else:
+        # Register agents
+        register_priority_agents()
+        
+        uvicorn.run(app, host="0.0.0.0", port=8002, log_level="info")
\ No newline at end of file
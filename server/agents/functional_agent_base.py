@@ -5,25 +5,43 @@ Real AI agents that perform actual work using Emergent LLM integration
 """
 
 import asyncio
+import hashlib
+import importlib
+import importlib.util
 import json
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Awaitable, Dict, List, Any, Optional, Tuple, Union
 from abc import ABC, abstractmethod
+from contextlib import aclosing, asynccontextmanager
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-try:
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    print("✅ Emergent integrations loaded successfully")
-except ImportError as e:
-    print(f"❌ Failed to import emergent integrations: {e}")
+# Tasks of one execute_many() batch running at once (the LLM governor still caps calls per agent)
+AGENT_BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "8"))
+
+# The LLM SDK is slow to import, so only check it is installed here; llm_classes() imports it on first use
+if importlib.util.find_spec("emergentintegrations") is None:
+    print("❌ Failed to import emergent integrations: No module named 'emergentintegrations'")
     print("Please run: pip install emergentintegrations --extra-index-url https://d33sy5i8bnduwe.cloudfront.net/simple/")
     exit(1)
 
+from agent_history import ActivityLog, ActivityRecord
+from agent_store import RecordRef, agent_store
+from context_encoder import AGENT_CONTEXT_STATS, EncodedContext, compact_json, context_encoder_for, count_tokens
+from llm_cache import llm_cache
+from llm_governor import Admission, estimate_tokens, llm_governor, priority_for
+from llm_session import session_for
+
+def llm_classes():
+    """(LlmChat, UserMessage) from the Emergent SDK, imported the first time an agent talks to the LLM"""
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    return LlmChat, UserMessage
+
 class AgentTask:
     """Represents a task for an agent to perform"""
     def __init__(self, task_type: str, description: str, context: Dict[str, Any], expected_output: str = ""):
@@ -36,12 +54,19 @@ class AgentTask:
 
 class WorkResult:
     """Result of agent work execution"""
-    def __init__(self, success: bool, result: Any, confidence: float, agent_id: str, duration_ms: int):
+    def __init__(self, success: bool, result: Any, confidence: float, agent_id: str, duration_ms: int,
+                 cached: bool = False, queue_ms: int = 0, ttft_ms: Optional[int] = None,
+                 context_tokens: int = 0, context_tokens_saved: Optional[int] = None):
         self.success = success
         self.result = result
         self.confidence = confidence
         self.agent_id = agent_id
-        self.duration_ms = duration_ms
+        self.duration_ms = duration_ms  # includes queue_ms, the time spent waiting for the LLM governor
+        self.queue_ms = queue_ms
+        self.ttft_ms = ttft_ms  # set when the reply was streamed
+        self.cached = cached
+        self.context_tokens = context_tokens  # tokens of task context sent, and saved by the context encoder
+        self.context_tokens_saved = context_tokens_saved
         self.completed_at = datetime.now()
 
 class Decision:
@@ -56,36 +81,222 @@ class Decision:
 class FunctionalAgent(ABC):
     """Base class for all functional AI agents"""
     
+    # Token budget for context inlined into a prompt; None uses AGENT_CONTEXT_BUDGETS / AGENT_CONTEXT_TOKEN_BUDGET
+    context_token_budget: Optional[int] = None
+    # "stateless", "window" or "summary"; None uses AGENT_LLM_SESSIONS / AGENT_LLM_SESSION
+    session_strategy: Optional[str] = None
+    
     def __init__(self, layer_id: int, layer_name: str, specialization: str):
         self.layer_id = layer_id
         self.layer_name = layer_name
         self.specialization = specialization
-        self.work_history: List[Dict[str, Any]] = []
-        self.learnings: List[Dict[str, Any]] = []
-        self.collaboration_history: List[Dict[str, Any]] = []
+        # Bounded ring buffers; LLM responses and contexts are spilled to disk and kept in the durable store
+        self.work_history = self.activity_log("work")
+        self.learnings = self.activity_log("learnings")
+        self.collaboration_history = self.activity_log("collaborations")
         
-        # Initialize Emergent LLM Chat
-        self.llm_chat = LlmChat(
-            api_key=os.getenv("EMERGENT_LLM_KEY", "sk-emergent-b629d189d80B9D02dA"),
-            session_id=f"layer-{layer_id}-{layer_name.lower().replace(' ', '-').replace('&', 'and')}",
-            system_message=self.get_system_prompt()
-        ).with_model("openai", "gpt-4o-mini")  # Cost-effective model for production
+        # A fresh Emergent LLM Chat per call (see new_llm_chat); self.session carries the history it sees
+        self.system_prompt = self.get_system_prompt()
+        self.llm_model = ("openai", "gpt-4o-mini")  # Cost-effective model for production
+        self.system_prompt_hash = hashlib.sha256(self.system_prompt.encode()).hexdigest()
+        self.system_prompt_tokens = count_tokens(self.system_prompt)
+        self.session_id = f"layer-{self.layer_id}-{self.layer_name.lower().replace(' ', '-').replace('&', 'and')}"
+        self.session = session_for(layer_id, self.session_strategy, self.summarize_history)
+        self.context_encoder = context_encoder_for(layer_id, self.context_token_budget)
+        self.context_usage = {"prompts": 0, "tokens": 0, "tokens_saved": 0, "truncated": 0}
         
         print(f"🤖 Functional Agent {layer_id} ({layer_name}) initialized")
         print(f"   📋 Specialization: {specialization}")
     
+    def activity_log(self, stream: str) -> ActivityLog:
+        """In-memory history for `stream`, mirrored to the durable agent store when it is enabled
+        
+        With the store enabled, bodies are read back from it rather than also spilled to temp files.
+        """
+        name = f"layer{self.layer_id}-{stream}"
+        if agent_store is None:
+            return ActivityLog(name)
+        
+        def persist(record: ActivityRecord, body: Dict[str, Any]) -> RecordRef:
+            return agent_store.append(
+                self.layer_id, stream,
+                {"task_id": record.task_id, "confidence": record.confidence, "duration_ms": record.duration_ms,
+                 "queue_ms": record.queue_ms, "ttft_ms": record.ttft_ms, "cached": record.cached, **body},
+                task_type=record.task_type, success=record.success, timestamp=record.timestamp
+            )
+
+        async def stored_bodies(records: List[ActivityRecord]) -> List[Optional[Dict[str, Any]]]:
+            return await agent_store.bodies([record.body_ref for record in records])
+        
+        return ActivityLog(name, spill=False, sink=persist, body_source=stored_bodies)
+    
+    def new_llm_chat(self):
+        """A fresh Emergent LLM Chat for one call
+        
+        A chat keeps every message sent through it, so a long-lived one grows each prompt with the
+        agent's uptime; the history a call should see is added to its prompt by self.session instead.
+        """
+        LlmChat, _ = llm_classes()
+        return LlmChat(
+            api_key=os.getenv("EMERGENT_LLM_KEY", "sk-emergent-b629d189d80B9D02dA"),
+            session_id=f"{self.session_id}-{uuid.uuid4().hex[:12]}",
+            system_message=self.system_prompt
+        ).with_model(*self.llm_model)
+    
     @abstractmethod
     def get_system_prompt(self) -> str:
         """Get specialized system prompt for this agent"""
         pass
     
-    async def execute_work(self, task: AgentTask) -> WorkResult:
-        """Execute actual work using AI reasoning and domain expertise"""
-        start_time = datetime.now()
+    def session_prompt(self, prompt: str, kind: str, history: Optional[str] = None) -> Tuple[str, int]:
+        """`prompt` preceded by the session history, and the call's input tokens (system prompt included)"""
+        message = prompt if kind == "summary" else self.session.compose(prompt, history)
+        input_tokens = self.system_prompt_tokens + count_tokens(message)
+        self.session.observe(input_tokens)
+        return message, input_tokens
+    
+    def remember(self, kind: str, request: Optional[Dict[str, Any]], response: str):
+        """Add an answered call to the session history, described by its request rather than the full prompt"""
+        if kind != "summary":
+            self.session.record(f"{kind}: {compact_json(request)}" if request else kind, response)
+    
+    async def call_llm(self, prompt: str, kind: str, request: Optional[Dict[str, Any]] = None,
+                       history: Optional[str] = None) -> Tuple[str, float]:
+        """Send a prompt once the shared LLM governor admits it; (response, ms spent queued)
+
+        Learning, collaboration and summary prompts queue behind interactive work. `history`
+        defaults to the session's current history.
+        """
+        _, UserMessage = llm_classes()
+        message, input_tokens = self.session_prompt(prompt, kind, history)
+        
+        def send() -> Awaitable[str]:
+            return self.new_llm_chat().send_message(UserMessage(text=message))
+        
+        if llm_governor is None:
+            response, queue_ms = await send(), 0.0
+        else:
+            response, queue_ms = await llm_governor.run(self.layer_id, priority_for(kind), input_tokens, send)
+        self.remember(kind, request, response)
+        return response, queue_ms
+    
+    async def ask_llm(self, prompt: str, kind: str, request: Dict[str, Any], task_type: str,
+                      use_cache: bool = True, history: Optional[str] = None) -> Tuple[str, bool, float]:
+        """Send a prompt to the LLM unless the shared cache holds an answer to the same request
+
+        `request` holds the inputs the prompt is built from; it is canonicalised for the cache key
+        together with the model, system prompt and the session history sent with it (by default
+        the session's current history).
+        Returns (response, served_from_cache, queue_ms).
+        """
+        queue_ms = 0.0
+        if history is None:
+            history = self.session.history()
         
+        async def call() -> str:
+            nonlocal queue_ms
+            response, queue_ms = await self.call_llm(prompt, kind, request, history)
+            return response
+
+        if llm_cache is None:
+            return await call(), False, queue_ms
+        if not use_cache:
+            llm_cache.bypass()
+            return await call(), False, queue_ms
+        response, cached = await llm_cache.fetch(self.cache_key(kind, request, history), llm_cache.ttl_for(task_type),
+                                                 call)
+        return response, cached, queue_ms
+    
+    def cache_key(self, kind: str, request: Dict[str, Any], history: str = "") -> str:
+        """Cache key for `request`; a reply given after some conversation history only matches that history"""
+        scope: Dict[str, Any] = {"layer": self.layer_id}
+        if history:
+            scope["history"] = hashlib.sha256(history.encode()).hexdigest()
+        return llm_cache.make_key("/".join(self.llm_model), self.system_prompt_hash, kind, {**scope, **request})
+    
+    @asynccontextmanager
+    async def admitted(self, input_tokens: int, kind: str) -> AsyncIterator[Admission]:
+        """A governor slot held for the duration of one LLM call (always granted without a governor)"""
+        if llm_governor is None:
+            yield Admission()
+            return
+        async with llm_governor.admit(self.layer_id, priority_for(kind), input_tokens) as admission:
+            yield admission
+    
+    async def stream_llm(self, prompt: str) -> AsyncIterator[str]:
+        """Reply text as the provider sends it
+        
+        Uses the chat's stream_message() when the SDK provides one; otherwise the whole
+        completion arrives as a single chunk.
+        """
+        _, UserMessage = llm_classes()
+        chat = self.new_llm_chat()
+        stream = getattr(chat, "stream_message", None)
+        if stream is None:
+            yield await chat.send_message(UserMessage(text=prompt))
+            return
+        chunks = stream(UserMessage(text=prompt))
         try:
-            # Create specialized prompt for work execution
-            work_prompt = f"""
+            async for chunk in chunks:
+                if chunk:
+                    yield chunk
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+    
+    async def stream_reply(self, prompt: str, kind: str, request: Dict[str, Any], task_type: str,
+                           use_cache: bool = True) -> AsyncIterator[Union[str, Tuple[str, bool, float, Optional[float]]]]:
+        """Streaming ask_llm(): yields text chunks, then (response, cached, queue_ms, ttft_ms)
+        
+        A cached answer arrives as one chunk. ttft_ms counts from the call, queueing included.
+        """
+        started = time.perf_counter()
+        key, ttl = None, 0.0
+        history = self.session.history()
+        if llm_cache is not None and not use_cache:
+            llm_cache.bypass()
+        elif llm_cache is not None:
+            key, ttl = self.cache_key(kind, request, history), llm_cache.ttl_for(task_type)
+            response = await llm_cache.lookup(key, ttl)
+            if response is not None:
+                yield response
+                yield response, True, 0.0, (time.perf_counter() - started) * 1000
+                return
+        
+        chunks: List[str] = []
+        ttft_ms = None
+        message, input_tokens = self.session_prompt(prompt, kind, history)
+        # aclosing: a caller that stops reading must still free the governor slot and the provider stream
+        async with self.admitted(input_tokens, kind) as admission, aclosing(self.stream_llm(message)) as stream:
+            async for chunk in stream:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                chunks.append(chunk)
+                yield chunk
+            response = "".join(chunks)
+            admission.completion_tokens = estimate_tokens(response)
+        self.remember(kind, request, response)
+        if key is not None and ttl > 0 and response:
+            await llm_cache.put(key, response, ttl, (time.perf_counter() - started) * 1000 - admission.queue_ms)
+        yield response, False, admission.queue_ms, ttft_ms
+    
+    def encode_context(self, value: Any) -> EncodedContext:
+        """Compact serialisation of `value` within this agent's context token budget"""
+        return self.context_encoder.encode(value)
+    
+    def record_context(self, encoded: EncodedContext) -> EncodedContext:
+        """Count the context sent with one prompt towards the agent's totals"""
+        self.context_usage["prompts"] += 1
+        self.context_usage["tokens"] += encoded.tokens
+        if encoded.tokens_saved is not None:
+            self.context_usage["tokens_saved"] += encoded.tokens_saved
+        self.context_usage["truncated"] += encoded.truncated
+        return encoded
+    
+    def build_work_prompt(self, task: AgentTask) -> Tuple[str, EncodedContext]:
+        """Work prompt for `task`, and the encoded context it carries"""
+        context = self.record_context(self.encode_context(task.context))
+        return f"""
 AGENT SPECIALIZATION: {self.specialization}
 LAYER {self.layer_id}: {self.layer_name}
 
@@ -95,7 +306,7 @@ Description: {task.description}
 Expected Output: {task.expected_output}
 
 CONTEXT:
-{json.dumps(task.context, indent=2)}
+{context.text}
 
 INSTRUCTIONS:
 1. Analyze the task using your specialized expertise
@@ -105,49 +316,106 @@ INSTRUCTIONS:
 5. Format technical outputs as structured data when appropriate
 
 Deliver professional-grade work that demonstrates your expertise in {self.specialization}.
+""", context
+    
+    def work_request(self, task: AgentTask) -> Dict[str, Any]:
+        """The inputs a work prompt is built from, as used for the LLM cache key"""
+        return {"task_type": task.task_type, "description": task.description,
+                "expected_output": task.expected_output, "context": task.context}
+    
+    def build_decision_prompt(self, context: Dict[str, Any], options: Optional[List[Any]] = None) -> str:
+        encoded = self.encode_context(context)
+        encoded_options = self.encode_context(options) if options else None
+        self.record_context(encoded + encoded_options if encoded_options else encoded)
+        return f"""
+AGENT EXPERTISE: {self.specialization} (Layer {self.layer_id}: {self.layer_name})
+
+DECISION CONTEXT:
+{encoded.text}
+
+AVAILABLE OPTIONS:
+{encoded_options.text if encoded_options else "Analyze context and determine best course of action"}
+
+DECISION REQUIREMENTS:
+1. Analyze the situation with your specialized expertise
+2. Consider all available information and constraints
+3. Evaluate risks and benefits of each option
+4. Make the optimal decision based on your domain knowledge
+5. Provide clear reasoning for your choice
+
+RESPONSE FORMAT:
+{{
+  "decision": "your_specific_decision",
+  "reasoning": "detailed_explanation_of_why",
+  "confidence": 0.85,
+  "alternatives": ["alternative_option_1", "alternative_option_2"],
+  "risks": ["potential_risk_1", "potential_risk_2"],
+  "benefits": ["expected_benefit_1", "expected_benefit_2"],
+  "next_steps": ["recommended_action_1", "recommended_action_2"]
+}}
 """
+    
+    def parse_decision(self, response: str) -> Decision:
+        # Parse decision response (simplified parsing)
+        try:
+            decision_data = json.loads(response) if response.strip().startswith('{') else {"decision": response}
+        except:
+            decision_data = {"decision": response}
+        
+        return Decision(
+            decision=decision_data.get("decision", response),
+            reasoning=decision_data.get("reasoning", "Decision based on agent expertise"),
+            confidence=decision_data.get("confidence", 0.8),
+            alternatives=decision_data.get("alternatives", [])
+        )
+    
+    async def execute_work(self, task: AgentTask, use_cache: bool = True,
+                           history: Optional[str] = None) -> WorkResult:
+        """Execute actual work using AI reasoning and domain expertise
+
+        `history` overrides the session history sent with the prompt, see execute_many().
+        """
+        start_time = datetime.now()
+        
+        try:
+            # Create specialized prompt for work execution
+            work_prompt, context = self.build_work_prompt(task)
             
-            user_message = UserMessage(text=work_prompt)
-            response = await self.llm_chat.send_message(user_message)
+            response, cached, queue_ms = await self.ask_llm(
+                work_prompt, "work", self.work_request(task), task.task_type, use_cache, history
+            )
             
             # Calculate execution metrics
             duration = (datetime.now() - start_time).total_seconds() * 1000  # milliseconds
             confidence = self.calculate_confidence(task, response)
             
             # Record work session
-            work_session = {
-                "task_id": task.id,
-                "task_type": task.task_type,
-                "description": task.description,
-                "response": response,
-                "confidence": confidence,
-                "duration_ms": int(duration),
-                "success": True,
-                "timestamp": datetime.now().isoformat()
-            }
-            self.work_history.append(work_session)
+            self.work_history.append(
+                task.task_type, True, {"description": task.description, "response": response},
+                task_id=task.id, confidence=confidence, duration_ms=int(duration), cached=cached,
+                queue_ms=int(queue_ms)
+            )
             
             return WorkResult(
                 success=True,
                 result=response,
                 confidence=confidence,
                 agent_id=f"Layer{self.layer_id}",
-                duration_ms=int(duration)
+                duration_ms=int(duration),
+                cached=cached,
+                queue_ms=int(queue_ms),
+                context_tokens=context.tokens,
+                context_tokens_saved=context.tokens_saved
             )
             
         except Exception as e:
             duration = (datetime.now() - start_time).total_seconds() * 1000
             
             # Record failed session
-            error_session = {
-                "task_id": task.id,
-                "task_type": task.task_type,
-                "error": str(e),
-                "duration_ms": int(duration),
-                "success": False,
-                "timestamp": datetime.now().isoformat()
-            }
-            self.work_history.append(error_session)
+            self.work_history.append(
+                task.task_type, False, {"description": task.description, "error": str(e)},
+                task_id=task.id, duration_ms=int(duration)
+            )
             
             return WorkResult(
                 success=False,
@@ -157,54 +425,95 @@ Deliver professional-grade work that demonstrates your expertise in {self.specia
                 duration_ms=int(duration)
             )
     
-    async def make_decision(self, context: Dict[str, Any], options: Optional[List[Any]] = None) -> Decision:
-        """Make intelligent decisions based on context and expertise"""
+    async def stream_work(self, task: AgentTask, use_cache: bool = True) -> AsyncIterator[Union[str, WorkResult]]:
+        """execute_work() that yields the reply text as it is generated, then the WorkResult"""
+        start_time = datetime.now()
+        
         try:
-            decision_prompt = f"""
-AGENT EXPERTISE: {self.specialization} (Layer {self.layer_id}: {self.layer_name})
-
-DECISION CONTEXT:
-{json.dumps(context, indent=2)}
-
-AVAILABLE OPTIONS:
-{json.dumps(options, indent=2) if options else "Analyze context and determine best course of action"}
-
-DECISION REQUIREMENTS:
-1. Analyze the situation with your specialized expertise
-2. Consider all available information and constraints
-3. Evaluate risks and benefits of each option
-4. Make the optimal decision based on your domain knowledge
-5. Provide clear reasoning for your choice
-
-RESPONSE FORMAT:
-{{
-  "decision": "your_specific_decision",
-  "reasoning": "detailed_explanation_of_why",
-  "confidence": 0.85,
-  "alternatives": ["alternative_option_1", "alternative_option_2"],
-  "risks": ["potential_risk_1", "potential_risk_2"],
-  "benefits": ["expected_benefit_1", "expected_benefit_2"],
-  "next_steps": ["recommended_action_1", "recommended_action_2"]
-}}
-"""
+            work_prompt, context = self.build_work_prompt(task)
+            async with aclosing(self.stream_reply(work_prompt, "work", self.work_request(task),
+                                                  task.task_type, use_cache)) as reply:
+                async for item in reply:
+                    if isinstance(item, str):
+                        yield item
+                    else:
+                        response, cached, queue_ms, ttft_ms = item
+            
+            duration = (datetime.now() - start_time).total_seconds() * 1000
+            confidence = self.calculate_confidence(task, response)
+            ttft_ms = int(ttft_ms) if ttft_ms is not None else None
+            
+            self.work_history.append(
+                task.task_type, True, {"description": task.description, "response": response},
+                task_id=task.id, confidence=confidence, duration_ms=int(duration), cached=cached,
+                queue_ms=int(queue_ms), ttft_ms=ttft_ms
+            )
             
-            user_message = UserMessage(text=decision_prompt)
-            response = await self.llm_chat.send_message(user_message)
+            yield WorkResult(
+                success=True,
+                result=response,
+                confidence=confidence,
+                agent_id=f"Layer{self.layer_id}",
+                duration_ms=int(duration),
+                cached=cached,
+                queue_ms=int(queue_ms),
+                ttft_ms=ttft_ms,
+                context_tokens=context.tokens,
+                context_tokens_saved=context.tokens_saved
+            )
+            
+        except Exception as e:
+            duration = (datetime.now() - start_time).total_seconds() * 1000
+            
+            self.work_history.append(
+                task.task_type, False, {"description": task.description, "error": str(e)},
+                task_id=task.id, duration_ms=int(duration)
+            )
             
-            # Parse decision response (simplified parsing)
-            try:
-                decision_data = json.loads(response) if response.strip().startswith('{') else {"decision": response}
-            except:
-                decision_data = {"decision": response}
+            yield WorkResult(
+                success=False,
+                result=f"Agent execution failed: {str(e)}",
+                confidence=0.0,
+                agent_id=f"Layer{self.layer_id}",
+                duration_ms=int(duration)
+            )
+    
+    async def execute_many(self, tasks: List[AgentTask], concurrency: Optional[int] = None,
+                           use_cache: bool = True) -> AsyncIterator[Tuple[int, WorkResult]]:
+        """Execute tasks concurrently, yielding (index in `tasks`, result) as each one completes
+        
+        At most `concurrency` tasks run at once, so wall time tends towards the slowest task rather
+        than the sum. Closing the iterator early cancels the tasks still running.
+        
+        Every task is sent the session history as it stood when the batch started, so no task's
+        prompt or cache key depends on which of its siblings happened to finish first.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or AGENT_BATCH_CONCURRENCY))
+        history = self.session.history()
+        
+        async def run(index: int, task: AgentTask) -> Tuple[int, WorkResult]:
+            async with semaphore:
+                return index, await self.execute_work(task, use_cache=use_cache, history=history)
+        
+        pending = [asyncio.create_task(run(index, task)) for index, task in enumerate(tasks)]
+        try:
+            for completed in asyncio.as_completed(pending):
+                yield await completed
+        finally:
+            for job in pending:
+                job.cancel()
+    
+    async def make_decision(self, context: Dict[str, Any], options: Optional[List[Any]] = None,
+                            use_cache: bool = True) -> Decision:
+        """Make intelligent decisions based on context and expertise"""
+        try:
+            decision_prompt = self.build_decision_prompt(context, options)
             
-            decision = Decision(
-                decision=decision_data.get("decision", response),
-                reasoning=decision_data.get("reasoning", "Decision based on agent expertise"),
-                confidence=decision_data.get("confidence", 0.8),
-                alternatives=decision_data.get("alternatives", [])
+            response, _, _ = await self.ask_llm(
+                decision_prompt, "decision", {"context": context, "options": options}, "decision", use_cache
             )
             
-            return decision
+            return self.parse_decision(response)
             
         except Exception as e:
             return Decision(
@@ -214,15 +523,39 @@ RESPONSE FORMAT:
                 alternatives=[]
             )
     
-    async def learn_from_experience(self, experience: Dict[str, Any]) -> Dict[str, Any]:
+    async def stream_decision(self, context: Dict[str, Any], options: Optional[List[Any]] = None,
+                              use_cache: bool = True) -> AsyncIterator[Union[str, Decision]]:
+        """make_decision() that yields the reply text as it is generated, then the Decision"""
+        try:
+            async with aclosing(self.stream_reply(self.build_decision_prompt(context, options), "decision",
+                                                  {"context": context, "options": options}, "decision",
+                                                  use_cache)) as reply:
+                async for item in reply:
+                    if isinstance(item, str):
+                        yield item
+                    else:
+                        response = item[0]
+            
+            yield self.parse_decision(response)
+            
+        except Exception as e:
+            yield Decision(
+                decision=f"Decision failed: {str(e)}",
+                reasoning="Agent encountered an error during decision making",
+                confidence=0.0,
+                alternatives=[]
+            )
+    
+    async def learn_from_experience(self, experience: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
         """Learn and adapt from experiences to improve future performance"""
         try:
+            encoded = self.record_context(self.encode_context(experience))
             learning_prompt = f"""
 AGENT LEARNING SESSION: Layer {self.layer_id} ({self.layer_name})
 SPECIALIZATION: {self.specialization}
 
 EXPERIENCE TO LEARN FROM:
-{json.dumps(experience, indent=2)}
+{encoded.text}
 
 LEARNING OBJECTIVES:
 1. Extract key insights from this experience
@@ -242,22 +575,22 @@ LEARNING OUTPUT FORMAT:
 }}
 """
             
-            user_message = UserMessage(text=learning_prompt)
-            response = await self.llm_chat.send_message(user_message)
+            response, cached, queue_ms = await self.ask_llm(
+                learning_prompt, "learning", {"experience": experience}, "learning", use_cache
+            )
             
             # Store learning
-            learning_record = {
-                "experience": experience,
-                "learning_response": response,
-                "timestamp": datetime.now().isoformat(),
-                "agent_id": self.layer_id
-            }
-            self.learnings.append(learning_record)
+            self.learnings.append(
+                "learning", True, {"experience": experience, "learning_response": response}, cached=cached,
+                queue_ms=int(queue_ms)
+            )
             
             return {
                 "success": True,
                 "learning": response,
-                "total_learnings": len(self.learnings),
+                "cached": cached,
+                "context_tokens_saved": encoded.tokens_saved,
+                "total_learnings": self.learnings.total,
                 "agent": f"Layer {self.layer_id}"
             }
             
@@ -271,12 +604,13 @@ LEARNING OUTPUT FORMAT:
     async def collaborate_with(self, other_agents: List['FunctionalAgent'], workflow: Dict[str, Any]) -> Dict[str, Any]:
         """Collaborate with other agents on complex workflows"""
         try:
+            encoded = self.record_context(self.encode_context(workflow))
             collaboration_prompt = f"""
 MULTI-AGENT COLLABORATION: Layer {self.layer_id} ({self.layer_name})
 YOUR ROLE: {self.specialization}
 
 WORKFLOW CONTEXT:
-{json.dumps(workflow, indent=2)}
+{encoded.text}
 
 COLLABORATING AGENTS:
 {[f"Layer {agent.layer_id}: {agent.layer_name}" for agent in other_agents]}
@@ -299,21 +633,20 @@ COLLABORATION OUTPUT:
 }}
 """
             
-            user_message = UserMessage(text=collaboration_prompt)
-            response = await self.llm_chat.send_message(user_message)
+            response, queue_ms = await self.call_llm(collaboration_prompt, "collaboration", {"workflow": workflow})
             
             # Record collaboration
-            collaboration_record = {
-                "workflow": workflow,
-                "collaborating_agents": [agent.layer_id for agent in other_agents],
-                "response": response,
-                "timestamp": datetime.now().isoformat()
-            }
-            self.collaboration_history.append(collaboration_record)
+            self.collaboration_history.append(
+                "collaboration", True,
+                {"workflow": workflow, "collaborating_agents": [agent.layer_id for agent in other_agents],
+                 "response": response},
+                queue_ms=int(queue_ms)
+            )
             
             return {
                 "success": True,
                 "collaboration_plan": response,
+                "context_tokens_saved": encoded.tokens_saved,
                 "agent": f"Layer {self.layer_id}"
             }
             
@@ -324,6 +657,23 @@ COLLABORATION OUTPUT:
                 "agent": f"Layer {self.layer_id}"
             }
     
+    async def summarize_history(self, summary: str, exchanges: str) -> str:
+        """Running summary of this agent's earlier LLM exchanges, for the "summary" session strategy"""
+        summary_prompt = f"""
+CONVERSATION SUMMARY: Layer {self.layer_id} ({self.layer_name})
+
+SUMMARY SO FAR:
+{summary or "None yet"}
+
+NEW EXCHANGES:
+{exchanges}
+
+Rewrite the summary so it also covers the new exchanges, in at most {self.session.summary_tokens * 3 // 4} words.
+Keep requests, findings, decisions and open items. Reply with the summary text only.
+"""
+        response, _ = await self.call_llm(summary_prompt, "summary")
+        return response
+    
     def calculate_confidence(self, task: AgentTask, response: str) -> float:
         """Calculate confidence score for agent work"""
         # Simple confidence calculation based on response characteristics
@@ -341,8 +691,11 @@ COLLABORATION OUTPUT:
     
     def get_status(self) -> Dict[str, Any]:
         """Get current agent status and performance metrics"""
-        total_tasks = len(self.work_history)
-        successful_tasks = len([w for w in self.work_history if w.get("success", False)])
+        # Lifetime aggregates maintained on append, so this stays O(1) however long the process runs
+        total_tasks = self.work_history.total
+        successful_tasks = self.work_history.successful
+        summary = self.work_history.summary()
+        session = self.session.stats()
         
         return {
             "agent_id": self.layer_id,
@@ -353,16 +706,96 @@ COLLABORATION OUTPUT:
                 "total_tasks": total_tasks,
                 "successful_tasks": successful_tasks,
                 "success_rate": (successful_tasks / total_tasks * 100) if total_tasks > 0 else 0,
-                "total_learnings": len(self.learnings),
-                "collaborations": len(self.collaboration_history)
+                "cached_tasks": self.work_history.cached,
+                "avg_duration_ms": summary["avg_duration_ms"],
+                "avg_queue_ms": summary["avg_queue_ms"],
+                "total_learnings": self.learnings.total,
+                "collaborations": self.collaboration_history.total,
+                "context_tokens": self.context_usage["tokens"],
+                "context_tokens_saved": self.context_usage["tokens_saved"] if self.context_encoder.measure_savings else None,
+                "context_truncated": self.context_usage["truncated"],
+                "llm_calls": session["calls"],
+                "avg_input_tokens": session["avg_input_tokens"],
+                "max_input_tokens": session["max_input_tokens"]
             },
-            "last_activity": self.work_history[-1]["timestamp"] if self.work_history else None
+            "llm_session": session,
+            "last_activity": self.work_history.last_activity()
         }
 
 # Agent Storage System
+class AgentDescriptor:
+    """Catalog entry for a layer agent: enough to list it without importing it, and to build it on demand"""
+    
+    __slots__ = ("layer_id", "layer_name", "specialization", "module", "class_name")
+    
+    def __init__(self, layer_id: int, layer_name: str, specialization: str, module: str, class_name: str):
+        self.layer_id = layer_id
+        self.layer_name = layer_name
+        self.specialization = specialization
+        self.module = module
+        self.class_name = class_name
+    
+    def build(self) -> FunctionalAgent:
+        """Import the agent's module and instantiate it"""
+        return getattr(importlib.import_module(self.module), self.class_name)()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Status of an agent that has not been used yet in this process"""
+        return {
+            "agent_id": self.layer_id,
+            "agent_name": self.layer_name,
+            "specialization": self.specialization,
+            "status": "idle",
+            "performance": {
+                "total_tasks": 0,
+                "successful_tasks": 0,
+                "success_rate": 0,
+                "cached_tasks": 0,
+                "avg_duration_ms": 0,
+                "avg_queue_ms": 0,
+                "total_learnings": 0,
+                "collaborations": 0,
+                "context_tokens": 0,
+                "context_tokens_saved": 0 if AGENT_CONTEXT_STATS else None,
+                "context_truncated": 0,
+                "llm_calls": 0,
+                "avg_input_tokens": 0,
+                "max_input_tokens": 0
+            },
+            "llm_session": session_for(self.layer_id).stats(),
+            "last_activity": None
+        }
+
+# Implemented layers. Adding a layer here costs nothing at startup: its module is imported on first use.
+AGENT_CATALOG = [
+    AgentDescriptor(1, "Database Architecture",
+                    "PostgreSQL optimization, query tuning, schema design, index management, performance analysis, and database scaling strategies",
+                    "real_layer01_database_architecture", "DatabaseArchitectureAgent"),
+    AgentDescriptor(35, "AI Agent Management",
+                    "Master orchestration, workflow coordination, agent management, and intelligent task distribution across all 61 agents",
+                    "real_layer35_ai_agent_management", "MasterOrchestratorAgent"),
+    AgentDescriptor(44, "Knowledge Graph",
+                    "Entity extraction, relationship mapping, semantic analysis, knowledge graph construction, and intelligent query processing",
+                    "real_layer44_knowledge_graph", "KnowledgeGraphAgent"),
+    AgentDescriptor(45, "Reasoning Engine",
+                    "Logical reasoning, complex problem solving, strategic analysis, inference chains, and intelligent decision support",
+                    "real_layer45_reasoning_engine", "ReasoningEngineAgent"),
+    AgentDescriptor(49, "Security Hardening",
+                    "Cybersecurity analysis, vulnerability assessment, threat detection, security automation, incident response, and compliance implementation",
+                    "real_layer49_security_hardening", "SecurityHardeningAgent"),
+    AgentDescriptor(50, "DevOps Automation",
+                    "CI/CD pipeline management, deployment automation, infrastructure optimization, container orchestration, and production environment management",
+                    "real_layer50_devops_automation", "DevOpsAutomationAgent"),
+]
+
 class AgentRegistry:
-    """Registry for all functional agents"""
-    def __init__(self):
+    """Registry for all functional agents
+    
+    Every catalogued layer is listed from its descriptor; the agent itself (module import, state,
+    LLM session) is built the first time get_agent() asks for it.
+    """
+    def __init__(self, catalog: Optional[List[AgentDescriptor]] = None):
+        self.descriptors: Dict[int, AgentDescriptor] = {d.layer_id: d for d in catalog or []}
         self.agents: Dict[int, FunctionalAgent] = {}
         self.orchestrator: Optional['MasterOrchestratorAgent'] = None
     
@@ -377,22 +810,39 @@ class AgentRegistry:
             print("👑 Master Orchestrator (Layer 35) registered")
     
     def get_agent(self, layer_id: int) -> Optional[FunctionalAgent]:
-        """Get agent by layer ID"""
-        return self.agents.get(layer_id)
+        """Get agent by layer ID, building it from the catalog on first use"""
+        agent = self.agents.get(layer_id)
+        if agent is None and layer_id in self.descriptors:
+            agent = self.descriptors[layer_id].build()
+            self.register_agent(agent)
+        return agent
+    
+    def is_available(self, layer_id: int) -> bool:
+        """Whether the layer is implemented, without building it"""
+        return layer_id in self.agents or layer_id in self.descriptors
     
     def get_all_agents(self) -> List[FunctionalAgent]:
-        """Get all registered agents"""
+        """Get all agents built so far"""
         return list(self.agents.values())
     
+    def list_layers(self) -> List[Any]:
+        """Every available layer in layer order: the agent if built, otherwise its descriptor"""
+        layer_ids = sorted(set(self.descriptors) | set(self.agents))
+        return [self.agents.get(layer_id) or self.descriptors[layer_id] for layer_id in layer_ids]
+    
     async def orchestrate_workflow(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
         """Orchestrate complex multi-agent workflows"""
-        if not self.orchestrator:
+        orchestrator = self.orchestrator or self.get_agent(35)
+        if not orchestrator:
             return {"success": False, "error": "Master Orchestrator (Layer 35) not available"}
         
-        return await self.orchestrator.orchestrate_multi_agent_workflow(workflow, self.agents)
+        # The orchestrator only needs names and specializations, so unbuilt layers stay unbuilt
+        return await orchestrator.orchestrate_multi_agent_workflow(
+            workflow, {layer.layer_id: layer for layer in self.list_layers()}
+        )
 
 # Global agent registry
-agent_registry = AgentRegistry()
+agent_registry = AgentRegistry(AGENT_CATALOG)
 
 if __name__ == "__main__":
     print("🚀 ESA LIFE CEO 61×21 Functional Agent Base System")
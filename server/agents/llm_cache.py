@@ -0,0 +1,254 @@
+"""
+ESA LIFE CEO 61×21 Framework - Shared LLM Response Cache
+Reuses agent LLM answers for repeated tasks: in-memory LRU in front of a SQLite tier that survives restarts
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Runtime data shared by the agent processes (cache, stores)
+AGENT_DATA_DIR = os.getenv("AGENT_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+# Worker processes the pre-fork supervisor runs (1 otherwise); per-process limits are split between them
+AGENT_WORKER_COUNT = int(os.getenv("PREFORK_WORKERS", "1"))
+
+
+def canonical_json(value: Any) -> str:
+    """Stable JSON for hashing: sorted keys, no whitespace, non-JSON values stringified"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """"task_type:seconds" pairs, comma-separated; 0 disables caching for that task type"""
+    ttls: Dict[str, float] = {}
+    for entry in spec.split(","):
+        if ":" in entry:
+            name, seconds = entry.rsplit(":", 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+class LLMResponseCache:
+    """Cache of LLM responses keyed on model, system prompt hash and the canonicalised request
+
+    Lookups go memory first, then SQLite. The SQLite file is opened in WAL mode, so agent API
+    workers running side by side share the disk tier. Every `prune_every` writes, a process drops
+    the expired rows and then the oldest beyond `disk_max_entries` (0: no cap). Identical requests
+    that miss at the same time share one LLM call.
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int = 1000, default_ttl: float = 300.0,
+                 ttls: Optional[Dict[str, float]] = None, disk_max_entries: int = 50_000, prune_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.prune_every = max(1, prune_every)
+        self.disk_writes = 0
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.stats_counters = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "coalesced_errors": 0, "fallbacks": 0,
+            "bypassed": 0, "uncacheable": 0, "stores": 0, "evictions": 0, "expired": 0, "disk_pruned": 0,
+            "disk_errors": 0,
+        }
+        self.latency_saved_ms = 0.0
+        self._db: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not shared across threads; one worker thread owns it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache") if path else None
+
+    @staticmethod
+    def make_key(model: str, system_prompt_hash: str, kind: str, request: Any) -> str:
+        return hashlib.sha256(canonical_json([model, system_prompt_hash, kind, request]).encode()).hexdigest()
+
+    def ttl_for(self, task_type: str) -> float:
+        return self.ttls.get(task_type, self.default_ttl)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL, latency_ms REAL NOT NULL)"
+            )
+            self._prune()
+        return self._db
+
+    def _prune(self) -> int:
+        """Delete expired rows, then the oldest beyond disk_max_entries; returns how many went"""
+        db = self._db
+        with db:
+            removed = db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            if self.disk_max_entries > 0:
+                # INSERT OR REPLACE gives a rewritten key a new rowid, so rowid order is write order
+                removed += db.execute(
+                    "DELETE FROM llm_cache WHERE rowid <= "
+                    "(SELECT rowid FROM llm_cache ORDER BY rowid DESC LIMIT 1 OFFSET ?)", (self.disk_max_entries,)
+                ).rowcount
+        return removed
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        row = self._connect().execute(
+            "SELECT response, expires_at, latency_ms FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def _disk_put(self, key: str, entry: Tuple[str, float, float]) -> int:
+        db = self._connect()
+        db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, *entry))
+        db.commit()
+        self.disk_writes += 1
+        return self._prune() if self.disk_writes % self.prune_every == 0 else 0
+
+    async def _disk(self, fn: Callable, *args) -> Any:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except sqlite3.Error as e:
+            self.stats_counters["disk_errors"] += 1
+            print(f"⚠️ LLM cache disk tier error: {e}")
+            return None
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.stats_counters["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self.memory.move_to_end(key)
+                self.stats_counters["memory_hits"] += 1
+                self.latency_saved_ms += entry[2]
+                return entry[0]
+            del self.memory[key]
+            self.stats_counters["expired"] += 1
+        if self._executor is not None:
+            entry = await self._disk(self._disk_get, key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.stats_counters["disk_hits"] += 1
+                self.latency_saved_ms += entry[2]
+                return entry[0]
+        return None
+
+    async def lookup(self, key: str, ttl: float) -> Optional[str]:
+        """get() for callers that make the LLM call themselves (e.g. streaming) and put() the reply"""
+        if ttl <= 0:
+            self.stats_counters["uncacheable"] += 1
+            return None
+        response = await self.get(key)
+        if response is None:
+            self.stats_counters["misses"] += 1
+        return response
+
+    async def put(self, key: str, response: str, ttl: float, latency_ms: float):
+        entry = (response, time.time() + ttl, latency_ms)
+        self._remember(key, entry)
+        self.stats_counters["stores"] += 1
+        if self._executor is not None:
+            self.stats_counters["disk_pruned"] += await self._disk(self._disk_put, key, entry) or 0
+
+    async def fetch(self, key: str, ttl: float, call: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """Cached response for `key`, or the result of `call()` stored for `ttl` seconds; (response, cached)
+
+        If the call shared with concurrent identical requests fails, they all see the error (counted
+        in coalesced_errors, not as hits); if it is cancelled, only its own caller sees the
+        cancellation and the others make their own call.
+        """
+        if ttl <= 0:
+            self.stats_counters["uncacheable"] += 1
+            return await call(), False
+        response = await self.get(key)
+        if response is not None:
+            return response, True
+        pending = self.inflight.get(key)
+        if pending is not None:
+            try:
+                response = await asyncio.shield(pending)
+            except Exception:
+                self.stats_counters["coalesced_errors"] += 1
+                raise
+            if response is None:
+                self.stats_counters["fallbacks"] += 1
+                return await self.fetch(key, ttl, call)
+            self.stats_counters["coalesced"] += 1
+            return response, True
+
+        self.stats_counters["misses"] += 1
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.set_result(None)  # no shared result; followers fall back to their own call
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Followers see the error; mark it retrieved so an unfollowed failure isn't logged as lost
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+        future.set_result(response)
+        if response:
+            await self.put(key, response, ttl, (time.perf_counter() - started) * 1000)
+        return response, False
+
+    def bypass(self):
+        """Count a call made with the cache explicitly skipped"""
+        self.stats_counters["bypassed"] += 1
+
+    def _disk_clear(self):
+        db = self._connect()
+        db.execute("DELETE FROM llm_cache")
+        db.commit()
+
+    async def clear(self):
+        self.memory.clear()
+        if self._executor is not None:
+            await self._disk(self._disk_clear)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.stats_counters["memory_hits"] + self.stats_counters["disk_hits"] + self.stats_counters["coalesced"]
+        lookups = hits + self.stats_counters["misses"] + self.stats_counters["coalesced_errors"]
+        return {
+            **self.stats_counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+            "memory_entries": len(self.memory),
+            "max_entries": self.max_entries,
+            "disk_max_entries": self.disk_max_entries,
+            "default_ttl": self.default_ttl,
+            "ttls": self.ttls,
+            "disk_path": self.path,
+        }
+
+
+AGENT_LLM_CACHE_ENABLED = os.getenv("AGENT_LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Shared by every agent in the process; keys include the model and system prompt, so agents never collide
+llm_cache = LLMResponseCache(
+    path=os.getenv("AGENT_LLM_CACHE_PATH", os.path.join(AGENT_DATA_DIR, "llm_cache.sqlite3")) or None,
+    max_entries=max(1, int(os.getenv("AGENT_LLM_CACHE_MAX_ENTRIES", "1000")) // AGENT_WORKER_COUNT),
+    # The disk tier is one file shared by all workers
+    disk_max_entries=int(os.getenv("AGENT_LLM_CACHE_DISK_MAX", "50000")),
+    prune_every=int(os.getenv("AGENT_LLM_CACHE_PRUNE_EVERY", "100")),
+    default_ttl=float(os.getenv("AGENT_LLM_CACHE_TTL", "300")),
+    ttls=parse_ttls(os.getenv(
+        "AGENT_LLM_CACHE_TTLS",
+        "decision:120,learning:3600,workflow_orchestration:60,incident_response:0",
+    )),
+) if AGENT_LLM_CACHE_ENABLED else None
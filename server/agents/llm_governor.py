@@ -0,0 +1,245 @@
+"""
+ESA LIFE CEO 61×21 Framework - LLM Concurrency Governor
+Shared scheduler for agent LLM calls: global and per-agent caps, RPM/TPM pacing and priority queueing
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from llm_cache import AGENT_WORKER_COUNT
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Prompt kinds nobody is waiting on; they queue behind interactive work
+BACKGROUND_KINDS = {"learning", "collaboration", "summary"}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (~4 characters per token) for pacing; no tokenizer needed"""
+    return len(text) // 4 + 1 if text else 0
+
+
+def priority_for(kind: str) -> int:
+    return PRIORITY_BACKGROUND if kind in BACKGROUND_KINDS else PRIORITY_INTERACTIVE
+
+
+class Admission:
+    """An admitted LLM call: how long it queued, and the completion tokens to settle on release"""
+
+    __slots__ = ("queue_ms", "completion_tokens")
+
+    def __init__(self, queue_ms: float = 0.0):
+        self.queue_ms = queue_ms
+        self.completion_tokens = 0
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "agent", "tokens", "future", "enqueued")
+
+    def __init__(self, priority: int, seq: int, agent: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.agent = agent
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _TokenBucket:
+    """`per_minute` units refilled continuously, holding at most one minute's worth"""
+
+    __slots__ = ("rate", "capacity", "level", "updated")
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` is available (capped at a full bucket so oversize calls still run)"""
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class LLMGovernor:
+    """Admission control for every LLM call in the process
+
+    A call waits in a priority queue until a global slot and a slot for its agent are free and
+    the request (RPM) and token (TPM) buckets can cover it. Interactive calls are always admitted
+    before background ones; within a priority, calls go in arrival order, except that a call
+    whose agent is at its cap lets the next agent's call through. Limits apply per process;
+    the module-level governor is given this worker's share of the provider limits.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_per_agent: int = 4, rpm: float = 500,
+                 tpm: float = 200_000, completion_tokens: int = 800):
+        self.max_concurrency = max_concurrency
+        self.max_per_agent = max_per_agent
+        self.completion_tokens = completion_tokens
+        self.requests = _TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = _TokenBucket(tpm) if tpm > 0 else None
+        self.queue: List[_Waiter] = []
+        self.active = 0
+        self.agent_active: Dict[int, int] = defaultdict(int)
+        self.queued: Dict[int, int] = defaultdict(int)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats_counters = {"admitted": 0, "queued": 0, "paced": 0, "cancelled": 0, "failed": 0}
+        self.queue_ms: Dict[int, List[float]] = {p: [0, 0.0, 0.0] for p in PRIORITY_NAMES}  # count, total, max
+        self.llm_ms_total = 0.0
+        self.tokens_used = 0
+
+    def _pace_delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        delay = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                delay = max(delay, bucket.delay(amount))
+        return delay
+
+    def _dispatch(self):
+        """Admit queued calls in priority order while capacity and pacing allow"""
+        self._timer = None
+        blocked: List[_Waiter] = []
+        while self.queue and self.active < self.max_concurrency:
+            waiter = heapq.heappop(self.queue)
+            if waiter.future.done():
+                continue  # cancelled while queued
+            if self.agent_active[waiter.agent] >= self.max_per_agent:
+                blocked.append(waiter)
+                continue
+            delay = self._pace_delay(waiter.tokens)
+            if delay > 0:
+                # Pacing is global: nothing behind the head of the queue may overtake it
+                heapq.heappush(self.queue, waiter)
+                self.stats_counters["paced"] += 1
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                break
+            for bucket, amount in ((self.requests, 1), (self.tokens, waiter.tokens)):
+                if bucket is not None:
+                    bucket.level -= amount
+            self.active += 1
+            self.agent_active[waiter.agent] += 1
+            self.queued[waiter.priority] -= 1
+            waiter.future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self.queue, waiter)
+
+    def _kick(self):
+        if self._timer is None:
+            self._dispatch()
+
+    async def acquire(self, agent: int, priority: int, tokens: int) -> float:
+        """Wait for admission; returns the time spent queued in ms"""
+        waiter = _Waiter(priority, next(self._seq), agent, tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self.queue, waiter)
+        self.queued[priority] += 1
+        self._kick()
+        if not waiter.future.done():
+            self.stats_counters["queued"] += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                self.queued[priority] -= 1
+                self.stats_counters["cancelled"] += 1
+            else:
+                self.release(agent, tokens, tokens)  # admitted just as the caller gave up
+            raise
+        waited = (time.monotonic() - waiter.enqueued) * 1000
+        stats = self.queue_ms[priority]
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+        self.stats_counters["admitted"] += 1
+        return waited
+
+    def release(self, agent: int, reserved: int, used: int):
+        """Free the call's slots and settle the token bucket with the tokens actually used"""
+        self.active -= 1
+        self.agent_active[agent] -= 1
+        if self.tokens is not None:
+            self.tokens.level -= used - reserved
+        self.tokens_used += used
+        self._kick()
+
+    @asynccontextmanager
+    async def admit(self, agent: int, priority: int, prompt_tokens: int) -> AsyncIterator[Admission]:
+        """Hold a slot for the body of the `async with`, e.g. while a reply streams in
+
+        Set `completion_tokens` on the admission before leaving so the TPM bucket is settled.
+        """
+        reserved = prompt_tokens + self.completion_tokens
+        admission = Admission(await self.acquire(agent, priority, reserved))
+        started = time.monotonic()
+        try:
+            yield admission
+        except Exception:
+            self.stats_counters["failed"] += 1
+            raise
+        finally:
+            self.llm_ms_total += (time.monotonic() - started) * 1000
+            self.release(agent, reserved, prompt_tokens + admission.completion_tokens)
+
+    async def run(self, agent: int, priority: int, prompt_tokens: int,
+                  call: Callable[[], Awaitable[Any]]) -> Tuple[Any, float]:
+        """Run `call` once admitted; (result, queue_ms)"""
+        async with self.admit(agent, priority, prompt_tokens) as admission:
+            response = await call()
+            admission.completion_tokens = estimate_tokens(response) if isinstance(response, str) else 0
+        return response, admission.queue_ms
+
+    def stats(self) -> Dict[str, Any]:
+        admitted = self.stats_counters["admitted"]
+        return {
+            **self.stats_counters,
+            "active": self.active,
+            "waiting": {PRIORITY_NAMES[p]: n for p, n in self.queued.items()},
+            "queue_wait_ms": {
+                PRIORITY_NAMES[p]: {"calls": int(count), "avg": round(total / count, 1) if count else 0,
+                                    "max": round(peak, 1)}
+                for p, (count, total, peak) in self.queue_ms.items()
+            },
+            "avg_llm_ms": round(self.llm_ms_total / admitted, 1) if admitted else 0,
+            "tokens_used": self.tokens_used,
+            "limits": {
+                "max_concurrency": self.max_concurrency,
+                "max_per_agent": self.max_per_agent,
+                "rpm": self.requests.capacity if self.requests else None,
+                "tpm": self.tokens.capacity if self.tokens else None,
+            },
+            "available": {
+                "requests": round(self.requests.level, 1) if self.requests else None,
+                "tokens": round(self.tokens.level) if self.tokens else None,
+            },
+        }
+
+
+AGENT_LLM_GOVERNOR_ENABLED = os.getenv("AGENT_LLM_GOVERNOR_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Shared by every agent in the process. AGENT_LLM_RPM/TPM are the provider's limits (defaults: gpt-4o-mini
+# tier 1) for the whole API, so each pre-fork worker paces itself to its share of them
+llm_governor = LLMGovernor(
+    max_concurrency=int(os.getenv("AGENT_LLM_MAX_CONCURRENCY", "8")),
+    max_per_agent=int(os.getenv("AGENT_LLM_MAX_PER_AGENT", "4")),
+    rpm=float(os.getenv("AGENT_LLM_RPM", "500")) / AGENT_WORKER_COUNT,
+    tpm=float(os.getenv("AGENT_LLM_TPM", "200000")) / AGENT_WORKER_COUNT,
+    completion_tokens=int(os.getenv("AGENT_LLM_COMPLETION_TOKENS", "800")),
+) if AGENT_LLM_GOVERNOR_ENABLED else None
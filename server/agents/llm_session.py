@@ -0,0 +1,153 @@
+"""
+ESA LIFE CEO 61×21 Framework - LLM Session Strategies
+Bounded conversation memory for agent LLM calls, so prompt size stays flat however long an agent runs
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from context_encoder import count_tokens, truncate_tokens
+
+SESSION_STRATEGIES = ("stateless", "window", "summary")
+
+
+def clip(text: str, tokens: int) -> str:
+    clipped = truncate_tokens(text, tokens)
+    return clipped if len(clipped) == len(text) else f"{clipped}…"
+
+
+class Turn:
+    """One remembered exchange, both sides clipped"""
+
+    __slots__ = ("request", "response")
+
+    def __init__(self, request: str, response: str):
+        self.request = request
+        self.response = response
+
+    def render(self) -> str:
+        return f"[request] {self.request}\n[reply] {self.response}"
+
+
+class ConversationSession:
+    """What an agent's next LLM call is told about its earlier ones
+
+    Every call goes to a fresh provider chat, so the only history a call sees is what compose()
+    puts in front of its prompt:
+
+    - stateless: nothing; each call stands alone
+    - window: the last `turns` exchanges
+    - summary: the last `turns` exchanges plus a running summary of the older ones, folded in
+      by `summarize(summary, exchanges)` in the background and capped at `summary_tokens`
+
+    Each side of an exchange is clipped to `turn_tokens`, so the history added to a prompt is
+    bounded whatever the agent's uptime. A reply is only cached for the history it was given,
+    so with window or summary a repeated request rarely hits the LLM cache.
+    """
+
+    def __init__(self, strategy: str = "stateless", turns: int = 4, turn_tokens: int = 150,
+                 summary_tokens: int = 300, summarize: Optional[Callable[[str, str], Awaitable[str]]] = None):
+        if strategy not in SESSION_STRATEGIES:
+            raise ValueError(f"Unknown LLM session strategy {strategy!r}, expected one of {', '.join(SESSION_STRATEGIES)}")
+        self.strategy = strategy
+        self.window: Deque[Turn] = deque(maxlen=0 if strategy == "stateless" else max(1, turns))
+        self.turn_tokens = turn_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.summary = ""
+        self.unsummarized: List[Turn] = []  # dropped from the window, waiting to be folded into the summary
+        self.folding: List[Turn] = []
+        self._fold_task: Optional[asyncio.Task] = None
+        self.stats_counters = {"calls": 0, "summaries": 0, "summary_failures": 0}
+        self.input_tokens_total = 0
+        self.input_tokens_max = 0
+        self.input_tokens_last = 0
+
+    def history(self) -> str:
+        """The history this strategy keeps, as sent ahead of the next prompt; empty when there is none"""
+        pending = (self.folding + self.unsummarized)[-self.window.maxlen:] if self.window.maxlen else []
+        sections = [turn.render() for turn in (*pending, *self.window)]
+        if self.summary:
+            sections.insert(0, f"[summary of earlier exchanges] {self.summary}")
+        return "\n".join(sections)
+
+    def compose(self, prompt: str, history: Optional[str] = None) -> str:
+        """`prompt` preceded by `history` (by default the current history())"""
+        history = self.history() if history is None else history
+        if not history:
+            return prompt
+        return f"CONVERSATION SO FAR (for continuity only):\n{history}\n\nCURRENT REQUEST:\n{prompt}"
+
+    def record(self, request: str, response: str):
+        """Remember one exchange; `request` should be a short description, not the whole prompt"""
+        if not self.window.maxlen:
+            return
+        if self.strategy == "summary" and len(self.window) == self.window.maxlen:
+            self.unsummarized.append(self.window[0])
+            if len(self.unsummarized) >= self.window.maxlen and self._fold_task is None:
+                self._fold_task = asyncio.get_running_loop().create_task(self.fold())
+        self.window.append(Turn(clip(request, self.turn_tokens), clip(response, self.turn_tokens)))
+
+    async def fold(self):
+        """Fold the exchanges that left the window into the running summary"""
+        try:
+            while self.unsummarized:
+                self.folding, self.unsummarized = self.unsummarized, []
+                exchanges = "\n".join(turn.render() for turn in self.folding)
+                summary = None
+                if self.summarize is not None:
+                    try:
+                        summary = await self.summarize(self.summary, exchanges)
+                    except Exception as e:
+                        # Keep going without the LLM: newest exchanges first, cut at the summary budget
+                        print(f"⚠️ LLM session summary failed: {e}")
+                        self.stats_counters["summary_failures"] += 1
+                if not summary:
+                    summary = f"{exchanges}\n{self.summary}"
+                self.summary = clip(summary.strip(), self.summary_tokens)
+                self.folding = []
+                self.stats_counters["summaries"] += 1
+        finally:
+            self._fold_task = None
+
+    def observe(self, input_tokens: int):
+        """Count the input tokens (system prompt, history and prompt) of one call"""
+        self.stats_counters["calls"] += 1
+        self.input_tokens_total += input_tokens
+        self.input_tokens_max = max(self.input_tokens_max, input_tokens)
+        self.input_tokens_last = input_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.stats_counters["calls"]
+        return {
+            **self.stats_counters,
+            "strategy": self.strategy,
+            "window_turns": self.window.maxlen,
+            "remembered_turns": len(self.window),
+            "summary_tokens": count_tokens(self.summary),
+            "avg_input_tokens": round(self.input_tokens_total / calls, 1) if calls else 0,
+            "max_input_tokens": self.input_tokens_max,
+            "last_input_tokens": self.input_tokens_last,
+        }
+
+
+# Stateless by default: history changes with every answered call, and replies are cached per history
+AGENT_LLM_SESSION = os.getenv("AGENT_LLM_SESSION", "stateless")
+# Per-layer overrides, "layer:strategy" pairs, e.g. "35:summary,44:stateless"
+AGENT_LLM_SESSIONS = {int(layer): strategy.strip()
+                      for layer, strategy in (entry.split(":", 1) for entry in os.getenv("AGENT_LLM_SESSIONS", "").split(",")
+                                              if ":" in entry)}
+AGENT_LLM_SESSION_TURNS = int(os.getenv("AGENT_LLM_SESSION_TURNS", "4"))
+AGENT_LLM_SESSION_TURN_TOKENS = int(os.getenv("AGENT_LLM_SESSION_TURN_TOKENS", "150"))
+AGENT_LLM_SESSION_SUMMARY_TOKENS = int(os.getenv("AGENT_LLM_SESSION_SUMMARY_TOKENS", "300"))
+
+
+def session_for(layer_id: int, strategy: Optional[str] = None,
+                summarize: Optional[Callable[[str, str], Awaitable[str]]] = None) -> ConversationSession:
+    """Session with the layer's strategy: explicit, then AGENT_LLM_SESSIONS, then AGENT_LLM_SESSION"""
+    if strategy is None:
+        strategy = AGENT_LLM_SESSIONS.get(layer_id, AGENT_LLM_SESSION)
+    return ConversationSession(strategy, AGENT_LLM_SESSION_TURNS, AGENT_LLM_SESSION_TURN_TOKENS,
+                               AGENT_LLM_SESSION_SUMMARY_TOKENS, summarize)
@@ -7,7 +7,7 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
 
 class DatabaseArchitectureAgent(FunctionalAgent):
     """Layer 1: Database Architecture - Real database optimization and management agent"""
@@ -110,11 +110,15 @@ Always provide concrete, actionable database recommendations with specific SQL s
         
         return await self.execute_work(task)
 
-# Create database architecture agent instance
-database_agent = DatabaseArchitectureAgent()
+# The database architecture agent instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "database_agent":
+        return agent_registry.get_agent(1)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_database_agent():
     """Test the database architecture agent capabilities"""
+    database_agent = agent_registry.get_agent(1)
     print("🗄️ Testing Database Architecture Agent (Layer 1)")
     
     # Test 1: Query optimization
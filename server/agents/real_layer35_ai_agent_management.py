@@ -7,7 +7,7 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
 
 class MasterOrchestratorAgent(FunctionalAgent):
     """Layer 35: AI Agent Management - Master Orchestrator for all 61 agents"""
@@ -52,7 +52,7 @@ DECISION-MAKING APPROACH:
 
 Always provide structured, actionable orchestration plans with specific agent assignments, clear coordination points, and measurable success criteria."""
 
-    async def orchestrate_multi_agent_workflow(self, workflow: Dict[str, Any], available_agents: Dict[int, FunctionalAgent]) -> Dict[str, Any]:
+    async def orchestrate_multi_agent_workflow(self, workflow: Dict[str, Any], available_agents: Dict[int, Any]) -> Dict[str, Any]:
         """Orchestrate complex workflows involving multiple agents"""
         
         task = AgentTask(
@@ -185,11 +185,15 @@ Always provide structured, actionable orchestration plans with specific agent as
         
         return improvements
 
-# Create master orchestrator instance
-master_orchestrator = MasterOrchestratorAgent()
+# The master orchestrator instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "master_orchestrator":
+        return agent_registry.get_agent(35)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_master_orchestrator():
     """Test the master orchestrator capabilities"""
+    master_orchestrator = agent_registry.get_agent(35)
     print("👑 Testing Master AI Agent Orchestrator (Layer 35)")
     
     # Test 1: Simple workflow orchestration
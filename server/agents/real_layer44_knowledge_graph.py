@@ -7,7 +7,8 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
+from agent_store import AgentCollection
 
 class KnowledgeGraphAgent(FunctionalAgent):
     """Layer 44: Knowledge Graph - Real entity extraction and knowledge management agent"""
@@ -18,7 +19,7 @@ class KnowledgeGraphAgent(FunctionalAgent):
             layer_name="Knowledge Graph",
             specialization="Entity extraction, relationship mapping, semantic analysis, knowledge graph construction, and intelligent query processing"
         )
-        self.knowledge_base = {}
+        self.knowledge_base = AgentCollection(44, "knowledge_base")
         self.entity_relationships = {}
     
     def get_system_prompt(self) -> str:
@@ -73,18 +74,18 @@ Always provide structured knowledge representations with clear entity definition
             try:
                 # Try to parse and store structured knowledge
                 knowledge_data = json.loads(result.result) if result.result.strip().startswith('{') else {"raw_knowledge": result.result}
-                self.knowledge_base[f"extraction_{len(self.knowledge_base) + 1}"] = {
+                self.knowledge_base.append({
                     "source_context": data_context,
                     "extracted_knowledge": knowledge_data,
                     "timestamp": datetime.now().isoformat()
-                }
+                }, task_type="entity_extraction")
             except:
                 # Store as text if not JSON
-                self.knowledge_base[f"extraction_{len(self.knowledge_base) + 1}"] = {
+                self.knowledge_base.append({
                     "source_context": data_context,
                     "extracted_knowledge": result.result,
                     "timestamp": datetime.now().isoformat()
-                }
+                }, task_type="entity_extraction")
         
         return result
     
@@ -144,11 +145,15 @@ Always provide structured knowledge representations with clear entity definition
         
         return await self.execute_work(task)
 
-# Create knowledge graph agent instance
-knowledge_agent = KnowledgeGraphAgent()
+# The knowledge graph agent instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "knowledge_agent":
+        return agent_registry.get_agent(44)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_knowledge_agent():
     """Test the knowledge graph agent capabilities"""
+    knowledge_agent = agent_registry.get_agent(44)
     print("🧠 Testing Knowledge Graph Agent (Layer 44)")
     
     # Test 1: Entity extraction
@@ -7,7 +7,8 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
+from agent_store import AgentCollection
 
 class ReasoningEngineAgent(FunctionalAgent):
     """Layer 45: Reasoning Engine - Real logical reasoning and problem-solving agent"""
@@ -19,7 +20,7 @@ class ReasoningEngineAgent(FunctionalAgent):
             specialization="Logical reasoning, complex problem solving, strategic analysis, inference chains, and intelligent decision support"
         )
         self.reasoning_history = {}
-        self.problem_solutions = {}
+        self.problem_solutions = AgentCollection(45, "problem_solutions")
     
     def get_system_prompt(self) -> str:
         return f"""You are the Reasoning Engine Agent (Layer 45) in the ESA LIFE CEO 61×21 Framework.
@@ -77,12 +78,12 @@ Always provide structured reasoning with clear logic chains, evidence-based conc
         
         # Store solution for future reference
         if result.success:
-            self.problem_solutions[f"solution_{len(self.problem_solutions) + 1}"] = {
+            self.problem_solutions.append({
                 "problem": problem_context,
                 "solution": result.result,
                 "confidence": result.confidence,
                 "timestamp": datetime.now().isoformat()
-            }
+            }, task_type="complex_problem_solving")
         
         return result
     
@@ -150,11 +151,15 @@ Always provide structured reasoning with clear logic chains, evidence-based conc
             options=["reasoning_valid", "logical_flaw_identified", "insufficient_evidence", "alternative_reasoning_suggested"]
         )
 
-# Create reasoning engine agent instance  
-reasoning_agent = ReasoningEngineAgent()
+# The reasoning engine agent instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "reasoning_agent":
+        return agent_registry.get_agent(45)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_reasoning_agent():
     """Test the reasoning engine agent capabilities"""
+    reasoning_agent = agent_registry.get_agent(45)
     print("🔍 Testing Reasoning Engine Agent (Layer 45)")
     
     # Test 1: Complex problem solving
@@ -7,7 +7,8 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
+from agent_store import AgentCollection
 
 class SecurityHardeningAgent(FunctionalAgent):
     """Layer 49: Security Hardening - Real security automation and threat response agent"""
@@ -18,8 +19,8 @@ class SecurityHardeningAgent(FunctionalAgent):
             layer_name="Security Hardening",
             specialization="Cybersecurity analysis, vulnerability assessment, threat detection, security automation, incident response, and compliance implementation"
         )
-        self.threat_database = {}
-        self.security_policies = {}
+        self.threat_database = AgentCollection(49, "threat_database")
+        self.security_policies = AgentCollection(49, "security_policies")
     
     def get_system_prompt(self) -> str:
         return f"""You are the Security Hardening Agent (Layer 49) in the ESA LIFE CEO 61×21 Framework.
@@ -82,11 +83,11 @@ Always provide concrete security implementations with specific configurations, c
         
         # Record incident for future threat intelligence
         if result.success:
-            self.threat_database[f"incident_{len(self.threat_database) + 1}"] = {
+            self.threat_database.append({
                 "context": incident_context,
                 "response": result.result,
                 "timestamp": datetime.now().isoformat()
-            }
+            }, task_type="incident_response")
         
         return result
     
@@ -136,19 +137,23 @@ Always provide concrete security implementations with specific configurations, c
         
         # Store policies for future reference
         if result.success:
-            self.security_policies[f"policy_{len(self.security_policies) + 1}"] = {
+            self.security_policies.append({
                 "context": policy_context,
                 "policy": result.result,
                 "created_at": datetime.now().isoformat()
-            }
+            }, task_type="policy_generation")
         
         return result
 
-# Create security hardening agent instance
-security_agent = SecurityHardeningAgent()
+# The security hardening agent instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "security_agent":
+        return agent_registry.get_agent(49)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_security_agent():
     """Test the security hardening agent capabilities"""
+    security_agent = agent_registry.get_agent(49)
     print("🔒 Testing Security Hardening Agent (Layer 49)")
     
     # Test 1: Vulnerability assessment
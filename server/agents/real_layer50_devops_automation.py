@@ -7,7 +7,8 @@ import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any
-from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision
+from functional_agent_base import FunctionalAgent, AgentTask, WorkResult, Decision, agent_registry
+from agent_store import AgentCollection
 
 class DevOpsAutomationAgent(FunctionalAgent):
     """Layer 50: DevOps Automation - Real deployment and infrastructure automation agent"""
@@ -18,7 +19,7 @@ class DevOpsAutomationAgent(FunctionalAgent):
             layer_name="DevOps Automation", 
             specialization="CI/CD pipeline management, deployment automation, infrastructure optimization, container orchestration, and production environment management"
         )
-        self.deployment_history = {}
+        self.deployment_history = AgentCollection(50, "deployment_history")
         self.infrastructure_state = {}
     
     def get_system_prompt(self) -> str:
@@ -114,11 +115,11 @@ Always provide concrete, implementable DevOps solutions with specific configurat
         
         # Record incident for future analysis
         if result.success:
-            self.deployment_history[f"incident_{len(self.deployment_history) + 1}"] = {
+            self.deployment_history.append({
                 "context": incident_context,
                 "response": result.result,
                 "timestamp": datetime.now().isoformat()
-            }
+            }, task_type="incident_response")
         
         return result
     
@@ -134,11 +135,15 @@ Always provide concrete, implementable DevOps solutions with specific configurat
         
         return await self.execute_work(task)
 
-# Create DevOps automation agent instance
-devops_agent = DevOpsAutomationAgent()
+# The DevOps automation agent instance is built by the registry on first use
+def __getattr__(name: str):
+    if name == "devops_agent":
+        return agent_registry.get_agent(50)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def test_devops_agent():
     """Test the DevOps automation agent capabilities"""
+    devops_agent = agent_registry.get_agent(50)
     print("🚀 Testing DevOps Automation Agent (Layer 50)")
     
     # Test 1: Deployment strategy
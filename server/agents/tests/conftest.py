@@ -0,0 +1,46 @@
+"""
+ESA LIFE CEO 61×21 Framework - Agent Test Fixtures
+Agent modules are imported flat from server/agents, as functional_agent_api does
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before any agent module reads its configuration: keep test runs off the real data directory
+os.environ.setdefault("AGENT_DATA_DIR", tempfile.mkdtemp(prefix="esa-agent-tests-"))
+os.environ.setdefault("AGENT_STORE_ENABLED", "false")
+
+
+class ScriptedChat:
+    """Stands in for the provider chat of one call; records the prompts it is sent"""
+
+    def __init__(self, prompts):
+        self.prompts = prompts
+
+    async def send_message(self, message) -> str:
+        self.prompts.append(message.text)
+        return f"reply {len(self.prompts)}: " + "analysis " * 20
+
+
+@pytest.fixture
+def llm_prompts(monkeypatch):
+    """Prompts sent to the LLM during the test; agents get a ScriptedChat instead of the provider"""
+    from functional_agent_base import FunctionalAgent
+
+    prompts = []
+    monkeypatch.setattr(FunctionalAgent, "new_llm_chat", lambda self: ScriptedChat(prompts))
+    return prompts
+
+
+@pytest.fixture
+def fresh_agent():
+    """Build a catalogued agent outside the global registry, so tests don't share history or sessions"""
+    from functional_agent_base import AGENT_CATALOG
+
+    descriptors = {descriptor.layer_id: descriptor for descriptor in AGENT_CATALOG}
+    return lambda layer_id: descriptors[layer_id].build()
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from llm_cache import LLMResponseCache
+
+REQUEST = {"task_type": "query_optimization", "description": "Tune the events query", "expected_output": "",
+           "context": {"table": "events", "filters": ["city", "date"]}}
+
+
+def test_key_is_canonical_over_request_ordering(fresh_agent):
+    agent = fresh_agent(1)
+    reordered = {key: REQUEST[key] for key in reversed(list(REQUEST))}
+
+    assert agent.cache_key("work", REQUEST) == agent.cache_key("work", reordered)
+
+
+def test_key_depends_on_inputs_kind_and_layer(fresh_agent):
+    database, security = fresh_agent(1), fresh_agent(49)
+    key = database.cache_key("work", REQUEST)
+
+    assert key != database.cache_key("work", {**REQUEST, "context": {"table": "posts"}})
+    assert key != database.cache_key("decision", REQUEST)
+    assert key != security.cache_key("work", REQUEST)
+
+
+def test_key_depends_on_model_and_system_prompt():
+    base = LLMResponseCache.make_key("openai/gpt-4o-mini", "prompt-hash", "work", REQUEST)
+
+    assert base != LLMResponseCache.make_key("openai/gpt-4o", "prompt-hash", "work", REQUEST)
+    assert base != LLMResponseCache.make_key("openai/gpt-4o-mini", "other-hash", "work", REQUEST)
+
+
+def test_key_depends_on_history_sent_with_the_prompt(fresh_agent):
+    agent = fresh_agent(1)
+
+    assert agent.cache_key("decision", REQUEST, "") == agent.cache_key("decision", REQUEST)
+    assert agent.cache_key("decision", REQUEST, "[request] a\n[reply] b") != agent.cache_key("decision", REQUEST)
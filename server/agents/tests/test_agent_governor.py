@@ -0,0 +1,20 @@
+import json
+import os
+
+from check_startup_budget import run_probe
+
+GOVERNOR_LIMITS = """
+import json
+from llm_governor import llm_governor
+print(json.dumps([llm_governor.requests.capacity, llm_governor.tokens.capacity]))
+"""
+
+
+def governor_limits(**env) -> list:
+    return json.loads(run_probe(GOVERNOR_LIMITS, {**os.environ, "AGENT_LLM_RPM": "500", "AGENT_LLM_TPM": "200000",
+                                                  **env}))
+
+
+def test_provider_limits_are_split_between_workers():
+    assert governor_limits() == [500, 200000]
+    assert governor_limits(PREFORK_WORKERS="4") == [125, 50000]
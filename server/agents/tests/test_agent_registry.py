@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from functional_agent_base import AGENT_CATALOG, AgentRegistry, agent_registry
+
+
+def test_listing_layers_builds_nothing():
+    registry = AgentRegistry(AGENT_CATALOG)
+
+    layers = registry.list_layers()
+
+    assert [layer.layer_id for layer in layers] == sorted(d.layer_id for d in AGENT_CATALOG)
+    assert registry.agents == {}
+    assert all(layer.get_status()["status"] == "idle" for layer in layers)
+
+
+def test_get_agent_builds_once_on_first_use():
+    registry = AgentRegistry(AGENT_CATALOG)
+
+    agent = registry.get_agent(44)
+
+    assert agent.layer_id == 44
+    assert registry.get_agent(44) is agent
+    assert list(registry.agents) == [44]
+    assert registry.get_agent(999) is None
+    assert not registry.is_available(999)
+
+
+def test_layer_module_attribute_resolves_through_the_registry():
+    import real_layer01_database_architecture as layer01
+
+    agent_registry.agents.pop(1, None)
+    agent = layer01.database_agent
+
+    assert agent is agent_registry.get_agent(1)
+    assert layer01.database_agent is agent
+    with pytest.raises(AttributeError):
+        layer01.no_such_agent
+
+
+def test_orchestrator_resolves_lazily():
+    import real_layer35_ai_agent_management as layer35
+
+    assert layer35.master_orchestrator is agent_registry.get_agent(35)
+    assert agent_registry.orchestrator is layer35.master_orchestrator
@@ -0,0 +1,59 @@
+import asyncio
+import uuid
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from functional_agent_base import AgentTask
+from llm_session import ConversationSession
+
+
+def task(description: str) -> AgentTask:
+    return AgentTask("query_optimization", description, {"table": "events"})
+
+
+def test_repeated_task_hits_the_cache_with_default_settings(fresh_agent, llm_prompts):
+    agent = fresh_agent(1)
+    description = f"Tune the events query {uuid.uuid4()}"
+
+    async def run_twice():
+        return [await agent.execute_work(task(description)) for _ in range(2)]
+
+    first, second = asyncio.run(run_twice())
+
+    assert agent.session.strategy == "stateless"
+    assert (first.cached, second.cached) == (False, True)
+    assert second.result == first.result
+    assert len(llm_prompts) == 1
+
+
+def test_window_history_is_bounded_and_part_of_the_prompt():
+    session = ConversationSession("window", turns=2, turn_tokens=10)
+    for n in range(5):
+        session.record(f"work: request {n}", f"reply {n}")
+
+    history = session.history()
+
+    assert "request 4" in history and "request 3" in history
+    assert "request 2" not in history
+    assert session.compose("PROMPT").endswith("CURRENT REQUEST:\nPROMPT")
+    assert ConversationSession("stateless").compose("PROMPT") == "PROMPT"
+
+
+def test_batch_items_share_one_history_snapshot(fresh_agent, llm_prompts):
+    agent = fresh_agent(1)
+    agent.session = ConversationSession("window", turns=4)
+    agent.session.record("work: earlier request", "earlier reply")
+
+    async def run_batch():
+        return [result async for result in agent.execute_many([task(f"Batch item {n}") for n in range(3)],
+                                                              concurrency=3, use_cache=False)]
+
+    results = asyncio.run(run_batch())
+
+    histories = {prompt.split("CURRENT REQUEST:")[0] for prompt in llm_prompts}
+    assert len(results) == len(llm_prompts) == 3
+    assert len(histories) == 1
+    assert "earlier request" in histories.pop()
+    assert not any("Batch item" in prompt.split("CURRENT REQUEST:")[0] for prompt in llm_prompts)
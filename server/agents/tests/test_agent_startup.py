@@ -0,0 +1,17 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from check_startup_budget import PROBE, run_probe
+
+
+def test_api_import_and_startup_build_no_agents():
+    sample = json.loads(run_probe(PROBE, {**os.environ, "AGENT_API_PRELOAD": "", "AGENT_STORE_ENABLED": "false"}))
+
+    assert sample["catalogued"]
+    assert sample["built"] == []
+    assert sample["agent_modules"] == []
+    assert not sample["llm_sdk_loaded"]
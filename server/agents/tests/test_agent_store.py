@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+
+from agent_store import AgentStore
+
+
+def test_failed_flush_requeues_and_counts_dropped_rows(tmp_path, monkeypatch):
+    store = AgentStore(str(tmp_path / "store.sqlite3"), max_pending=4, compact_interval=0)
+
+    async def failing_write(fn, rows):
+        # Rows appended while the write is in flight, then the write fails
+        for n in range(3):
+            store.append(1, "work", {"n": f"late {n}"})
+        raise sqlite3.OperationalError("disk I/O error")
+
+    async def scenario():
+        for n in range(3):
+            store.append(1, "work", {"n": n})
+        monkeypatch.setattr(store, "_run", failing_write)
+        await store.flush()
+        monkeypatch.undo()
+        await store.flush()
+        records = await store.query(agent=1, stream="work")
+        await store.stop()
+        return records
+
+    records = asyncio.run(scenario())
+
+    # Oldest go first when the retried batch and the rows appended meanwhile overflow the queue
+    assert [record["n"] for record in reversed(records)] == [2, "late 0", "late 1", "late 2"]
+    assert store.stats()["dropped"] == 2
+    assert store.stats()["write_errors"] == 1
+
+
+def test_bodies_are_joined_by_row_id_not_timestamp(tmp_path):
+    store = AgentStore(str(tmp_path / "store.sqlite3"), compact_interval=0)
+
+    async def scenario():
+        refs = [store.append(1, "work", {"n": n}, timestamp=1700000000.5) for n in range(3)]
+        bodies = await store.bodies([refs[2], None, refs[0]])
+        await store.stop()
+        return bodies
+
+    assert asyncio.run(scenario()) == [{"n": 2}, None, {"n": 0}]
+
+
+def test_collection_total_is_seeded_from_the_store(tmp_path, monkeypatch):
+    import agent_store
+
+    path = str(tmp_path / "store.sqlite3")
+
+    async def run(records: int) -> int:
+        monkeypatch.setattr(agent_store, "agent_store", AgentStore(path, compact_interval=0))
+        collection = agent_store.AgentCollection(44, "knowledge_base")
+        for n in range(records):
+            collection.append({"n": n})
+        await collection._load_task
+        await agent_store.agent_store.stop()
+        return len(collection)
+
+    assert asyncio.run(run(3)) == 3
+    # A restart starts from what is on disk
+    assert asyncio.run(run(2)) == 5
@@ -0,0 +1,39 @@
+import asyncio
+import sqlite3
+
+from llm_cache import LLMResponseCache
+
+
+def test_disk_tier_drops_expired_and_oldest_rows_every_few_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMResponseCache(path, disk_max_entries=3, prune_every=2)
+
+    async def fill():
+        await cache.put("expired", "stale", -1, 1.0)
+        for n in range(5):
+            await cache.put(f"key {n}", f"reply {n}", 60, 1.0)
+
+    asyncio.run(fill())
+    keys = [row[0] for row in sqlite3.connect(path).execute("SELECT key FROM llm_cache ORDER BY rowid")]
+
+    # Pruned after the 6th write: the expired row and the oldest beyond the cap
+    assert keys == ["key 2", "key 3", "key 4"]
+    assert cache.stats()["disk_pruned"] == 3
+
+
+def test_shared_call_failure_is_not_a_hit():
+    cache = LLMResponseCache(None)
+
+    async def failing_call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.fetch("key", 60, failing_call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    stats = cache.stats()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (stats["misses"], stats["coalesced"], stats["coalesced_errors"]) == (1, 0, 2)
+    assert stats["hit_rate"] == 0.0